@@ -0,0 +1,122 @@
+"""
+공용 캐시 유틸
+
+- normalize_text: 캐시 키용 질문 정규화 (공백/대소문자/끝 문장부호 차이 무시)
+- text_hash: 여러 조각을 묶어 짧은 해시 키로 변환
+- TTLCache: 크기 상한(LRU) + 만료 시간(TTL)을 가진 스레드 안전 캐시, hit/miss 카운터 포함
+- unit_vector / dot: 유사 질문 캐시(gate, 답변 캐시)용 코사인 유사도 (단위 벡터끼리의 내적)
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import operator
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Iterable, Optional, TypeVar
+
+V = TypeVar("V")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?？!！.。~…]+$")
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키 비교용으로 질문을 정규화합니다."""
+    if not isinstance(text, str):
+        text = str(text)
+    text = unicodedata.normalize("NFKC", text)
+    text = _WHITESPACE_RE.sub(" ", text).strip().lower()
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def text_hash(*parts: Any) -> str:
+    """여러 조각을 구분자로 이어 sha1 해시 문자열을 만듭니다."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def dot(a: Iterable[float], b: Iterable[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+def unit_vector(vector: Iterable[float]) -> Optional[array]:
+    """길이 1로 정규화한 벡터 (영벡터면 None). 저장해 두면 유사도 비교가 dot 한 번이 됩니다."""
+    vec = array("f", vector)
+    norm = math.sqrt(dot(vec, vec))
+    if not norm:
+        return None
+    return array("f", (x / norm for x in vec))
+
+
+class TTLCache(Generic[V]):
+    """LRU + TTL 캐시
+
+    - maxsize를 넘으면 가장 오래 사용하지 않은 항목부터 제거
+    - ttl(초)이 지나면 조회 시 만료 처리 (ttl=None이면 만료 없음)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        """값을 저장합니다. ttl을 주면 이 항목만 기본 TTL 대신 사용합니다."""
+        ttl = self._ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> list[tuple[Hashable, V]]:
+        """만료되지 않은 항목을 최근 사용 순서(오래된 것 먼저)로 반환합니다."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value)
+                for key, (expires_at, value) in self._data.items()
+                if not expires_at or expires_at >= now
+            ]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
@@ -6,13 +6,23 @@ ChatbotStream 클래스와 관련 메타데이터를 제공합니다.
 
 from .stream import ChatbotStream
 from .metadata import RagMetadata, FunctionCallMetadata, ChatMetadata
-from .config import model, client
+from .session import ChatSession, SessionStore
+from .context_window import ContextWindowManager
+from .summarizer import ConversationSummarizer
+from .direct_answer import DirectAnswerer
+from .config import model, client, async_client
 
 __all__ = [
     "ChatbotStream",
     "RagMetadata", 
     "FunctionCallMetadata", 
     "ChatMetadata",
+    "ChatSession",
+    "SessionStore",
+    "ContextWindowManager",
+    "ConversationSummarizer",
+    "DirectAnswerer",
     "model",
     "client",
+    "async_client",
 ]
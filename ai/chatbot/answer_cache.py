@@ -0,0 +1,140 @@
+"""
+규정 질문 답변 캐시
+
+"졸업 학점이 몇 학점이야?"처럼 학기마다 거의 같은 문장으로 반복되는 규정 질문은
+같은 청크 집합을 근거로 같은 답을 만들므로, 최종 답변 전체를 캐시해 LLM 호출 없이 다시 보냅니다.
+
+- 키: (정규화된 질문, 응답 언어, 검색된 청크 ID 집합, 본문 해시)
+  → 규정을 재적재해 청크 본문이 바뀌면 본문 해시가 달라져 자동으로 무효화됨
+- 선택: 같은 (언어, 청크 집합) 안에서 질의 임베딩 유사도가 ANSWER_CACHE_SEMANTIC_THRESHOLD 이상이면 재사용
+  (기본값 0 = 사용 안 함, 쓰려면 0.95 이상의 보수적인 값 권장)
+- 학식/웹검색 등 함수 결과가 섞인 답변은 시간에 따라 바뀌므로 저장하지도, 재사용하지도 않음
+- 조회는 검색 직후 (요약 전)에 하므로 적중하면 RAG 요약(LLM 호출)도 생략됨
+"""
+from __future__ import annotations
+
+import os
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.ai.cache import TTLCache, dot, normalize_text, text_hash, unit_vector
+from app.ai.concurrency import run_blocking
+
+
+@dataclass
+class CachedAnswer:
+    text: str
+    metadata: Dict[str, Any]  # 처음 답할 때의 ChatMetadata.to_dict()
+    created_at: float = field(default_factory=time.time)
+
+
+class AnswerCache:
+    """규정 질문의 최종 답변 캐시"""
+
+    def __init__(
+        self,
+        *,
+        enabled: Optional[bool] = None,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        semantic_threshold: Optional[float] = None,
+        embed_fn: Callable[[str], Iterable[float]] | None = None,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv("ANSWER_CACHE", "1") not in ("0", "false", "False")
+        )
+        maxsize = maxsize or int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+        ttl = ttl or float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+        self.semantic_threshold = (
+            semantic_threshold if semantic_threshold is not None
+            else float(os.getenv("ANSWER_CACHE_SEMANTIC_THRESHOLD", "0"))
+        ) or None
+        # 완전 일치: 질문 키 → 답변
+        self._answers: TTLCache[CachedAnswer] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 유사 질문: (언어, 청크 집합) 키 → [(단위 질의 임베딩, 답변)]
+        self._semantic: TTLCache[List[Tuple[array, CachedAnswer]]] = TTLCache(maxsize=maxsize, ttl=ttl)
+        if self.semantic_threshold and embed_fn is None:
+            # retriever와 같은 질의 임베딩 캐시를 공유 → 검색 때 이미 계산한 벡터를 재사용
+            from app.ai.data import query_embedding_cache
+
+            embed_fn = query_embedding_cache.get_vector
+        self._embed = embed_fn
+        self._debug = debug_fn or (lambda _: None)
+
+    @staticmethod
+    def eligible(rag_result, func_results: Sequence[Any] = ()) -> bool:
+        """규정 근거만으로 만든 답변인지 (함수 결과가 섞이면 시간에 민감하므로 제외)
+
+        검색 결과만 보고 판단하므로 요약 전에 조회할 수 있습니다.
+        함수 결과가 아직 없는 시점(검색 직후)에는 func_results를 생략합니다.
+        """
+        return bool(
+            rag_result is not None
+            and rag_result.is_regulation
+            and getattr(rag_result, "content_hash", None)
+            and rag_result.merged_documents_text
+            and not func_results
+        )
+
+    @staticmethod
+    def chunk_key(language: str, rag_result) -> str:
+        chunk_ids = ",".join(sorted(str(cid) for cid in rag_result.chunk_ids))
+        return text_hash(language, chunk_ids, rag_result.content_hash)
+
+    def key_for(self, message: str, language: str, rag_result) -> str:
+        return text_hash(normalize_text(message), self.chunk_key(language, rag_result))
+
+    async def _avector(self, message: str) -> Optional[array]:
+        if not self.semantic_threshold or self._embed is None:
+            return None
+        try:
+            return unit_vector(await run_blocking(self._embed, message))
+        except Exception as exc:
+            self._debug(f"answer_cache: 임베딩 실패 -> {exc}")
+            return None
+
+    async def aget(self, message: str, language: str, rag_result) -> Tuple[Optional[CachedAnswer], Optional[str]]:
+        """(답변, 적중 단계)를 반환합니다. 단계: "exact" | "semantic", 없으면 (None, None)."""
+        if not self.enabled:
+            return None, None
+        cached = self._answers.get(self.key_for(message, language, rag_result))
+        if cached is not None:
+            return cached, "exact"
+
+        vector = await self._avector(message)
+        if vector is None:
+            return None, None
+        best_score, best = 0.0, None
+        for other_vec, answer in self._semantic.get(self.chunk_key(language, rag_result)) or []:
+            score = dot(vector, other_vec)
+            if score > best_score:
+                best_score, best = score, answer
+        if best is None or best_score < self.semantic_threshold:
+            return None, None
+        self._debug(f"answer_cache: semantic hit score={best_score:.3f}")
+        return best, "semantic"
+
+    async def aput(
+        self,
+        message: str,
+        language: str,
+        rag_result,
+        text: str,
+        metadata: Dict[str, Any],
+    ) -> None:
+        if not self.enabled or not text.strip():
+            return
+        answer = CachedAnswer(text=text, metadata=metadata)
+        self._answers.set(self.key_for(message, language, rag_result), answer)
+        vector = await self._avector(message)
+        if vector is not None:
+            group_key = self.chunk_key(language, rag_result)
+            group = (self._semantic.get(group_key) or [])[-15:]
+            self._semantic.set(group_key, group + [(vector, answer)])
+
+    def stats(self) -> Dict[str, int]:
+        return self._answers.stats()
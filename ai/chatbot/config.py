@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import pytz
@@ -33,6 +33,8 @@ model = Model()
 embedding_model = EmbeddingModel()
 api_key = os.getenv("OPENAI_API_KEY")  # 이제 경로와 무관하게 로드됨
 client = OpenAI(api_key=api_key, max_retries=1)
+# 비동기 경로(stream_chat)용 클라이언트: 이벤트 루프를 막지 않음
+async_client = AsyncOpenAI(api_key=api_key, max_retries=1)
 
 def makeup_response(message, finish_reason="ERROR"):
     '''api 응답형식으로 반환해서
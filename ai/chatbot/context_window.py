@@ -0,0 +1,126 @@
+"""
+대화 문맥 토큰 예산 관리
+
+LLM을 호출하기 직전에 입력 문맥이 max_token_size * available_token_rate 토큰을 넘지 않도록
+오래된 대화부터 덜어냅니다. 문맥 앞쪽의 연속된 system 메시지(system 프롬프트, 이전 대화 요약)는
+절대 제거하지 않습니다.
+
+- tiktoken(cl100k_base)으로 토큰 수를 계산 (vector_uploader와 같은 인코딩)
+- 메시지별 토큰 수는 (role, content) 해시로 캐시 → 긴 세션에서도 매 요청 재계산 없음
+- 최근 메시지(pinned_tail)는 보존: 이번 질문과 이번 요청용 지침/검색 결과
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Sequence
+
+import tiktoken
+
+from app.ai.cache import TTLCache, text_hash
+
+# 메시지 하나당 role/구분자 등으로 붙는 대략적인 토큰 수 (OpenAI 가이드 기준)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ContextWindowManager:
+    """토큰 예산 안에 들도록 대화 문맥을 잘라 주는 관리자"""
+
+    def __init__(
+        self,
+        *,
+        max_token_size: int,
+        available_token_rate: float = 0.9,
+        encoding_name: str = "cl100k_base",
+        cache_size: int = 8192,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self.max_token_size = max_token_size
+        self.available_token_rate = available_token_rate
+        self._enc = tiktoken.get_encoding(encoding_name)
+        self._counts: TTLCache[int] = TTLCache(maxsize=cache_size)
+        self._debug = debug_fn or (lambda _: None)
+
+    @property
+    def budget(self) -> int:
+        """문맥에 쓸 수 있는 최대 토큰 수"""
+        return int(self.max_token_size * self.available_token_rate)
+
+    def count_message(self, message: Dict[str, str]) -> int:
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+        key = text_hash(message.get("role", ""), content)
+        cached = self._counts.get(key)
+        if cached is not None:
+            return cached
+        tokens = len(self._enc.encode(content)) + MESSAGE_OVERHEAD_TOKENS
+        self._counts.set(key, tokens)
+        return tokens
+
+    def count(self, messages: Sequence[Dict[str, str]]) -> int:
+        return sum(self.count_message(m) for m in messages)
+
+    @staticmethod
+    def pinned_head(messages: Sequence[Dict[str, str]]) -> int:
+        """앞쪽의 연속된 system 메시지 수 (system 프롬프트 + 대화 요약, 최소 1)"""
+        head = 1
+        while head < len(messages) and messages[head].get("role") == "system":
+            head += 1
+        return head
+
+    def _removable_span(self, messages: Sequence[Dict[str, str]], start: int, stop: int) -> int:
+        """messages[start]부터 제거할 대화 한 턴의 길이 (user 뒤에 붙은 assistant/system까지 함께)"""
+        end = start + 1
+        while end < stop and messages[end].get("role") != "user":
+            end += 1
+        return end - start
+
+    def fit(
+        self,
+        messages: Sequence[Dict[str, str]],
+        *,
+        pinned_tail: int = 1,
+    ) -> List[Dict[str, str]]:
+        """예산에 맞춘 새 리스트를 반환합니다 (원본은 수정하지 않음).
+
+        앞쪽 system 메시지(pinned_head)와 마지막 pinned_tail개 메시지는 항상 남기고,
+        그 사이의 대화를 오래된 턴부터 제거합니다.
+        """
+        result = list(messages)
+        total = self.count(result)
+        if total <= self.budget:
+            return result
+
+        head = self.pinned_head(result)
+        removed = 0
+        while total > self.budget:
+            stop = len(result) - pinned_tail
+            if stop <= head:
+                break
+            span = self._removable_span(result, head, stop)
+            total -= self.count(result[head : head + span])
+            del result[head : head + span]
+            removed += span
+
+        if total > self.budget:
+            self._debug(
+                f"context_window.fit: 고정 메시지만으로 예산 초과 tokens={total} budget={self.budget}"
+            )
+        self._debug(
+            f"context_window.fit: 메시지 {removed}개 제거 -> tokens={total} budget={self.budget}"
+        )
+        return result
+
+    def trim(self, context: List[Dict[str, str]], *, pinned_tail: int = 2) -> int:
+        """보관 중인 대화 문맥을 예산에 맞게 제자리에서 줄이고 제거한 메시지 수를 반환합니다.
+
+        기본값으로 마지막 질문/응답 한 쌍은 남깁니다.
+        """
+        fitted = self.fit(context, pinned_tail=pinned_tail)
+        removed = len(context) - len(fitted)
+        if removed:
+            context[:] = fitted
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"budget": self.budget, **self._counts.stats()}
+
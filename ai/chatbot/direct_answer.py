@@ -0,0 +1,146 @@
+"""
+결정적 도구 답변 빠른 경로 (direct answer)
+
+"오늘 학식 뭐야?" 같은 순수 학식 메뉴 질문은 get_halla_cafeteria_menu 결과가 이미 완성된 답이므로,
+최종 gpt-4.1 스트리밍을 거치지 않고 템플릿으로 바로 답합니다.
+
+- 적용 조건: 라우터가 규칙/로컬 분류기로 학식 함수 하나만 확신(DIRECT_ANSWER_MIN_CONFIDENCE 이상)했고,
+  질문이 메뉴 자체를 묻는 것이며(route["pure_lookup"], 운영시간/가격/위치 질문 제외),
+  RAG 근거와 웹검색 결과가 없고, 학식 함수가 정상 결과를 돌려준 경우
+- 한국어는 템플릿만 사용 (수 ms), 다른 언어는 LLM 번역을 한 번 거치고 (메뉴 본문, 언어) 해시로 캐시
+- 번역에 실패하면 None을 돌려 기존 LLM 경로로 답하게 합니다
+"""
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.ai.cache import TTLCache, text_hash
+from app.ai.chatbot.config import async_client, model
+from app.ai.chatbot.metadata import FunctionCallMetadata
+
+CAFETERIA_TOOL = "get_halla_cafeteria_menu"
+
+# 번역 대상 언어 이름 (stream.LANGUAGE_INSTRUCTIONS와 같은 언어 코드)
+LANGUAGE_NAMES: Dict[str, str] = {
+    "ENG": "English",
+    "VI": "Vietnamese",
+    "JPN": "Japanese",
+    "CHN": "Simplified Chinese",
+    "UZB": "Uzbek",
+    "MNG": "Mongolian",
+    "IDN": "Indonesian",
+}
+
+TRANSLATION_INSTRUCTION = (
+    "Translate the following Korean university cafeteria menu message into {language}. "
+    "Keep the markdown layout, dates, times and URLs unchanged. "
+    "For each dish, give a short natural translation followed by the original Korean name in parentheses. "
+    "Output only the translated message."
+)
+
+_MEAL_LINE_RE = re.compile(r"^\[(조식|중식|석식)\]\s*(.*)$")
+_SOURCE_PREFIX = "추가 사항: 원문:"
+
+
+def render_menu_answer(output: str) -> str:
+    """get_halla_cafeteria_menu 결과 문자열을 답변 템플릿으로 바꿉니다 (형식이 다르면 그대로 반환)."""
+    lines = [line.strip() for line in output.strip().splitlines() if line.strip()]
+    if not lines or not lines[0].startswith("한라대 학생식당 식단"):
+        return output.strip()
+
+    body: List[str] = [f"🍽️ {lines[0]}", ""]
+    source: Optional[str] = None
+    for line in lines[1:]:
+        m = _MEAL_LINE_RE.match(line)
+        if m:
+            body.append(f"- **{m.group(1)}**: {m.group(2) or '정보 없음'}")
+        elif line.startswith(_SOURCE_PREFIX):
+            source = line[len(_SOURCE_PREFIX):].strip()
+        else:
+            body.append(line)
+    if source:
+        body += ["", f"원문: {source}"]
+    return "\n".join(body)
+
+
+class DirectAnswerer:
+    """도구 결과만으로 답이 정해지는 질문에 최종 LLM 호출 없이 답합니다."""
+
+    def __init__(
+        self,
+        *,
+        enabled: Optional[bool] = None,
+        min_confidence: Optional[float] = None,
+        model_name: Optional[str] = None,
+        async_openai_client=async_client,
+        cache_size: int = 512,
+        cache_ttl: float = 24 * 3600,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv("DIRECT_ANSWER", "1") not in ("0", "false", "False")
+        )
+        self.min_confidence = (
+            min_confidence if min_confidence is not None
+            else float(os.getenv("DIRECT_ANSWER_MIN_CONFIDENCE", "0.9"))
+        )
+        self._model_name = model_name or model.advanced
+        self._client = async_openai_client
+        # (메뉴 답변 해시, 언어) → 번역문
+        self._translations: TTLCache[str] = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._debug = debug_fn or (lambda _: None)
+
+    def pick(
+        self,
+        route: Dict[str, Any],
+        func_results: List[FunctionCallMetadata],
+        condensed_rag: Optional[str],
+    ) -> Optional[FunctionCallMetadata]:
+        """빠른 경로를 쓸 수 있으면 답이 될 함수 결과를, 아니면 None을 반환합니다."""
+        if not self.enabled or (condensed_rag and condensed_rag.strip()):
+            return None
+        if route.get("tier") not in ("rule", "model") or route.get("tools") != [CAFETERIA_TOOL]:
+            return None
+        if float(route.get("confidence") or 0.0) < self.min_confidence:
+            return None
+        # "학식 가격 얼마야?"처럼 학식 함수는 필요하지만 메뉴를 묻지 않는 질문은 LLM이 답함
+        if not route.get("pure_lookup"):
+            return None
+        if len(func_results) != 1:
+            return None
+        meta = func_results[0]
+        if meta.name != CAFETERIA_TOOL or meta.status != "ok" or meta.output.strip().startswith("❌"):
+            return None
+        return meta
+
+    async def answer(self, output: str, language: str) -> Tuple[Optional[str], str]:
+        """(답변, 번역 캐시 상태)를 반환합니다. 상태: "skip"(한국어) | "hit" | "miss" | "error"."""
+        rendered = render_menu_answer(output)
+        target = LANGUAGE_NAMES.get(language)
+        if target is None:
+            return rendered, "skip"
+
+        key = text_hash(rendered, language)
+        cached = self._translations.get(key)
+        if cached is not None:
+            return cached, "hit"
+        try:
+            response = await self._client.responses.create(
+                model=self._model_name,
+                input=[
+                    {"role": "system", "content": TRANSLATION_INSTRUCTION.format(language=target)},
+                    {"role": "user", "content": rendered},
+                ],
+                text={"format": {"type": "text"}},
+            )
+            translated = (getattr(response, "output_text", "") or "").strip()
+        except Exception as exc:
+            self._debug(f"direct_answer: 번역 실패 -> {exc}")
+            return None, "error"
+        if not translated:
+            return None, "error"
+        self._translations.set(key, translated)
+        return translated, "miss"
@@ -54,6 +54,15 @@ class RagMetadata:
     condensed_context: Optional[str] = None
     """요약된 컨텍스트 (LLM으로 가공된 버전)"""
 
+    gate_tier: Optional[str] = None
+    """gate 판정 단계
+    - "rule": 키워드/규정 번호 패턴으로 즉시 판정
+    - "cache": 같은 질문의 이전 판정 재사용
+    - "semantic": 비슷한 질문(임베딩 유사도)의 이전 판정 재사용
+    - "llm": LLM 판정
+    - "fallback": LLM 실패로 키워드 판정
+    """
+
     def to_dict(self) -> Dict[str, Any]:
         """JSON 직렬화용 딕셔너리 변환
         
@@ -63,6 +72,7 @@ class RagMetadata:
         return {
             "is_regulation": self.is_regulation,
             "gate_reason": self.gate_reason,
+            "gate_tier": self.gate_tier,
             "context_source": self.context_source,
             "hits_count": self.hits_count,
             "document_count": self.document_count,
@@ -103,6 +113,23 @@ class FunctionCallMetadata:
     False: LLM이 분석하여 호출함
     """
 
+    cache: Optional[Dict[str, str]] = None
+    """단계별 캐시 적중 여부 (웹검색만 기록, 예: {"classifier": "hit", "result": "miss"})
+    
+    값: "hit" | "miss", 캐시를 쓰지 않는 함수는 None
+    """
+
+    status: str = "ok"
+    """실행 상태
+    
+    - "ok": 정상 완료
+    - "timeout": 시간 제한/마감 시간 초과로 취소됨 (output은 안내 메시지인 부분 결과)
+    - "error": 실행 중 예외
+    """
+
+    elapsed: Optional[float] = None
+    """실행 소요 시간(초)"""
+
     def to_dict(self) -> Dict[str, Any]:
         """JSON 직렬화용 딕셔너리 변환
         
@@ -121,8 +148,33 @@ class FunctionCallMetadata:
             "output_length": len(self.output),
             "call_id": self.call_id,
             "is_fallback": self.is_fallback,
+            "cache": self.cache,
+            "status": self.status,
+            "elapsed": self.elapsed,
         }
 
+    def to_event(self, event_type: str) -> Dict[str, Any]:
+        """스트리밍 진행 이벤트(tool_started / tool_finished)용 딕셔너리 변환
+        
+        Args:
+            event_type: "tool_started" 또는 "tool_finished"
+        
+        Returns:
+            이벤트 딕셔너리 (대화 문맥 인자는 제외, 종료 이벤트에는 200자 미리보기 포함)
+        """
+        event: Dict[str, Any] = {
+            "type": event_type,
+            "name": self.name,
+            "call_id": self.call_id,
+            "arguments": {k: v for k, v in self.arguments.items() if k != "chat_context"},
+            "is_fallback": self.is_fallback,
+        }
+        if event_type == "tool_finished":
+            data = self.to_dict()
+            for key in ("output", "output_length", "cache", "status", "elapsed"):
+                event[key] = data[key]
+        return event
+
 
 @dataclass
 class ChatMetadata:
@@ -144,6 +196,39 @@ class ChatMetadata:
     - "empty-or-error": 결과 없음 또는 오류
     - "not-run": 실행 안 함
     """
+
+    gate_tier: Optional[str] = None
+    """gate 판정 단계 (RagMetadata.gate_tier와 같음, 규정 질문이 아니어도 기록)"""
+
+    answer_source: str = "llm"
+    """답변 생성 경로
+    
+    - "llm": 최종 LLM 스트리밍
+    - "direct": 도구 결과 템플릿 (학식 메뉴 빠른 경로, LLM 호출 없음)
+    - "cache": 답변 캐시 재생 (이때 나머지 필드는 처음 답할 때의 값, answer_cache에 적중 정보)
+    """
+
+    tool_route: Dict[str, Any] = field(default_factory=dict)
+    """도구 라우팅 판정
+    
+    - "tier": "rule" (키워드) | "model" (로컬 분류기) | "llm" (LLM 분석)
+    - "confidence": 판정 확신도 (0~1, LLM은 1.0)
+    - "tools": 호출하기로 한 함수 이름 목록
+    - "reason": 판정 근거
+    - "pure_lookup": 학식 메뉴 자체만 묻는 질문인지 (True일 때만 학식 빠른 경로 사용)
+    """
+
+    timings: Dict[str, Any] = field(default_factory=dict)
+    """단계별 소요 시간(초)
+    
+    - "rag": RAG 갈래(검색+요약) {"elapsed", "status"}
+    - "tools": 함수 호출 갈래(분석+실행) {"elapsed", "status"}
+    - "fanout": 두 갈래를 모두 기다린 시간 {"elapsed"}
+    - "answer_cache": 검색 직후 답변 캐시 조회 {"elapsed", "hit": "exact" | "semantic" | None} (적중하면 요약 생략)
+    - "condense": RAG 요약 단계 {"elapsed", "mode": "local" | "llm", "cache": "hit" | "miss"}
+    - "direct_answer": 빠른 경로 {"elapsed", "translation": "skip" | "hit" | "miss"}
+    status는 "ok" | "timeout" | "error"
+    """
     
     def to_dict(self) -> Dict[str, Any]:
         """JSON 직렬화용 딕셔너리 변환
@@ -156,6 +241,10 @@ class ChatMetadata:
             "functions": [f.to_dict() for f in self.functions],
             "functions_count": len(self.functions),
             "web_search_status": self.web_search_status,
+            "gate_tier": self.gate_tier,
+            "tool_route": self.tool_route,
+            "answer_source": self.answer_source,
+            "timings": self.timings,
         }
     
     def add_function(self, func_meta: FunctionCallMetadata) -> None:
@@ -0,0 +1,313 @@
+"""
+대화 세션 저장소
+
+클라이언트가 보낸 session_id 별로 대화 문맥(context)을 분리해 보관합니다.
+하나의 ChatbotStream 인스턴스를 모든 요청이 공유하더라도, 문맥은 세션마다 따로 쌓입니다.
+
+- 프로세스 내 LRU 캐시 + TTL 만료
+- 세션별 상한(메시지 수/글자 수)과 저장소 전체 상한(세션 수/총 글자 수)
+- 백엔드 교체 가능
+    * InMemorySessionBackend: 프로세스 메모리에만 보관 (기본값, 재시작 시 소멸)
+    * MongoSessionBackend: ai/data/mongodb_client 연결을 재사용해 Mongo에 영속화
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.ai.concurrency import run_blocking
+
+# MongoDB에서 세션을 보관하는 컬렉션 이름
+SESSION_COLLECTION_NAME = "chat_sessions"
+
+# 클라이언트가 보낸 session_id 허용 길이 (그 이상이면 새로 발급)
+MAX_SESSION_ID_LENGTH = 128
+
+
+@dataclass
+class ChatSession:
+    """세션 하나의 대화 문맥
+
+    context[0]은 항상 system 프롬프트이며, 이후 user/assistant 메시지가 순서대로 쌓입니다.
+    """
+
+    session_id: str
+    context: List[Dict[str, str]]
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False, compare=False)
+    # 이 세션의 최근 RAG 검색 결과 (RagResult, 디버깅/후속 처리용이며 영속화하지 않음)
+    last_rag_result: Optional[Any] = field(default=None, repr=False, compare=False)
+
+    @property
+    def history(self) -> List[Dict[str, str]]:
+        """system 프롬프트를 제외한 대화 기록"""
+        return self.context[1:]
+
+    def size_chars(self) -> int:
+        """문맥 전체 글자 수 (메모리 상한 계산용)"""
+        return sum(len(m.get("content") or "") for m in self.context)
+
+    @property
+    def summary_version(self) -> int:
+        """이전 대화 요약 버전 (요약이 없으면 0). 요약은 context[1]의 system 메시지로 보관됩니다."""
+        if len(self.context) > 1:
+            return int(self.context[1].get("summary_version") or 0)
+        return 0
+
+
+class SessionBackend:
+    """세션 영속화 백엔드 인터페이스
+
+    SessionStore가 메모리 캐시에서 놓친 세션을 load로 복원하고,
+    응답이 끝날 때마다 save로 대화 기록(system 프롬프트 제외)을 기록합니다.
+    """
+
+    def load(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        raise NotImplementedError
+
+    def save(self, session_id: str, history: List[Dict[str, str]]) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+
+class InMemorySessionBackend(SessionBackend):
+    """프로세스 메모리 백엔드
+
+    별도 저장소가 없으며 SessionStore의 LRU 캐시가 곧 저장소입니다.
+    캐시에서 밀려난 세션은 복원되지 않습니다.
+    """
+
+    def load(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        return None
+
+    def save(self, session_id: str, history: List[Dict[str, str]]) -> None:
+        return None
+
+    def delete(self, session_id: str) -> None:
+        return None
+
+
+class MongoSessionBackend(SessionBackend):
+    """MongoDB 백엔드
+
+    ai/data/mongodb_client의 연결(db)을 재사용합니다.
+    updated_at 필드에 TTL 인덱스를 걸어 오래된 세션은 Mongo가 직접 정리합니다.
+    """
+
+    def __init__(
+        self,
+        mongo_collection=None,
+        *,
+        ttl_seconds: int = 6 * 3600,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self._debug = debug_fn or (lambda _: None)
+        if mongo_collection is None:
+            from app.ai.data.mongodb_client import db
+
+            mongo_collection = db[SESSION_COLLECTION_NAME]
+        self._collection = mongo_collection
+        self._ttl_seconds = ttl_seconds
+        try:
+            self._collection.create_index("updated_at", expireAfterSeconds=ttl_seconds)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            self._debug(f"session.mongo: TTL 인덱스 생성 실패 -> {exc}")
+
+    def load(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        try:
+            doc = self._collection.find_one({"_id": session_id}, {"history": 1, "updated_at": 1})
+        except Exception as exc:
+            self._debug(f"session.mongo: load 실패 session={session_id} -> {exc}")
+            return None
+        if not doc:
+            return None
+        updated_at = doc.get("updated_at")
+        if isinstance(updated_at, datetime):
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            # TTL 인덱스는 주기적으로만 돌기 때문에 만료 여부를 여기서도 확인
+            if datetime.now(timezone.utc) - updated_at > timedelta(seconds=self._ttl_seconds):
+                return None
+        history = doc.get("history")
+        return list(history) if isinstance(history, list) else None
+
+    def save(self, session_id: str, history: List[Dict[str, str]]) -> None:
+        try:
+            self._collection.update_one(
+                {"_id": session_id},
+                {"$set": {"history": history, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+        except Exception as exc:
+            self._debug(f"session.mongo: save 실패 session={session_id} -> {exc}")
+
+    def delete(self, session_id: str) -> None:
+        try:
+            self._collection.delete_one({"_id": session_id})
+        except Exception as exc:
+            self._debug(f"session.mongo: delete 실패 session={session_id} -> {exc}")
+
+
+class SessionStore:
+    """session_id → ChatSession 저장소 (LRU + TTL + 메모리 상한)"""
+
+    def __init__(
+        self,
+        system_role: str,
+        *,
+        backend: SessionBackend | None = None,
+        ttl_seconds: float = 6 * 3600,
+        max_sessions: int = 2000,
+        max_messages_per_session: int = 40,
+        max_chars_per_session: int = 60_000,
+        max_total_chars: int = 30_000_000,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self._system_role = system_role
+        self._backend = backend or InMemorySessionBackend()
+        self._ttl_seconds = ttl_seconds
+        self._max_sessions = max_sessions
+        self._max_messages = max_messages_per_session
+        self._max_chars = max_chars_per_session
+        self._max_total_chars = max_total_chars
+        self._debug = debug_fn or (lambda _: None)
+
+        # 최근 사용 순서를 유지하는 LRU (앞쪽이 가장 오래된 세션)
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        # 세션별 마지막으로 계산된 글자 수 (전체 상한 계산을 O(1)로 유지)
+        self._sizes: Dict[str, int] = {}
+        self._total_chars = 0
+
+    def _new_context(self, history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        return [{"role": "system", "content": self._system_role}] + list(history or [])
+
+    def get_or_create(self, session_id: Optional[str]) -> ChatSession:
+        """세션을 찾아 반환합니다. 없거나 만료되었으면 백엔드에서 복원하거나 새로 만듭니다."""
+        session_id, session = self._lookup(session_id)
+        if session is not None:
+            return session
+        return self._register(session_id, self._backend.load(session_id))
+
+    async def aget_or_create(self, session_id: Optional[str]) -> ChatSession:
+        """get_or_create의 비동기 버전 (백엔드 조회를 공용 스레드 풀로 넘김)."""
+        session_id, session = self._lookup(session_id)
+        if session is not None:
+            return session
+        if isinstance(self._backend, InMemorySessionBackend):
+            history = None
+        else:
+            history = await run_blocking(self._backend.load, session_id)
+            # 조회를 기다리는 동안 같은 세션이 먼저 등록되었을 수 있음
+            existing = self._sessions.get(session_id)
+            if existing is not None:
+                return existing
+        return self._register(session_id, history)
+
+    def save(self, session: ChatSession) -> None:
+        """응답이 끝난 세션을 상한에 맞게 정리한 뒤 백엔드에 기록합니다."""
+        self._commit(session)
+        self._backend.save(session.session_id, session.history)
+        self._enforce_store_limits()
+
+    async def asave(self, session: ChatSession) -> None:
+        """save의 비동기 버전 (백엔드 기록을 공용 스레드 풀로 넘김)."""
+        self._commit(session)
+        if not isinstance(self._backend, InMemorySessionBackend):
+            await run_blocking(self._backend.save, session.session_id, list(session.history))
+        self._enforce_store_limits()
+
+    def _lookup(self, session_id: Optional[str]) -> tuple[str, Optional[ChatSession]]:
+        """만료 세션을 정리하고 캐시에서 세션을 찾습니다. (정규화된 id, 세션 또는 None)"""
+        now = time.time()
+        self._evict_expired(now)
+
+        if not session_id or len(session_id) > MAX_SESSION_ID_LENGTH:
+            session_id = uuid.uuid4().hex
+
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+        return session_id, session
+
+    def _register(self, session_id: str, history: Optional[List[Dict[str, str]]]) -> ChatSession:
+        session = ChatSession(session_id=session_id, context=self._new_context(history))
+        self._debug(
+            f"session.get_or_create: session={session_id} restored={history is not None} messages={len(session.history)}"
+        )
+        self._trim_session(session)
+        self._sessions[session_id] = session
+        self._account(session)
+        self._enforce_store_limits()
+        return session
+
+    def _commit(self, session: ChatSession) -> None:
+        session.last_access = time.time()
+        self._trim_session(session)
+        if session.session_id in self._sessions:
+            self._sessions.move_to_end(session.session_id)
+            self._account(session)
+
+    def delete(self, session_id: str) -> None:
+        self._drop(session_id)
+        self._backend.delete(session_id)
+
+    def _trim_session(self, session: ChatSession) -> None:
+        """세션별 상한을 넘으면 system 프롬프트(와 대화 요약)를 남기고 가장 오래된 대화부터 제거합니다."""
+        ctx = session.context
+        head = 1
+        while head < len(ctx) and ctx[head].get("role") == "system":
+            head += 1
+        removed = 0
+        while len(ctx) > head and (
+            len(ctx) - 1 > self._max_messages or session.size_chars() > self._max_chars
+        ):
+            ctx.pop(head)
+            removed += 1
+        # 대화 기록이 assistant 응답으로 시작하지 않도록 짝을 맞춤
+        while len(ctx) > head and ctx[head].get("role") == "assistant":
+            ctx.pop(head)
+            removed += 1
+        if removed:
+            self._debug(f"session.trim: session={session.session_id} removed={removed} remain={len(ctx) - 1}")
+
+    def _account(self, session: ChatSession) -> None:
+        size = session.size_chars()
+        self._total_chars += size - self._sizes.get(session.session_id, 0)
+        self._sizes[session.session_id] = size
+
+    def _drop(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._total_chars -= self._sizes.pop(session_id, 0)
+
+    def _evict_expired(self, now: float) -> None:
+        # LRU 앞쪽부터 보면 만료된 세션이 먼저 나옵니다.
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_access <= self._ttl_seconds:
+                break
+            self._debug(f"session.evict: ttl session={oldest_id}")
+            self._drop(oldest_id)
+
+    def _enforce_store_limits(self) -> None:
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self._max_sessions or self._total_chars > self._max_total_chars
+        ):
+            oldest_id = next(iter(self._sessions))
+            self._debug(f"session.evict: lru session={oldest_id} total_chars={self._total_chars}")
+            self._drop(oldest_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def total_chars(self) -> int:
+        return self._total_chars
@@ -1,14 +1,41 @@
-import math
+import asyncio
 import os
 import json
-from typing import Any, Dict, List, Optional, AsyncGenerator
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 # 새로운 import 경로
-from app.ai.chatbot.config import model, client
+from app.ai.cache import TTLCache, normalize_text, text_hash
+from app.ai.chatbot.config import model, client, async_client
+from app.ai.chatbot.answer_cache import AnswerCache, CachedAnswer
+from app.ai.chatbot.context_window import ContextWindowManager
+from app.ai.chatbot.direct_answer import DirectAnswerer
 from app.ai.chatbot.metadata import FunctionCallMetadata, RagMetadata, ChatMetadata
+from app.ai.chatbot.session import ChatSession
+from app.ai.chatbot.summarizer import ConversationSummarizer
 from app.ai.functions import FunctionCalling, tools
+from app.ai.functions.router import (
+    CAFETERIA_STRONG_KEYWORDS,
+    CAFETERIA_WEAK_KEYWORDS,
+    ToolRouter,
+    cafeteria_arguments,
+)
+from app.ai.rag.condenser import CondenseRouter, ExtractiveCondenser
+from app.ai.rag.gate import rule_decide
 from app.ai.rag.service import RagService
 
+# 언어별 응답 지침 (대화 문맥에는 남기지 않고 이번 요청에만 붙임)
+LANGUAGE_INSTRUCTIONS: Dict[str, str] = {
+    "KOR": "한국어로 정중하고 따뜻하게 답해주세요.",
+    "ENG": "Please respond kindly in English.",
+    "VI": "Vui lòng trả lời bằng tiếng Việt một cách nhẹ nhàng.",
+    "JPN": "日本語で丁寧に温かく答えてください。",
+    "CHN": "请用中文亲切地回答。",
+    "UZB": "Iltimos, o'zbek tilida samimiy va hurmat bilan javob bering.",
+    "MNG": "Монгол хэлээр эелдэг, дулаахан хариулна уу.",
+    "IDN": "Tolong jawab dengan ramah dan hangat dalam bahasa Indonesia."
+}
+
 class ChatbotStream:
     def __init__(self, model,system_role,instruction,**kwargs):
         """
@@ -29,35 +56,103 @@ class ChatbotStream:
 
         self.max_token_size = 16 * 1024 #최대 토큰이상을 쓰면 오류가발생 따라서 토큰 용량관리가 필요.
         self.available_token_rate = 0.9#최대토큰의 90%만 쓰겠다.
+        # LLM 호출 직전마다 max_token_size * available_token_rate 토큰 안으로 문맥을 맞춤
+        self.context_window = ContextWindowManager(
+            max_token_size=self.max_token_size,
+            available_token_rate=self.available_token_rate,
+            debug_fn=self._dbg,
+        )
+        # 대화가 토큰 기준선을 넘으면 오래된 턴을 누적 요약으로 접음 (응답 후 백그라운드, CHAT_SUMMARY=0 이면 끔)
+        self.summarizer: Optional[ConversationSummarizer] = None
+        if os.getenv("CHAT_SUMMARY", "1") not in ("0", "false", "False"):
+            self.summarizer = ConversationSummarizer(
+                context_window=self.context_window, debug_fn=self._dbg
+            )
+        # 요약이 적용된 세션을 저장소에 다시 기록하는 함수 (예: SessionStore.asave, 없으면 메모리에만 반영)
+        self.session_saver: Optional[Callable[[ChatSession], Awaitable[None]]] = None
 
         # 디버그 플래그 (환경변수 RAG_DEBUG로 제어: 기본 활성화)
         self.debug = os.getenv("RAG_DEBUG", "1") not in ("0", "false", "False")
 
         # Phase 2: 모듈형 RAG 서비스 인스턴스화
         self.rag_service = RagService(debug_fn=self._dbg)
-        self._last_rag_result = None
-        self._last_web_status: Optional[str] = None
+        # 이 인스턴스는 모든 요청이 공유하므로 요청별 결과(RAG 결과, 웹검색 상태)는 인스턴스에 두지 않음
+        # (최근 RAG 결과는 ChatSession.last_rag_result에 세션별로 보관)
         
         # Phase 2: 함수 호출 관련 인스턴스화
         self.func_calling = FunctionCalling(model=model)
         self.tools = tools
         self.available_functions = self.func_calling.available_functions if hasattr(self.func_calling, 'available_functions') else {}
 
+        # 도구 라우팅: 규칙 → (선택) 로컬 분류기 → LLM 분석 순서 (ROUTER_MODE=llm 이면 항상 LLM)
+        self.tool_router = ToolRouter(
+            analyze_fn=self.func_calling.aanalyze,
+            tools=self.tools,
+            regulation_fn=self._is_regulation_by_rule,
+            debug_fn=self._dbg,
+        )
+
+        # fan-out 갈래별 시간 제한(초): 넘기면 해당 갈래는 취소되고 결과 없이 진행
+        self.rag_branch_timeout = float(os.getenv("RAG_BRANCH_TIMEOUT", "45"))
+        self.tools_branch_timeout = float(os.getenv("TOOLS_BRANCH_TIMEOUT", "40"))
+
+        # 함수 동시 실행: 동시 실행 수, 함수별 시간 제한(초), 전체 마감 시간(초)
+        # 마감 시간은 tools 갈래 제한보다 짧게 두어, 느린 함수만 취소하고 나머지 결과는 살림
+        self.tools_max_concurrency = int(os.getenv("TOOLS_MAX_CONCURRENCY", "4"))
+        self.tools_deadline = float(os.getenv("TOOLS_DEADLINE", "35"))
+        self.tool_default_timeout = float(os.getenv("TOOL_TIMEOUT", "20"))
+        self.tool_timeouts: Dict[str, float] = {
+            "search_internet": float(os.getenv("TOOL_TIMEOUT_SEARCH_INTERNET", "30")),
+            "get_halla_cafeteria_menu": float(os.getenv("TOOL_TIMEOUT_CAFETERIA", "10")),
+        }
+
+        # progressive 모드: status 이벤트(gate/retrieval/condense)를 먼저 내보내고
+        # LLM 요약을 스트리밍으로 받아 넓은 맥락 재시도를 조기에 결정합니다. (RAG_PROGRESSIVE=0 이면 끔)
+        self.progressive = os.getenv("RAG_PROGRESSIVE", "1") not in ("0", "false", "False")
+
+        # 함수가 끝날 때마다 tool_started / tool_finished 이벤트를 바로 전송 (TOOL_EVENTS=0 이면 끔)
+        self.tool_events = os.getenv("TOOL_EVENTS", "1") not in ("0", "false", "False")
+
+        # 빠른 경로: 학식 메뉴만 묻는 질문은 최종 LLM 호출 없이 템플릿으로 답함 (DIRECT_ANSWER=0 이면 끔)
+        self.direct_answerer = DirectAnswerer(debug_fn=self._dbg)
+
+        # 규정 질문 답변 캐시: (질문, 언어, 청크 집합, 본문 해시) → 최종 답변 (ANSWER_CACHE=0 이면 끔)
+        self.answer_cache = AnswerCache(debug_fn=self._dbg)
+
+        # RAG 요약 경로: RAG_CONDENSE_MODE=llm(기본, 품질 모드) | local(추출형) | auto(길이로 선택)
+        self.condense_router = CondenseRouter()
+        self.local_condenser = ExtractiveCondenser(debug_fn=self._dbg)
+
+        # RAG 요약 캐시: (정규화된 질문, 청크 ID 집합, 본문 해시) → 요약 컨텍스트
+        # 본문 해시가 키에 포함되므로 규정 재적재 후에는 자연히 새로 요약합니다.
+        self.condense_cache: TTLCache[str] = TTLCache(
+            maxsize=int(os.getenv("CONDENSE_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("CONDENSE_CACHE_TTL", str(24 * 3600))),
+        )
+
+    @staticmethod
+    def _is_regulation_by_rule(message: str) -> bool:
+        decision = rule_decide(message)
+        return decision is not None and decision.is_regulation
+
     def _dbg(self, msg: str):
         """작은 디버그 헬퍼: RAG 관련 내부 상태를 보기 쉽게 출력."""
         if self.debug:
             print(f"[RAG-DEBUG] {msg}")
 
-    def add_user_message_in_context(self, message: str):
+    def add_user_message_in_context(self, message: str, context: Optional[List[Dict[str, str]]] = None):
         """
         사용자 메시지 추가:
           - 사용자가 입력한 message를 context에 user 역할로 추가
+          - context를 지정하면(세션 문맥) 해당 리스트에 추가
         """
         assistant_message = {
             "role": "user",
             "content": message,
         }
-        if self.current_field == "main":
+        if context is not None:
+            context.append(assistant_message)
+        elif self.current_field == "main":
             self.context.append(assistant_message)
 
     #전송부
@@ -67,7 +162,7 @@ class ChatbotStream:
 
         if temp_context is None:
            current_context = self.get_current_context()
-           openai_context = self.to_openai_context(current_context)
+           openai_context = self.to_openai_context(self.context_window.fit(current_context))
            stream = client.responses.create(
             model=self.model,
             input=openai_context,  
@@ -83,7 +178,7 @@ class ChatbotStream:
         else:  
            stream = client.responses.create(
             model=self.model,
-            input=temp_context,  # user/assistant 역할 포함된 list 구조
+            input=self.context_window.fit(temp_context),  # user/assistant 역할 포함된 list 구조
             top_p=1,
             stream=True,
             text={
@@ -150,19 +245,20 @@ class ChatbotStream:
         }
         self.context.append(response_message)
 
-    def add_response_stream(self, response):
+    def add_response_stream(self, response, context: Optional[List[Dict[str, str]]] = None):
             """
                 챗봇 응답을 현재 대화방의 문맥에 추가합니다.
                 
                 Args:
                     response (str): 챗봇이 생성한 응답 텍스트.
+                    context: 세션 문맥 (없으면 self.context)
                 """
             assistant_message = {
             "role": "assistant",
             "content": response,
            
         }
-            self.context.append(assistant_message)
+            (self.context if context is None else context).append(assistant_message)
 
     def get_response(self, response_text: str):
         """
@@ -184,14 +280,13 @@ class ChatbotStream:
                 self.context[idx]["content"]=self.context[idx]['content'].split('instruction:\n')[0].strip()
                 break
 #질의응답 토큰 관리
-    def handle_token_limit(self, response):
+    def handle_token_limit(self, response=None, context: Optional[List[Dict[str, str]]] = None):
         # 누적 토큰 수가 임계점을 넘지 않도록 제어한다.
+        # 응답의 usage 대신 context_window가 tiktoken으로 직접 세어 오래된 대화부터 제거한다. (system 프롬프트는 유지)
         try:
-            current_usage_rate = response['usage']['total_tokens'] / self.max_token_size
-            exceeded_token_rate = current_usage_rate - self.available_token_rate
-            if exceeded_token_rate > 0:
-                remove_size = math.ceil(len(self.context) / 10)
-                self.context = [self.context[0]] + self.context[remove_size+1:]
+            removed = self.context_window.trim(self.context if context is None else context)
+            if removed:
+                self._dbg(f"handle_token_limit: 오래된 메시지 {removed}개 제거")
         except Exception as e:
             print(f"handle_token_limit exception:{e}")
             
@@ -205,13 +300,8 @@ class ChatbotStream:
     def get_rag_context(self, user_question: str):
         """RAG 컨텍스트만 준비하여 반환 (없으면 None). 여기서부터 사용자 메시지는 질문으로 취급."""
         result = self.rag_service.retrieve_context(user_question)
-        self._last_rag_result = result
         return result.merged_documents_text
 
-    @property
-    def last_rag_result(self):
-        """최근 RAG 검색 결과를 노출합니다 (없으면 None)."""
-        return self._last_rag_result or self.rag_service.last_result
     def get_response_from_db_only(self, user_question: str):
         self._dbg("get_response_from_db_only: start")
         rag_result = self.rag_service.retrieve_context(user_question)
@@ -246,19 +336,37 @@ class ChatbotStream:
         Returns:
             str: 해당 언어에 맞는 응답 지침
         """
-        instruction_map = {
-            "KOR": "한국어로 정중하고 따뜻하게 답해주세요.",
-            "ENG": "Please respond kindly in English.",
-            "VI": "Vui lòng trả lời bằng tiếng Việt một cách nhẹ nhàng.",
-            "JPN": "日本語で丁寧に温かく答えてください。",
-            "CHN": "请用中文亲切地回答。",
-            "UZB": "Iltimos, o'zbek tilida samimiy va hurmat bilan javob bering.",
-            "MNG": "Монгол хэлээр эелдэг, дулаахан хариулна уу.",
-            "IDN": "Tolong jawab dengan ramah dan hangat dalam bahasa Indonesia."
-        }
-        return instruction_map.get(language, instruction_map["KOR"])
+        return LANGUAGE_INSTRUCTIONS.get(language, LANGUAGE_INSTRUCTIONS["KOR"])
 
-    async def _condense_rag_context(self, user_question: str, raw_context: str) -> str:
+    @staticmethod
+    def _strip_language_instructions(context: List[Dict[str, str]]) -> None:
+        """예전 방식으로 user 메시지 끝에 영구히 붙어 있던 언어 지침을 제거합니다 (복원된 세션 호환)."""
+        for msg in context:
+            if msg.get("role") != "user":
+                continue
+            content = msg.get("content") or ""
+            for instruction in LANGUAGE_INSTRUCTIONS.values():
+                if content.endswith(" " + instruction):
+                    msg["content"] = content[: -len(instruction) - 1]
+                    break
+
+    @staticmethod
+    def _apply_language_instruction(
+        final_context: List[Dict[str, str]], language_instruction: str
+    ) -> None:
+        """이번 요청에 보낼 문맥 사본의 마지막 user 메시지에만 언어 지침을 붙입니다."""
+        for msg in reversed(final_context):
+            if msg.get("role") == "user":
+                msg["content"] = f"{msg.get('content') or ''} {language_instruction}"
+                return
+
+    async def _condense_rag_context(
+        self,
+        user_question: str,
+        raw_context: str,
+        cache_key: Optional[str] = None,
+        emit: Optional[Callable[..., None]] = None,
+    ) -> str:
         """
         긴 RAG 컨텍스트를 사용자 질문에 맞게 요약
         
@@ -269,6 +377,11 @@ class ChatbotStream:
         Args:
             user_question: 사용자 질문
             raw_context: 원본 RAG 컨텍스트
+            cache_key: 지정하면 요약 성공 시 condense_cache에 저장 (실패 fallback은 저장하지 않음)
+            emit: progressive 모드에서 status 이벤트를 내보내는 콜백
+        
+        progressive 모드에서는 1차 요약을 스트리밍으로 받으며, 누적 줄/글자 수로
+        "너무 짧음"이 보이면 1차가 끝나기 전에 2차(넓은 맥락) 요약을 미리 시작합니다.
         
         Returns:
             str: 요약된 컨텍스트 (실패 시 원본 일부 반환)
@@ -314,25 +427,11 @@ class ChatbotStream:
             }
         ]
         
-        self._dbg("[CONDENSE] 1차 요약 시도 중...")
-
-        try:
-            condensed = client.responses.create(
-                model=self.model,
-                input=condense_prompt,
-                text={"format": {"type": "text"}},
-            ).output_text.strip()
-            
-            self._dbg(f"[CONDENSE] 1차 결과 - 길이: {len(condensed)}자, 줄 수: {condensed.count(chr(10))}줄")
-            
-            # 결과가 지나치게 짧으면(줄 수<15 또는 길이<1000자) 넓은 맥락 재시도
-            if (condensed.count("\n") < 15) or (len(condensed) < 1000):
-                self._dbg("[CONDENSE] 1차 결과 너무 짧음 -> 2차 시도 (넓은 맥락)")
-                broader_prompt = [
-                    {
-                        "role": "system",
-                        "content": (
-                                                    f"""
+        broader_prompt = [
+            {
+                "role": "system",
+                "content": (
+                                            f"""
                         당신은 사용자 질문과 관련된 표/번호조항/주석의 전체 맥락을 넓게 포함해 추출합니다.
                         반드시 다음을 지키세요:
                         - <반영>...</반영> 안에 헤더(표 제목/열 머리말) + 관련 행/항 전부와 해당 주석(주)까지 포함.
@@ -341,16 +440,45 @@ class ChatbotStream:
                         원문: <기억검색>{sanitized_rag}</기억검색>
                         질문: {user_question}
                         """
-                        ),
-                    }
-                ]
+                ),
+            }
+        ]
+
+        broader_task: Optional[asyncio.Task] = None
+
+        def _start_broader(reason: str) -> None:
+            nonlocal broader_task
+            if broader_task is None:
+                self._dbg(f"[CONDENSE] 2차 시도 시작 (넓은 맥락) - {reason}")
+                if emit:
+                    emit("condense", "retry", reason=reason)
+                broader_task = asyncio.create_task(self._request_condense(broader_prompt))
+                # 취소된 추측 실행의 예외가 "never retrieved" 경고로 남지 않도록 회수
+                broader_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        def _on_progress(partial: str) -> None:
+            # 블록이 닫혔는데 아직 짧으면 최종 결과도 짧을 가능성이 높으므로 2차를 미리 시작
+            if broader_task is None and "</반영>" in partial and self._condense_too_short(partial):
+                _start_broader(
+                    f"스트리밍 중 조기 판단 (줄 {partial.count(chr(10))}, {len(partial)}자)"
+                )
+
+        self._dbg("[CONDENSE] 1차 요약 시도 중...")
+
+        try:
+            if self.progressive:
+                condensed = await self._request_condense_stream(condense_prompt, _on_progress)
+            else:
+                condensed = await self._request_condense(condense_prompt)
+            
+            self._dbg(f"[CONDENSE] 1차 결과 - 길이: {len(condensed)}자, 줄 수: {condensed.count(chr(10))}줄")
+            
+            # 결과가 지나치게 짧으면(줄 수<15 또는 길이<1000자) 넓은 맥락 재시도
+            if self._condense_too_short(condensed):
+                _start_broader("1차 결과 너무 짧음")
                 try:
-                    self._dbg("[CONDENSE] 2차 요약 시도 중...")
-                    condensed2 = client.responses.create(
-                        model=self.model,
-                        input=broader_prompt,
-                        text={"format": {"type": "text"}},
-                    ).output_text.strip()
+                    self._dbg("[CONDENSE] 2차 결과 대기 중...")
+                    condensed2 = await broader_task
                     
                     self._dbg(f"[CONDENSE] 2차 결과 - 길이: {len(condensed2)}자, 줄 수: {condensed2.count(chr(10))}줄")
                     
@@ -362,22 +490,67 @@ class ChatbotStream:
                         self._dbg("[CONDENSE] 1차 결과 유지")
                 except Exception as e2:
                     self._dbg(f"[CONDENSE] 2차 시도 실패: {e2}")
+            elif broader_task is not None:
+                # 조기 판단과 달리 1차 결과가 충분함 → 미리 시작한 2차 취소
+                self._dbg("[CONDENSE] 1차 결과 충분 -> 미리 시작한 2차 취소")
+                broader_task.cancel()
                     
             self._dbg(f"[CONDENSE] 최종 결과 - 길이: {len(condensed)}자")
+            if cache_key and condensed:
+                self.condense_cache.set(cache_key, condensed)
             return condensed
             
         except Exception as e:
+            if broader_task is not None and not broader_task.done():
+                broader_task.cancel()
             # 요약 실패 시 원문을 짧게 잘라 사용
             self._dbg(f"[CONDENSE] 문서 요약 실패: {e}")
             fallback = sanitized_rag[:6000]
             self._dbg(f"[CONDENSE] Fallback 사용 - 길이: {len(fallback)}자")
             return fallback
 
+    @staticmethod
+    def _condense_too_short(text: str) -> bool:
+        """요약 결과가 넓은 맥락 재시도가 필요할 만큼 짧은지 (줄 수<15 또는 길이<1000자)"""
+        return (text.count("\n") < 15) or (len(text) < 1000)
+
+    async def _request_condense(self, prompt: List[Dict[str, str]]) -> str:
+        """요약 요청 1회 (전체 응답을 한 번에 받음)"""
+        return (await async_client.responses.create(
+            model=self.model,
+            input=prompt,
+            text={"format": {"type": "text"}},
+        )).output_text.strip()
+
+    async def _request_condense_stream(
+        self,
+        prompt: List[Dict[str, str]],
+        on_progress: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """요약 요청 1회 (스트리밍). 델타가 올 때마다 누적 텍스트로 on_progress를 호출합니다."""
+        stream = await async_client.responses.create(
+            model=self.model,
+            input=prompt,
+            stream=True,
+            text={"format": {"type": "text"}},
+        )
+        parts: List[str] = []
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                parts.append(event.delta)
+                # 태그가 닫히는 델타에서만 누적 텍스트를 확인 (매 델타마다 join하지 않도록)
+                if on_progress is not None and ">" in event.delta:
+                    on_progress("".join(parts))
+            elif event.type in ("response.failed", "error"):
+                raise RuntimeError(f"condense stream failed: {event.type}")
+        return "".join(parts).strip()
+
     def _build_final_context(
         self,
         message: str,
         condensed_rag: Optional[str],
         func_results: List[FunctionCallMetadata],
+        context: Optional[List[Dict[str, str]]] = None,
     ) -> List[Dict[str, str]]:
         """최종 LLM 입력 컨텍스트를 구성합니다.
 
@@ -388,12 +561,13 @@ class ChatbotStream:
             message: 현재 사용자 질문.
             condensed_rag: LLM으로 가공된 기억검색 요약 문자열. 없으면 None.
             func_results: 함수 호출 메타데이터 목록.
+            context: 세션 대화문맥. 없으면 self.context 사용.
 
         Returns:
             OpenAI Responses API에 전달할 컨텍스트 리스트.
         """
 
-        base_context = self.to_openai_context(self.context[:])
+        base_context = self.to_openai_context((self.context if context is None else context)[:])
         has_rag = bool(condensed_rag and condensed_rag.strip())
         has_funcs = bool(func_results)
 
@@ -518,7 +692,6 @@ class ChatbotStream:
 
         # 추가 정보가 없으면 원본 컨텍스트 사용
         if not (has_rag or has_funcs):
-            self._last_web_status = web_status
             return base_context
 
         base_context.append({
@@ -526,30 +699,40 @@ class ChatbotStream:
             "content": "\n\n".join(sections),
         })
 
-        self._last_web_status = web_status
         return base_context
 
     async def _analyze_and_execute_functions(
         self, 
-        message: str
+        message: str,
+        context: Optional[List[Dict[str, str]]] = None,
+        route_info: Optional[Dict[str, Any]] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
     ) -> List[FunctionCallMetadata]:
         """함수 호출 분석 및 실행
         
-        1) FunctionCalling.analyze()로 필요한 함수 파악
-        2) 각 함수 실행
-        3) 학식 키워드 기반 fallback 호출(규칙 기반) 포함
+        1) ToolRouter로 필요한 함수 파악 (규칙/로컬 분류기로 확실하지 않을 때만 LLM 분석)
+        2) 학식 키워드 기반 fallback 호출(규칙 기반) 추가
+        3) 모든 함수를 동시에 실행 (함수별 시간 제한, 마감 시간을 넘긴 함수는 취소 후 timeout 표시)
         4) 결과를 FunctionCallMetadata 리스트로 직렬화하여 반환
         
         Args:
             message: 사용자 메시지
+            context: 세션 대화문맥 (웹검색 문맥 보강용, 없으면 self.context)
+            route_info: 라우팅 판정(tier/confidence/tools)을 기록할 딕셔너리 (metadata.tool_route)
+            on_event: 함수마다 시작/종료 시 tool_started / tool_finished 이벤트를 받을 콜백
             
         Returns:
             함수 호출 메타데이터 목록
         """
+        if context is None:
+            context = self.context
         func_results: List[FunctionCallMetadata] = []
         
-        # 1) 함수 분석 및 실행
-        analyzed = self.func_calling.analyze(message, self.tools)
+        # 1) 함수 분석: 실행할 호출 목록을 먼저 모은 뒤 한꺼번에 동시 실행
+        decision = await self.tool_router.aroute(message)
+        if route_info is not None:
+            route_info.update(decision.to_dict())
+        analyzed = decision.calls
         
         for tool_call in analyzed:
             if getattr(tool_call, "type", None) != "function_call":
@@ -575,87 +758,127 @@ class ChatbotStream:
                 self._dbg(f"[FUNCTION] 미등록 함수: {func_name}")
                 continue
             
-            # 함수 실행
-            try:
-                # 안전 기본값 보강
-                if func_name == "search_internet":
-                    func_args.setdefault("chat_context", self.context[:])
-                elif func_name == "get_halla_cafeteria_menu":
-                    func_args.setdefault("date", "오늘")
-                    # meal은 지정하지 않으면 전체 끼니 반환
-                
-                output = func(**func_args)
-                
-                # 메타데이터 생성
-                func_results.append(FunctionCallMetadata(
-                    name=func_name,
-                    arguments=func_args,
-                    output=str(output),
-                    call_id=call_id,
-                    is_fallback=False
-                ))
-                
-            except Exception as exc:
-                self._dbg(f"[FUNCTION] {func_name} 실행 실패: {exc}")
-                # 실패해도 메타데이터는 기록 (에러 메시지 포함)
-                func_results.append(FunctionCallMetadata(
-                    name=func_name,
-                    arguments=func_args,
-                    output=f"❌ 실행 오류: {str(exc)}",
-                    call_id=call_id,
-                    is_fallback=False
-                ))
+            # 안전 기본값 보강
+            if func_name == "search_internet":
+                func_args.setdefault("chat_context", context[:])
+            elif func_name == "get_halla_cafeteria_menu":
+                func_args.setdefault("date", "오늘")
+                # meal은 지정하지 않으면 전체 끼니 반환
+            
+            func_results.append(FunctionCallMetadata(
+                name=func_name,
+                arguments=func_args,
+                output="",
+                call_id=call_id,
+                is_fallback=False,
+            ))
         
-        # 2) 학식 보강 Fallback
+        # 2) 학식 보강 Fallback (다른 함수와 함께 동시에 실행)
         lowered = message.lower()
-        cafeteria_keywords = any(k in lowered for k in ["학식", "식단", "점심", "저녁", "메뉴", "조식", "석식", "아침", "오늘 메뉴", "밥 뭐"])
+        cafeteria_keywords = any(k in lowered for k in CAFETERIA_STRONG_KEYWORDS + CAFETERIA_WEAK_KEYWORDS)
         already_called_cafeteria = any(meta.name == "get_halla_cafeteria_menu" for meta in func_results)
         
         if cafeteria_keywords and not already_called_cafeteria:
-            try:
+            if "get_halla_cafeteria_menu" in self.available_functions:
                 self._dbg("[FUNCTION] Cafeteria fallback engaged")
-                
-                # 끼니 추출
-                meal_pref = None
-                if any(x in lowered for x in ["조식", "아침"]):
-                    meal_pref = "조식"
-                elif any(x in lowered for x in ["석식", "저녁"]):
-                    meal_pref = "석식"
-                elif "점심" in lowered or "중식" in lowered:
-                    meal_pref = "중식"
-                
-                # 날짜 추출
-                date_pref = "오늘"
-                if "내일" in lowered:
-                    date_pref = "내일"
-                else:
-                    import re
-                    m = re.search(r"(\d{4}[./-]\d{1,2}[./-]\d{1,2})", message)
-                    if m:
-                        date_pref = m.group(1)
-                
-                caf_args = {"date": date_pref, "meal": meal_pref}
-                get_cafeteria_fn = self.available_functions.get("get_halla_cafeteria_menu")
-                
-                if not get_cafeteria_fn:
-                    raise RuntimeError("get_halla_cafeteria_menu not registered")
-                
-                caf_out = get_cafeteria_fn(**caf_args)
-                
-                # Fallback 메타데이터 추가
+                # 날짜/끼니 추출 (ToolRouter 규칙과 같은 기준)
                 func_results.append(FunctionCallMetadata(
                     name="get_halla_cafeteria_menu",
-                    arguments=caf_args,
-                    output=str(caf_out),
+                    arguments=cafeteria_arguments(message),
+                    output="",
                     call_id="cafeteria_auto",
                     is_fallback=True
                 ))
-                
-            except Exception as e:
-                self._dbg(f"[FUNCTION] 학식 fallback 실패: {e}")
+            else:
+                self._dbg("[FUNCTION] 학식 fallback 실패: get_halla_cafeteria_menu not registered")
         
+        # 3) 실행: 전체 소요 시간은 가장 느린 함수 기준 (마감 시간을 넘긴 함수는 취소)
+        await self._execute_tools(func_results, on_event=on_event)
         return func_results
 
+    def _tool_timeout(self, func_name: str) -> float:
+        return self.tool_timeouts.get(func_name, self.tool_default_timeout)
+
+    async def _execute_tool(
+        self,
+        meta: FunctionCallMetadata,
+        semaphore: asyncio.Semaphore,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        started: Optional[Set[int]] = None,
+    ) -> None:
+        """함수 하나를 시간 제한과 함께 실행하고 결과/상태를 meta에 기록합니다.
+
+        started를 주면 세마포어를 얻어 실제로 시작한 함수의 id(meta)를 기록합니다.
+        """
+        async with semaphore:
+            if started is not None:
+                started.add(id(meta))
+            if on_event is not None:
+                on_event(meta.to_event("tool_started"))
+            start = time.perf_counter()
+            timeout = self._tool_timeout(meta.name)
+            try:
+                result = await asyncio.wait_for(
+                    self.func_calling.aexecute(meta.name, **meta.arguments), timeout
+                )
+                meta.output = result.output
+                meta.cache = result.cache
+            except asyncio.TimeoutError:
+                self._dbg(f"[FUNCTION] {meta.name} 시간 초과({timeout}s) → 취소")
+                meta.output = f"❌ 시간 초과: {timeout:g}초 안에 결과를 받지 못했습니다."
+                meta.status = "timeout"
+            except Exception as exc:
+                self._dbg(f"[FUNCTION] {meta.name} 실행 실패: {exc}")
+                # 실패해도 메타데이터는 기록 (에러 메시지 포함)
+                meta.output = f"❌ 실행 오류: {str(exc)}"
+                meta.status = "error"
+            meta.elapsed = round(time.perf_counter() - start, 3)
+            if on_event is not None:
+                on_event(meta.to_event("tool_finished"))
+
+    async def _execute_tools(
+        self,
+        func_results: List[FunctionCallMetadata],
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        """함수 호출들을 동시에 실행합니다.
+
+        - 동시 실행 수는 tools_max_concurrency로 제한
+        - 함수별 시간 제한(tool_timeouts)과 전체 마감 시간(tools_deadline)을 넘기면 취소하고
+          status="timeout"으로 표시한 부분 결과를 남깁니다 (나머지 함수 결과는 그대로 사용)
+        - 세마포어를 기다리다 마감된 함수는 tool_started를 보낸 적이 없으므로 tool_finished도 보내지 않음
+        """
+        if not func_results:
+            return
+        semaphore = asyncio.Semaphore(self.tools_max_concurrency)
+        start = time.perf_counter()
+        started: Set[int] = set()
+        tasks = [
+            asyncio.ensure_future(self._execute_tool(meta, semaphore, on_event, started))
+            for meta in func_results
+        ]
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=self.tools_deadline)
+        finally:
+            # 마감 시간 초과 또는 상위 갈래 취소 시 남은 함수 취소
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        for meta, task in zip(func_results, tasks):
+            if task in pending:
+                self._dbg(f"[FUNCTION] {meta.name} 마감 시간({self.tools_deadline}s) 초과 → 취소")
+                meta.output = f"❌ 시간 초과: 응답 마감 시간({self.tools_deadline:g}초)까지 결과를 받지 못했습니다."
+                meta.status = "timeout"
+                meta.elapsed = round(time.perf_counter() - start, 3)
+                if on_event is not None and id(meta) in started:
+                    on_event(meta.to_event("tool_finished"))
+        self._dbg(
+            f"[FUNCTION] 동시 실행 완료 elapsed={time.perf_counter() - start:.2f}s "
+            f"results={[(m.name, m.status, m.elapsed) for m in func_results]}"
+        )
+
     async def _stream_openai_response(
         self, 
         context: List[Dict[str, str]]
@@ -675,7 +898,7 @@ class ChatbotStream:
         completed_text = ""
         
         try:
-            stream = client.responses.create(
+            stream = await async_client.responses.create(
                 model=self.model,
                 input=context,
                 top_p=1,
@@ -683,7 +906,7 @@ class ChatbotStream:
                 text={"format": {"type": "text"}}
             )
             
-            for event in stream:
+            async for event in stream:
                 if event.type == "response.output_text.delta":
                     # 델타 이벤트 - 실시간 텍스트 청크
                     yield {
@@ -721,10 +944,210 @@ class ChatbotStream:
                 "message": f"스트리밍 중 에러 발생: {str(e)}"
             }
 
+    async def _run_branch(
+        self,
+        name: str,
+        coro,
+        *,
+        timeout: Optional[float],
+        timings: Dict[str, Any],
+        default: Any,
+    ) -> Any:
+        """fan-out 갈래 하나를 시간 제한과 함께 실행하고 소요 시간을 기록합니다.
+
+        제한 시간을 넘기면 해당 갈래를 취소하고 default를 반환합니다.
+        예외가 나도 다른 갈래에 영향을 주지 않도록 default로 대체합니다.
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            result = await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            self._dbg(f"[FANOUT] {name} 갈래 시간 초과({timeout}s) → 취소")
+            status = "timeout"
+            result = default
+        except Exception as exc:
+            self._dbg(f"[FANOUT] {name} 갈래 실패: {exc}")
+            status = "error"
+            result = default
+        timings[name] = {"elapsed": round(time.perf_counter() - start, 3), "status": status}
+        return result
+
+    def _condense_cache_key(self, message: str, rag_result) -> Optional[str]:
+        """요약 캐시 키: 정규화된 질문 + 정렬된 청크 ID 집합 + 본문 해시"""
+        if not getattr(rag_result, "content_hash", None):
+            return None
+        chunk_ids = ",".join(sorted(str(cid) for cid in rag_result.chunk_ids))
+        return text_hash(normalize_text(message), chunk_ids, rag_result.content_hash)
+
+    async def _drain_status(self, queue: asyncio.Queue, task: asyncio.Future):
+        """task가 끝날 때까지 queue에 쌓이는 status 이벤트를 순서대로 내보냅니다."""
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            break
+        while not queue.empty():
+            yield queue.get_nowait()
+
+    async def _prepare_rag_context(
+        self,
+        message: str,
+        language: str = "KOR",
+        timings: Optional[Dict[str, Any]] = None,
+        emit: Optional[Callable[..., None]] = None,
+    ) -> Tuple[Any, Optional[str], Optional[Tuple[CachedAnswer, str]]]:
+        """RAG 갈래: 검색 → 답변 캐시 조회 → 요약까지 수행합니다.
+
+        검색 직후 (청크 집합과 본문 해시가 정해지면) 답변 캐시를 먼저 조회하고,
+        적중하면 요약(LLM 호출)을 건너뜁니다. 함수 결과가 섞여 캐시를 쓸 수 없으면
+        stream_chat이 fan-out 뒤에 _condense_retrieved로 요약합니다.
+        timings를 주면 "answer_cache"(조회 시간/적중 단계)와 "condense"를 기록합니다.
+        emit을 주면 gate/retrieval/condense 단계의 status 이벤트를 내보냅니다.
+
+        Returns:
+            (RagResult, 요약 컨텍스트, (캐시 답변, 적중 단계) 또는 None) 튜플.
+            검색 결과 본문이 없거나 캐시에 적중하면 요약은 None.
+        """
+        rag_result = await self.rag_service.aretrieve_context(message, on_stage=emit)
+
+        if not rag_result.merged_documents_text:
+            self._dbg("[STREAM_CHAT] RAG 검색 결과 없음")
+            return rag_result, None, None
+
+        if self.answer_cache.eligible(rag_result):
+            lookup_start = time.perf_counter()
+            cached, hit = await self.answer_cache.aget(message, language, rag_result)
+            if timings is not None:
+                timings["answer_cache"] = {
+                    "elapsed": round(time.perf_counter() - lookup_start, 3),
+                    "hit": hit,
+                }
+            if cached is not None:
+                self._dbg(f"[STREAM_CHAT] 답변 캐시 적중({hit}) - 요약 생략")
+                return rag_result, None, (cached, hit)
+
+        condensed_rag = await self._condense_retrieved(message, rag_result, timings=timings, emit=emit)
+        return rag_result, condensed_rag, None
+
+    async def _condense_retrieved(
+        self,
+        message: str,
+        rag_result,
+        timings: Optional[Dict[str, Any]] = None,
+        emit: Optional[Callable[..., None]] = None,
+    ) -> str:
+        """검색된 본문을 요약합니다 (같은 질문 + 같은 문서 묶음이면 condense_cache의 요약을 재사용)."""
+        self._dbg(f"[STREAM_CHAT] RAG 검색 완료 - 원본 길이: {len(rag_result.merged_documents_text)}자")
+        
+        # === RAG 검색 결과 상세 디버그 출력 ===
+        self._dbg("=" * 80)
+        self._dbg("[RAG 디버그] 검색 결과 상세 정보:")
+        self._dbg(f"  - 규정 여부: {rag_result.is_regulation}")
+        self._dbg(f"  - 판단 이유: {rag_result.gate_reason or 'N/A'}")
+        self._dbg(f"  - 검색 소스: {rag_result.context_source}")
+        self._dbg(f"  - 전체 문서 수: {len(rag_result.hits)}")
+        self._dbg(f"  - MongoDB 문서: {rag_result.document_count}개")
+        self._dbg(f"  - 프리뷰 문서: {rag_result.preview_count}개")
+        self._dbg(f"  - 청크 ID 수: {len(rag_result.chunk_ids)}개")
+        #검색문서 id 샘플 출력 (최대 5개) 5개 초과 시 생략표시
+        if rag_result.chunk_ids:
+            chunk_ids_str = ", ".join(str(cid) for cid in rag_result.chunk_ids[:5])
+            if len(rag_result.chunk_ids) > 5:
+                chunk_ids_str += f" ... (외 {len(rag_result.chunk_ids) - 5}개)"
+            self._dbg(f"  - 청크 ID 샘플: [{chunk_ids_str}]")
+        
+        # 원본 컨텍스트 샘플 출력 (처음 500자)
+        context_sample = rag_result.merged_documents_text[:500]
+        if len(rag_result.merged_documents_text) > 500:
+            context_sample += "..."
+        self._dbg(f"  - 원본 컨텍스트 샘플:\n{context_sample}")
+        self._dbg("=" * 80)
+        
+        condense_start = time.perf_counter()
+        condense_mode = self.condense_router.choose(rag_result.merged_documents_text)
+        cache_hit = False
+        if emit:
+            emit("condense", "started", mode=condense_mode)
+        if condense_mode == "local":
+            # 추출형 요약은 수 ms이므로 캐시하지 않음
+            condensed_rag = self.local_condenser.condense(message, rag_result.merged_documents_text)
+        else:
+            cache_key = self._condense_cache_key(message, rag_result)
+            condensed_rag = self.condense_cache.get(cache_key) if cache_key else None
+            cache_hit = condensed_rag is not None
+            if cache_hit:
+                self._dbg(f"[CONDENSE] 캐시 적중 - 요약 생략 (cache={self.condense_cache.stats()})")
+            else:
+                condensed_rag = await self._condense_rag_context(
+                    message, rag_result.merged_documents_text, cache_key=cache_key, emit=emit
+                )
+        if timings is not None:
+            timings["condense"] = {
+                "elapsed": round(time.perf_counter() - condense_start, 3),
+                "mode": condense_mode,
+                "cache": "hit" if cache_hit else "miss",
+            }
+        if emit:
+            emit("condense", "done", mode=condense_mode, cached=cache_hit)
+        self._dbg(f"[STREAM_CHAT] RAG 요약 완료 - 요약 길이: {len(condensed_rag)}자")
+        return condensed_rag
+
+    def _schedule_summary(
+        self,
+        context: List[Dict[str, str]],
+        session: Optional[ChatSession] = None,
+    ) -> None:
+        """응답 저장 후 누적 요약을 백그라운드로 예약합니다.
+
+        세션이 있으면 session_id로 진행 중인 요약을 구분하고, 요약이 적용되면
+        세션 잠금을 잡은 뒤 session_saver로 접힌 문맥을 저장합니다.
+        """
+        if self.summarizer is None:
+            return
+        if session is None:
+            self.summarizer.schedule(context)
+            return
+
+        on_folded: Optional[Callable[[], Awaitable[None]]] = None
+        saver = self.session_saver
+        if saver is not None:
+            async def on_folded() -> None:
+                async with session.lock:
+                    await saver(session)
+                self._dbg(f"[SUMMARY] 요약 적용 세션 저장 - session={session.session_id}")
+
+        self.summarizer.schedule(context, key=session.session_id, on_folded=on_folded)
+
+    async def _replay_answer(
+        self,
+        text: str,
+        metadata: Dict[str, Any],
+        context: List[Dict[str, str]],
+        session: Optional[ChatSession] = None,
+    ) -> AsyncGenerator[str, None]:
+        """LLM을 거치지 않은 완성 답변을 delta → metadata → done 순서로 보내고 문맥에 저장합니다.
+
+        프론트엔드가 일반 응답과 같은 방식으로 처리하도록 줄 단위 delta로 나눠 보냅니다.
+        metadata는 ChatMetadata.to_dict() 형태 (캐시 답변은 처음 답할 때의 메타데이터).
+        """
+        for piece in text.splitlines(keepends=True):
+            yield json.dumps({"type": "delta", "content": piece}, ensure_ascii=False) + "\n"
+        yield json.dumps({"type": "metadata", "data": metadata}, ensure_ascii=False) + "\n"
+        yield json.dumps({"type": "done"}, ensure_ascii=False) + "\n"
+
+        self.add_response_stream(text, context=context)
+        self._schedule_summary(context, session)
+        self.handle_token_limit(context=context)
+
     async def stream_chat(
         self, 
         message: str, 
-        language: str = "KOR"
+        language: str = "KOR",
+        session: Optional[ChatSession] = None,
     ) -> AsyncGenerator[str, None]:
         """챗봇 스트리밍 통합 메서드
         
@@ -733,9 +1156,11 @@ class ChatbotStream:
         처리 흐름:
         1. 사용자 메시지 추가 및 메타데이터 초기화
         2. 언어별 지침 추가
-        3. RAG 컨텍스트 준비 및 요약
-        4. 함수 호출 분석/실행
-        5. 최종 컨텍스트 구성
+        3. RAG 검색 → 답변 캐시 조회 → 요약 ┐ 동시 실행 (갈래별 시간 제한/취소,
+        4. 함수 호출 분석/실행               ┘ 소요 시간은 metadata.timings)
+           progressive 모드에서는 이 동안 {"type": "status"} 이벤트를 먼저 전송
+        5. 최종 컨텍스트 구성 (답변 캐시에 같은 규정 질문이 있으면 요약 없이 저장된 답변을 재생 후 종료,
+           학식 메뉴만 묻는 질문은 빠른 경로로 템플릿 답변 후 종료)
         6. 스트리밍 응답 생성
         7. 메타데이터 전송
         8. 완료 신호
@@ -744,58 +1169,101 @@ class ChatbotStream:
         Args:
             message: 사용자 메시지
             language: 응답 언어 (KOR, ENG, VI, JPN, CHN, UZB, MNG, IDN)
+            session: 세션 문맥. 지정하면 self.context 대신 세션별 문맥을 사용합니다.
             
         Yields:
             JSON Lines 형식의 스트리밍 이벤트
         """
         self._dbg(f"[STREAM_CHAT] 시작 - 메시지: {message[:50]}..., 언어: {language}")
+        context = session.context if session is not None else self.context
         
         # === 1단계: 초기화 ===
-        self.add_user_message_in_context(message)
+        self.add_user_message_in_context(message, context=context)
         metadata = ChatMetadata()
         self._dbg("[STREAM_CHAT] 1단계: 메시지 추가 완료")
         
-        # === 2단계: 언어별 지침 추가 ===
+        # === 2단계: 언어별 지침 준비 ===
+        # 지침은 대화 문맥에 영구히 남기지 않고 5단계에서 이번 요청 사본에만 붙입니다.
         language_instruction = self._get_language_instruction(language)
-        self.context[-1]["content"] += " " + language_instruction
-        self._dbg(f"[STREAM_CHAT] 2단계: 언어 지침 추가 완료 - {language}")
+        self._strip_language_instructions(context)
+        self._dbg(f"[STREAM_CHAT] 2단계: 언어 지침 준비 완료 - {language}")
         
-        # === 3단계: RAG 컨텍스트 준비 ===
-        self._dbg("[STREAM_CHAT] 3단계: RAG 검색 시작...")
-        rag_result = self.rag_service.retrieve_context(message)
-        condensed_rag = None
-        
-        if rag_result.merged_documents_text:
-            self._dbg(f"[STREAM_CHAT] RAG 검색 완료 - 원본 길이: {len(rag_result.merged_documents_text)}자")
-            
-            # === RAG 검색 결과 상세 디버그 출력 ===
-            self._dbg("=" * 80)
-            self._dbg("[RAG 디버그] 검색 결과 상세 정보:")
-            self._dbg(f"  - 규정 여부: {rag_result.is_regulation}")
-            self._dbg(f"  - 판단 이유: {rag_result.gate_reason or 'N/A'}")
-            self._dbg(f"  - 검색 소스: {rag_result.context_source}")
-            self._dbg(f"  - 전체 문서 수: {len(rag_result.hits)}")
-            self._dbg(f"  - MongoDB 문서: {rag_result.document_count}개")
-            self._dbg(f"  - 프리뷰 문서: {rag_result.preview_count}개")
-            self._dbg(f"  - 청크 ID 수: {len(rag_result.chunk_ids)}개")
-            #검색문서 id 샘플 출력 (최대 5개) 5개 초과 시 생략표시
-            if rag_result.chunk_ids:
-                chunk_ids_str = ", ".join(rag_result.chunk_ids[:5])
-                if len(rag_result.chunk_ids) > 5:
-                    chunk_ids_str += f" ... (외 {len(rag_result.chunk_ids) - 5}개)"
-                self._dbg(f"  - 청크 ID 샘플: [{chunk_ids_str}]")
-            
-            # 원본 컨텍스트 샘플 출력 (처음 500자)
-            context_sample = rag_result.merged_documents_text[:500]
-            if len(rag_result.merged_documents_text) > 500:
-                context_sample += "..."
-            self._dbg(f"  - 원본 컨텍스트 샘플:\n{context_sample}")
-            self._dbg("=" * 80)
-            
-            condensed_rag = await self._condense_rag_context(
-                message, rag_result.merged_documents_text
-            )
-            self._dbg(f"[STREAM_CHAT] RAG 요약 완료 - 요약 길이: {len(condensed_rag)}자")
+        # === 3~4단계: RAG 준비와 함수 호출을 동시에 실행 (fan-out) ===
+        # 두 갈래는 서로 의존하지 않으므로 첫 토큰까지의 시간이 합이 아닌 max(갈래)가 됩니다.
+        self._dbg("[STREAM_CHAT] 3~4단계: RAG 검색 + 함수 호출 동시 시작...")
+        # 갈래들이 내보낸 진행 이벤트(status, tool_started/tool_finished)를 기다리는 동안 바로 전송
+        status_queue: Optional[asyncio.Queue] = (
+            asyncio.Queue() if self.progressive or self.tool_events else None
+        )
+        emit: Optional[Callable[..., None]] = None
+        emit_event: Optional[Callable[[Dict[str, Any]], None]] = None
+        if status_queue is not None:
+            def emit_event(event: Dict[str, Any]) -> None:
+                status_queue.put_nowait(event)
+
+            if self.progressive:
+                def emit(stage: str, state: str, **info: Any) -> None:
+                    emit_event({"type": "status", "stage": stage, "state": state, **info})
+
+        fanout_start = time.perf_counter()
+        fanout = asyncio.ensure_future(asyncio.gather(
+            self._run_branch(
+                "rag",
+                self._prepare_rag_context(message, language, timings=metadata.timings, emit=emit),
+                timeout=self.rag_branch_timeout,
+                timings=metadata.timings,
+                default=(None, None, None),
+            ),
+            self._run_branch(
+                "tools",
+                self._analyze_and_execute_functions(
+                    message,
+                    context=context,
+                    route_info=metadata.tool_route,
+                    on_event=emit_event if self.tool_events else None,
+                ),
+                timeout=self.tools_branch_timeout,
+                timings=metadata.timings,
+                default=[],
+            ),
+        ))
+        try:
+            if status_queue is not None:
+                async for event in self._drain_status(status_queue, fanout):
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+            (rag_result, condensed_rag, cached_answer), func_results = await fanout
+        finally:
+            # 클라이언트가 끊겨 제너레이터가 닫히면 진행 중인 갈래도 취소
+            if not fanout.done():
+                fanout.cancel()
+        metadata.timings["fanout"] = {"elapsed": round(time.perf_counter() - fanout_start, 3)}
+        self._dbg(f"[STREAM_CHAT] fan-out 완료 - timings={metadata.timings}")
+
+        if rag_result is not None:
+            metadata.gate_tier = rag_result.gate_tier
+            if session is not None:
+                session.last_rag_result = rag_result
+
+        # === 5단계(답변 캐시): 같은 규정 질문 + 같은 청크 집합이면 저장된 답변을 재생 ===
+        # 학식/웹검색 결과가 섞인 질문은 시간에 따라 답이 바뀌므로 캐시하지 않음
+        cache_eligible = self.answer_cache.eligible(rag_result, func_results)
+        if cached_answer is not None:
+            cached, hit = cached_answer
+            if cache_eligible:
+                self._dbg(f"[STREAM_CHAT] 답변 캐시 재생({hit}) - 저장 시각 {cached.created_at:.0f}")
+                replay_metadata = dict(
+                    cached.metadata,
+                    answer_source="cache",
+                    answer_cache={"hit": hit, "created_at": cached.created_at},
+                    timings=metadata.timings,
+                )
+                async for line in self._replay_answer(cached.text, replay_metadata, context, session):
+                    yield line
+                return
+            # 함수 결과가 함께 나와 캐시 답변을 쓸 수 없음 → 건너뛴 요약을 지금 수행
+            condensed_rag = await self._condense_retrieved(message, rag_result, timings=metadata.timings)
+
+        if rag_result is not None and condensed_rag is not None:
             metadata.rag = RagMetadata(
                 is_regulation=rag_result.is_regulation,
                 gate_reason=rag_result.gate_reason or "",
@@ -807,13 +1275,9 @@ class ChatbotStream:
                 source_documents=rag_result.source_documents,  # 출처 문서 정보 추가
                 raw_context=rag_result.merged_documents_text,  # 원본 컨텍스트 추가
                 condensed_context=condensed_rag,
+                gate_tier=rag_result.gate_tier,
             )
-        else:
-            self._dbg("[STREAM_CHAT] RAG 검색 결과 없음")
-        
-        # === 4단계: 함수 호출 분석/실행 ===
-        self._dbg("[STREAM_CHAT] 4단계: 함수 호출 분석/실행 시작...")
-        func_results = await self._analyze_and_execute_functions(message)
+
         metadata.functions = func_results
         self._dbg(f"[STREAM_CHAT] 함수 호출 완료 - {len(func_results)}개 함수 실행")
         
@@ -829,12 +1293,33 @@ class ChatbotStream:
         else:
             metadata.web_search_status = "not-run"
         
+        # === 5단계(빠른 경로): 도구 결과가 곧 답인 질문은 최종 LLM 호출 없이 바로 응답 ===
+        direct_meta = self.direct_answerer.pick(metadata.tool_route, func_results, condensed_rag)
+        if direct_meta is not None:
+            direct_start = time.perf_counter()
+            direct_text, translation = await self.direct_answerer.answer(direct_meta.output, language)
+            if direct_text is not None:
+                metadata.answer_source = "direct"
+                metadata.timings["direct_answer"] = {
+                    "elapsed": round(time.perf_counter() - direct_start, 3),
+                    "translation": translation,
+                }
+                self._dbg(f"[STREAM_CHAT] 빠른 경로 응답 - {metadata.timings['direct_answer']}")
+                async for line in self._replay_answer(direct_text, metadata.to_dict(), context, session):
+                    yield line
+                return
+
         # === 5단계: 최종 컨텍스트 구성 ===
         final_context = self._build_final_context(
             message=message,
             condensed_rag=condensed_rag,
             func_results=func_results,
+            context=context,
         )
+        self._apply_language_instruction(final_context, language_instruction)
+        # 토큰 예산 적용: system 프롬프트와 이번 질문(+이번 요청용 지침 블록)은 보존
+        pinned_tail = len(final_context) - len(context) + 1
+        final_context = self.context_window.fit(final_context, pinned_tail=pinned_tail)
         
         # === 6단계: 스트리밍 응답 생성 ===
         completed_text = ""
@@ -859,7 +1344,11 @@ class ChatbotStream:
         yield json.dumps({"type": "done"}, ensure_ascii=False) + "\n"
         
         # === 9단계: 응답 저장 ===
-        self.add_response_stream(completed_text)
+        if cache_eligible and condensed_rag and completed_text:
+            await self.answer_cache.aput(message, language, rag_result, completed_text, metadata.to_dict())
+        self.add_response_stream(completed_text, context=context)
+        self._schedule_summary(context, session)
+        self.handle_token_limit(context=context)
         self._dbg(f"[STREAM_CHAT] 9단계: 응답 저장 완료 - 길이: {len(completed_text)}자")
         self._dbg("[STREAM_CHAT] 전체 처리 완료!")
 
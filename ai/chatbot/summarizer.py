@@ -0,0 +1,185 @@
+"""
+대화 누적 요약 (rolling summary)
+
+한 세션을 학기 내내 열어 두는 학생도 있으므로, 오래된 대화를 그냥 버리는 대신
+토큰 기준선(watermark)을 넘으면 가장 오래된 N턴을 요약 메시지 하나로 접어 넣습니다.
+
+- 요약은 context[1]의 system 메시지로 보관 (ContextWindowManager/SessionStore가 제거하지 않음)
+- 응답 스트리밍이 끝난 뒤 백그라운드 작업으로 실행 → 응답 지연에 영향 없음
+- 요약 메시지마다 summary_version을 기록하고, 요약하는 동안 문맥이 바뀌었으면 적용하지 않음
+- 요약을 적용하면 on_folded 콜백으로 알림 (세션 저장소에 접힌 문맥을 다시 기록)
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+from app.ai.chatbot.config import async_client, model
+from app.ai.chatbot.context_window import ContextWindowManager
+
+# 요약 메시지 본문 앞에 붙는 머리말
+SUMMARY_PREFIX = "[이전 대화 요약]"
+
+# 요약 입력에 넣을 메시지 하나의 최대 글자 수 (긴 답변/검색 결과로 요약 요청이 커지지 않도록)
+MAX_CHARS_PER_MESSAGE = 2000
+
+SUMMARY_INSTRUCTION = (
+    "당신은 대학 안내 챗봇의 대화 기록을 정리하는 역할입니다. "
+    "[기존 요약]과 [새 대화]를 합쳐 이후 답변에 필요한 내용만 한국어로 간결하게 요약하세요.\n"
+    "- 학생이 밝힌 정보(학과, 학년, 상황 등)와 질문 주제, 챗봇이 안내한 핵심 답변(규정 조항/날짜/수치)을 남길 것\n"
+    "- 해결되지 않은 질문이 있으면 표시할 것\n"
+    "- 인사말/반복/추측은 제외하고 15줄 이내의 글머리표로 작성할 것"
+)
+
+
+def is_summary_message(message: Dict[str, str]) -> bool:
+    return message.get("role") == "system" and "summary_version" in message
+
+
+class ConversationSummarizer:
+    """토큰 기준선을 넘은 대화의 오래된 턴을 누적 요약으로 접습니다."""
+
+    def __init__(
+        self,
+        *,
+        context_window: ContextWindowManager,
+        watermark_tokens: Optional[int] = None,
+        fold_turns: Optional[int] = None,
+        keep_turns: int = 2,
+        model_name: Optional[str] = None,
+        async_openai_client=async_client,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self._window = context_window
+        self.watermark_tokens = watermark_tokens or int(
+            os.getenv("CHAT_SUMMARY_WATERMARK", str(context_window.budget // 2))
+        )
+        self.fold_turns = fold_turns or int(os.getenv("CHAT_SUMMARY_FOLD_TURNS", "4"))
+        self.keep_turns = keep_turns
+        self._model_name = model_name or model.advanced
+        self._client = async_openai_client
+        self._debug = debug_fn or (lambda _: None)
+        # 같은 세션에 대한 요약이 겹치지 않도록 진행 중인 세션 키(session_id)와 작업을 보관
+        self._running: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _turn_starts(context: List[Dict[str, str]], head: int) -> List[int]:
+        return [i for i in range(head, len(context)) if context[i].get("role") == "user"]
+
+    def needs_fold(self, context: List[Dict[str, str]]) -> bool:
+        head = self._window.pinned_head(context)
+        if len(self._turn_starts(context, head)) <= self.keep_turns:
+            return False
+        return self._window.count(context) > self.watermark_tokens
+
+    def schedule(
+        self,
+        context: List[Dict[str, str]],
+        *,
+        key: Optional[Hashable] = None,
+        on_folded: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Optional[asyncio.Task]:
+        """기준선을 넘었으면 요약 작업을 백그라운드로 시작합니다 (같은 key가 진행 중이면 건너뜀).
+
+        Args:
+            context: 접을 대화 문맥 (제자리에서 수정)
+            key: 진행 중인 요약을 구분하는 키 (세션 id). 없으면 id(context)
+            on_folded: 요약을 적용한 뒤 호출할 코루틴 함수 (세션 저장 등)
+        """
+        key = id(context) if key is None else key
+        if key in self._running or not self.needs_fold(context):
+            return None
+        task = asyncio.create_task(self._fold_and_notify(context, on_folded))
+        self._running[key] = task
+        self._tasks.add(task)
+
+        def _done(t: asyncio.Task) -> None:
+            self._tasks.discard(t)
+            self._running.pop(key, None)
+            if not t.cancelled() and t.exception() is not None:
+                self._debug(f"summarizer: 요약 실패 -> {t.exception()}")
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _fold_and_notify(
+        self,
+        context: List[Dict[str, str]],
+        on_folded: Optional[Callable[[], Awaitable[None]]],
+    ) -> bool:
+        applied = await self.fold(context)
+        if applied and on_folded is not None:
+            await on_folded()
+        return applied
+
+    def _render(self, messages: List[Dict[str, str]]) -> str:
+        lines = []
+        for msg in messages:
+            content = (msg.get("content") or "").strip()
+            if len(content) > MAX_CHARS_PER_MESSAGE:
+                content = content[:MAX_CHARS_PER_MESSAGE] + "..."
+            lines.append(f"{msg.get('role')}: {content}")
+        return "\n".join(lines)
+
+    async def fold(self, context: List[Dict[str, str]]) -> bool:
+        """가장 오래된 fold_turns턴을 요약 메시지로 접습니다. 적용했으면 True."""
+        head = self._window.pinned_head(context)
+        starts = self._turn_starts(context, head)
+        foldable = max(0, len(starts) - self.keep_turns)
+        count = min(self.fold_turns, foldable)
+        if count <= 0:
+            return False
+
+        end = starts[count] if count < len(starts) else len(context)
+        folded = context[head:end]
+        previous = context[1] if len(context) > 1 and is_summary_message(context[1]) else None
+        version = int(previous.get("summary_version", 0)) if previous else 0
+        previous_text = (
+            previous["content"][len(SUMMARY_PREFIX):].strip() if previous else "(없음)"
+        )
+
+        self._debug(f"summarizer: {count}턴({len(folded)}개 메시지) 요약 시작 version={version}")
+        response = await self._client.responses.create(
+            model=self._model_name,
+            input=[
+                {"role": "system", "content": SUMMARY_INSTRUCTION},
+                {
+                    "role": "user",
+                    "content": f"[기존 요약]\n{previous_text}\n\n[새 대화]\n{self._render(folded)}",
+                },
+            ],
+            text={"format": {"type": "text"}},
+        )
+        summary = (getattr(response, "output_text", "") or "").strip()
+        if not summary:
+            return False
+
+        # 요약하는 동안 문맥이 바뀌었는지 확인 (요약 교체/앞쪽 대화 제거 시 적용 안 함)
+        current_previous = context[1] if len(context) > 1 and is_summary_message(context[1]) else None
+        current_head = self._window.pinned_head(context)
+        unchanged = current_previous is previous and all(
+            current_head + i < len(context) and context[current_head + i] is msg
+            for i, msg in enumerate(folded)
+        )
+        if not unchanged:
+            self._debug(f"summarizer: 요약 중 문맥 변경 -> 폐기 version={version}")
+            return False
+
+        summary_message = {
+            "role": "system",
+            "content": f"{SUMMARY_PREFIX}\n{summary}",
+            "summary_version": version + 1,
+            "summary_turns": int(previous.get("summary_turns", 0) if previous else 0) + count,
+        }
+        if previous is not None:
+            context[1:current_head + len(folded)] = [summary_message] + context[2:current_head]
+        else:
+            context[current_head:current_head + len(folded)] = []
+            context.insert(1, summary_message)
+        self._debug(
+            f"summarizer: 요약 적용 version={version + 1} 남은 메시지={len(context) - 1} "
+            f"tokens={self._window.count(context)}"
+        )
+        return True
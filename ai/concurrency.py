@@ -0,0 +1,37 @@
+"""
+비동기 실행 보조 유틸
+
+이벤트 루프를 막는 동기 호출(pymongo, Pinecone, requests 등)을
+크기가 제한된 공용 스레드 풀로 넘겨 await 할 수 있게 합니다.
+스레드 수는 환경변수 BLOCKING_IO_WORKERS로 조정합니다 (기본 32).
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "32"))
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """공용 스레드 풀을 (처음 호출 시) 생성해 반환합니다."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io"
+        )
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """동기 함수를 공용 스레드 풀에서 실행하고 결과를 기다립니다."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    return await loop.run_in_executor(get_blocking_executor(), call)
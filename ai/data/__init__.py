@@ -5,6 +5,13 @@
 """
 
 from .mongodb_client import collection, MONGO_AVAILABLE
-from .vector_uploader import get_embedding, index
+from .vector_uploader import get_cached_embedding, get_embedding, index, query_embedding_cache
 
-__all__ = ["collection", "MONGO_AVAILABLE", "get_embedding", "index"]
+__all__ = [
+    "collection",
+    "MONGO_AVAILABLE",
+    "get_embedding",
+    "get_cached_embedding",
+    "query_embedding_cache",
+    "index",
+]
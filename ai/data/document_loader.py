@@ -1,57 +1,53 @@
+"""
+규정 문서 적재 파이프라인
+
+pdfs/ 폴더의 PDF/HWP를 읽어 조문(law_articles)과 별표(appendix_tables) 청크로 나누고 MongoDB에 저장합니다.
+
+- 파일 하나를 프로세스 하나가 파싱 (ProcessPoolExecutor, 코어 수만큼 병렬)
+- 끝난 파일부터 (파일명, 청크 목록)을 generator로 내보내고, 받는 즉시 Mongo에 배치 저장
+- manifest(파일별 mtime/size)가 같은 파일은 건너뜀 → 바뀐 규정만 다시 적재
+- 청크가 하나도 안 나오게 바뀐 파일과 pdfs/에서 지운 파일은 Mongo의 기존 청크를 삭제
+
+실행 (app 패키지의 상위 디렉터리에서):
+    python -m app.ai.data.document_loader [--workers N] [--force]
+"""
+import argparse
+import json
 import os
-from dotenv import load_dotenv
-from typing import List, Dict
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-load_dotenv("apikey.env")  # .env 로드
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-os.environ["PINECONE_API_KEY"] = os.getenv("PINECONE_API_KEY")
-
-# 이후 코드: PDF 로드, 청크링, 임베딩 등 추가 예정
-print("환경 설정 완료!")
+# 현재 파일의 디렉토리 기준으로 상대 경로 계산
+current_dir = Path(__file__).parent  # app/ai/data
+project_root = current_dir.parent.parent  # app
+pdfs_dir = project_root / "pdfs"
 
-from llama_index.core import SimpleDirectoryReader
+SUPPORTED_EXTENSIONS = (".pdf", ".hwp")
+STAR_TABLE_PATTERN = re.compile(r"\<별표\s*\d+\>")
+MANIFEST_PATH = Path(os.getenv("INGEST_MANIFEST_PATH", str(pdfs_dir / ".ingest_manifest.json")))
 
-# 현재 파일의 디렉토리 기준으로 상대 경로 계산
-current_dir = Path(__file__).parent  # /Users/kimdaegi/Desktop/backend/app/loding
-project_root = current_dir.parent    # /Users/kimdaegi/Desktop/backend/app
-pdfs_dir = project_root / "pdfs"     # /Users/kimdaegi/Desktop/backend/app/pdfs
-
-reader = SimpleDirectoryReader(input_dir=str(pdfs_dir))
-documents = reader.load_data()
-print(f"총 {len(documents)}개의 문서 로드 완료")
-
-# 각 문서별 디버그 정보 출력
-'''
-print("\n=== 각 문서별 상세 정보 ===")
-for i, doc in enumerate(documents):
-    # 파일명 추출 (metadata에서)
-    filename = doc.metadata.get('file_name', f'문서_{i+1}')
-    file_path = doc.metadata.get('file_path', 'Unknown')
-    
-    print(f"\n📄 문서 {i+1}: {filename}")
-    print(f"   파일 경로: {file_path}")
-    print(f"   텍스트 길이: {len(doc.text)} 문자")
-    
-    # 첫 200자 미리보기
-    preview_text = doc.text[:200].replace('\n', ' ').strip()
-    print(f"   첫 200자 미리보기: {preview_text}...")
-    
-    # 메타데이터 정보
-    print(f"   메타데이터: {doc.metadata}")
-    print("-" * 80)
-
-print(f"\n총 처리된 파일 수: {len(documents)}개")
-'''
 # Detect 조문 제목 및 본문 청크
 
-def extract_chunks_finditer(text: str, filename: str) -> List[Dict]:
+def extract_chunks_finditer(
+    text: str,
+    filename: str,
+    verbose: bool = False,
+    reference_index: Optional[Dict[str, List[str]]] = None,
+) -> List[Dict]:
+    """조문 청크를 만듭니다.
+
+    reference_index를 주면 {별표 표기: [그 표기가 본문에 있는 조문번호, ...]}를 문서 순서대로 채웁니다.
+    키는 본문에 적힌 그대로의 표기('<별표 1>')라 extract_star_tables의 연결 조문 결과가 본문 검색과 같습니다.
+    """
     # 조항 제목 패턴 탐색
-    pattern = re.compile(r"(제\s*\d+조(?:의\d+)?)(\([^)]{1,30}\))")  
+    pattern = re.compile(r"(제\s*\d+조(?:의\d+)?)(\([^)]{1,30}\))")
     matches = list(pattern.finditer(text))
 
-    print(f"🔍 {filename}: 총 {len(matches)}개 조항 제목 발견")
+    if verbose:
+        print(f"🔍 {filename}: 총 {len(matches)}개 조항 제목 발견")
 
     chunks = []
     for i in range(len(matches)):
@@ -61,8 +57,11 @@ def extract_chunks_finditer(text: str, filename: str) -> List[Dict]:
 
         law_id = matches[i].group(1).replace(" ", "")
         title = matches[i].group(2).strip("()")
-        ref_stars = detect_star_references(chunk_text)
-        
+        star_marks = [m.group() for m in STAR_TABLE_PATTERN.finditer(chunk_text)]
+        ref_stars = [_star_id(mark) for mark in star_marks]
+        if reference_index is not None:
+            _add_references(reference_index, star_marks, law_id)
+
         chunks.append({
             "text": chunk_text,
             "metadata": {
@@ -73,24 +72,58 @@ def extract_chunks_finditer(text: str, filename: str) -> List[Dict]:
                 "referenced_tables": ref_stars   # 참조별표 → referenced_tables
             }
         })
-        
+
         # 미리보기 출력
-        print(f"\n🧩 청크 {i+1}")
-        print(f"조문번호: {law_id}")
-        print(f"제목: {title}")
-        print(f"본문 미리보기: {chunk_text[:100].replace('\n', ' ')}...")
-        print(f"참조 별표: {', '.join(ref_stars) if ref_stars else '없음'}")
-        print("-" * 40)
-
-    print(f"\n✅ {filename} → {len(chunks)}개 청크 생성 완료")
+        if verbose:
+            print(f"\n🧩 청크 {i+1}")
+            print(f"조문번호: {law_id}")
+            print(f"제목: {title}")
+            print(f"본문 미리보기: {chunk_text[:100].replace('\n', ' ')}...")
+            print(f"참조 별표: {', '.join(ref_stars) if ref_stars else '없음'}")
+            print("-" * 40)
+
+    if verbose:
+        print(f"\n✅ {filename} → {len(chunks)}개 청크 생성 완료")
     return chunks
 
+def _star_id(mark: str) -> str:
+    return mark.strip("<>").replace(" ", "")  # 예: '별표1'
+
+
+def _add_references(reference_index: Dict[str, List[str]], star_marks: Iterable[str], law_id: str) -> None:
+    for mark in dict.fromkeys(star_marks):
+        reference_index.setdefault(mark, []).append(law_id)
+
+
+def build_reference_index(law_blocks: Iterable[Dict], filename: str) -> Dict[str, List[str]]:
+    """이미 만든 조문 청크로 참조 색인을 만듭니다 (extract_chunks_finditer에 reference_index를 넘기지 않은 경우)."""
+    reference_index: Dict[str, List[str]] = {}
+    for law in law_blocks:
+        md = law['metadata']
+        if md.get('source_file') != filename or not md.get('law_article_id') or not law['text']:
+            continue
+        _add_references(reference_index, (m.group() for m in STAR_TABLE_PATTERN.finditer(law['text'])), md['law_article_id'])
+    return reference_index
+
+
 # Detect 별표 블록
-def extract_star_tables(text: str, filename: str, law_blocks: List[Dict]) -> List[Dict]:
-    pattern = re.compile(r"\<별표\s*\d+\>")
-    matches = list(pattern.finditer(text))
+def extract_star_tables(
+    text: str,
+    filename: str,
+    law_blocks: List[Dict],
+    verbose: bool = False,
+    reference_index: Optional[Dict[str, List[str]]] = None,
+) -> List[Dict]:
+    """별표 청크를 만들고, 그 별표를 언급한 마지막 조문을 연결 조문(parent_law_article)으로 기록합니다.
+
+    reference_index(extract_chunks_finditer가 채운 것)가 없으면 law_blocks에서 한 번 만들어 씁니다.
+    """
+    if reference_index is None:
+        reference_index = build_reference_index(law_blocks, filename)
+    matches = list(STAR_TABLE_PATTERN.finditer(text))
 
-    print(f"\n📌 {filename} - 별표 블록 {len(matches)}개 발견됨")
+    if verbose:
+        print(f"\n📌 {filename} - 별표 블록 {len(matches)}개 발견됨")
 
     star_chunks = []
     for i, match in enumerate(matches):
@@ -98,16 +131,11 @@ def extract_star_tables(text: str, filename: str, law_blocks: List[Dict]) -> Lis
         end = matches[i+1].start() if i+1 < len(matches) else len(text)
         star_text = text[start:end].strip()
 
-        star_id = match.group().strip("<>").replace(" ", "")
+        star_id = _star_id(match.group())
 
-        # 연결 조문 추정: 가장 가까운 앞선 조문 블록 찾기
-        parent_law = None
-        for law in reversed(law_blocks):
-            if (law['metadata']['source_file'] == filename and 
-                law['metadata']['law_article_id']):  # 필드명 변경
-                if law['text'] and law['text'].find(match.group()) > -1:
-                    parent_law = law['metadata']['law_article_id']  # 필드명 변경
-                    break
+        # 연결 조문 추정: 이 별표 표기가 본문에 있는 조문 중 마지막 조문 (참조 색인 조회)
+        referencing = reference_index.get(match.group())
+        parent_law = referencing[-1] if referencing else None
 
         star_chunks.append({
             "text": star_text,
@@ -119,28 +147,185 @@ def extract_star_tables(text: str, filename: str, law_blocks: List[Dict]) -> Lis
             }
         })
 
-        print(f"🧩 별표 청크 {i+1}: {star_id} (연결: {parent_law})")
-        print(f"   미리보기: {star_text[:80].replace('\n', ' ')}...")
+        if verbose:
+            print(f"🧩 별표 청크 {i+1}: {star_id} (연결: {parent_law})")
+            print(f"   미리보기: {star_text[:80].replace('\n', ' ')}...")
 
     return star_chunks
 # Detect 별표 참조
 def detect_star_references(text: str) -> List[str]:
-    pattern = re.compile(r"\<별표\s*\d+\>")
-    return [
-        m.group().strip("<>").replace(" ", "")  # 예: '별표1'
-        for m in pattern.finditer(text)
-    ]
+    return [_star_id(m.group()) for m in STAR_TABLE_PATTERN.finditer(text)]
+
+# -------------------------------
+# 파일 단위 파싱 (worker 프로세스에서 실행)
+# -------------------------------
+def chunk_document(text: str, filename: str, verbose: bool = False) -> List[Dict]:
+    """문서 본문 하나를 조문 청크 + 별표 청크로 나눕니다."""
+    reference_index: Dict[str, List[str]] = {}
+    chunks = extract_chunks_finditer(text, filename, verbose=verbose, reference_index=reference_index)
+    return chunks + extract_star_tables(text, filename, chunks, verbose=verbose, reference_index=reference_index)
+
+
+def parse_file(path: str, verbose: bool = False) -> Tuple[str, List[Dict]]:
+    """파일 하나를 읽어 (파일명, 청크 목록)을 반환합니다."""
+    from llama_index.core import SimpleDirectoryReader
+
+    documents = SimpleDirectoryReader(input_files=[path]).load_data()
+    chunks: List[Dict] = []
+    for i, doc in enumerate(documents):
+        fname = doc.metadata.get('file_name', Path(path).name or f'문서_{i+1}')
+        chunks.extend(chunk_document(doc.text, fname, verbose=verbose))
+    return Path(path).name, chunks
+
+
+def iter_file_chunks(paths: Iterable[Path], workers: Optional[int] = None, verbose: bool = False) -> Iterator[Tuple[Path, List[Dict]]]:
+    """파일들을 프로세스 풀에서 병렬로 파싱하고, 끝난 파일부터 (경로, 청크 목록)을 내보냅니다.
+
+    파싱에 실패한 파일은 경고만 출력하고 건너뜁니다. workers=1이면 현재 프로세스에서 순서대로 처리합니다.
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers == 1:
+        for path in paths:
+            try:
+                yield path, parse_file(str(path), verbose)[1]
+            except Exception as e:
+                print(f"⚠️ {path.name} 파싱 실패: {e}")
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_file, str(path), verbose): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result()[1]
+            except Exception as e:
+                print(f"⚠️ {path.name} 파싱 실패: {e}")
+
+
+# -------------------------------
+# manifest: 바뀌지 않은 파일 건너뛰기
+# -------------------------------
+def _file_signature(path: Path) -> Dict[str, float]:
+    stat = path.stat()
+    return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def load_manifest(path: Path) -> Dict[str, Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ manifest를 읽지 못해 전체를 다시 적재합니다: {e}")
+        return {}
+
+
+def save_manifest(path: Path, manifest: Dict[str, Dict]) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def changed_files(input_dir: Path, manifest: Dict[str, Dict], force: bool = False) -> Tuple[List[Path], List[Path]]:
+    """(다시 적재할 파일, 그대로인 파일)을 반환합니다."""
+    todo: List[Path] = []
+    unchanged: List[Path] = []
+    for path in sorted(input_dir.iterdir()):
+        if not path.is_file() or path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+            continue
+        entry = manifest.get(path.name)
+        sig = _file_signature(path)
+        if not force and entry and entry.get("mtime") == sig["mtime"] and entry.get("size") == sig["size"]:
+            unchanged.append(path)
+        else:
+            todo.append(path)
+    return todo, unchanged
+
+
+def removed_files(input_dir: Path, manifest: Dict[str, Dict]) -> List[str]:
+    """manifest에는 있지만 input_dir에서 사라진 파일 이름 목록"""
+    return sorted(name for name in manifest if not (input_dir / name).is_file())
+
 
 # -------------------------------
-# 전체 문서 처리 및 요약
+# 전체 적재
 # -------------------------------
-all_chunks: List[Dict] = []
-for i, doc in enumerate(documents):
-    fname = doc.metadata.get('file_name', f'문서_{i+1}')
-    chunks = extract_chunks_finditer(doc.text, fname)
-    all_chunks.extend(chunks)
-    star_chunks = extract_star_tables(doc.text, fname, chunks)
-    all_chunks.extend(star_chunks)
+def ingest_documents(
+    input_dir: Path = pdfs_dir,
+    workers: Optional[int] = None,
+    manifest_path: Path = MANIFEST_PATH,
+    force: bool = False,
+    verbose: bool = False,
+) -> Dict[str, int]:
+    """바뀐 파일만 병렬로 파싱해 파일 단위로 Mongo에 저장하고 요약을 반환합니다.
+
+    청크가 없게 된 파일과 input_dir에서 사라진 파일은 기존 청크를 삭제합니다.
+    """
+    from app.ai.data.mongodb_client import delete_chunks_for_files, insert_chunks_to_mongo
+
+    input_dir = Path(input_dir)
+    manifest_path = Path(manifest_path)
+    manifest = load_manifest(manifest_path)
+    todo, unchanged = changed_files(input_dir, manifest, force=force)
+    removed = removed_files(input_dir, manifest)
+    print(
+        f"📂 {input_dir}: 적재 대상 {len(todo)}개, 변경 없음(건너뜀) {len(unchanged)}개, "
+        f"삭제된 파일 {len(removed)}개"
+    )
+
+    summary = {"files": 0, "chunks": 0, "skipped": len(unchanged), "failed": 0, "removed": 0}
+    t0 = time.monotonic()
+    # 사라진 파일의 청크는 삭제에 성공한 뒤에만 manifest에서 지움 (실패하면 다음 실행에서 다시 시도)
+    if removed and delete_chunks_for_files(removed):
+        for name in removed:
+            manifest.pop(name, None)
+        save_manifest(manifest_path, manifest)
+        summary["removed"] = len(removed)
+
+    for path, chunks in iter_file_chunks(todo, workers=workers, verbose=verbose):
+        law_count = sum(1 for c in chunks if c["metadata"]["category"] == "law_articles")
+        print(f"📄 {path.name}: 조문 {law_count}개, 별표 {len(chunks) - law_count}개")
+        # 청크가 없으면 insert_chunks_to_mongo가 이 파일을 알 수 없으므로 이전 청크를 직접 삭제
+        stored = insert_chunks_to_mongo(chunks) if chunks else delete_chunks_for_files([path.name])
+        if not stored:
+            continue
+        # 저장에 성공한 파일만 manifest에 기록 (실패한 파일은 다음 실행에서 다시 시도)
+        manifest[path.name] = dict(_file_signature(path), chunks=len(chunks), ingested_at=time.time())
+        save_manifest(manifest_path, manifest)
+        summary["files"] += 1
+        summary["chunks"] += len(chunks)
+    summary["failed"] = len(todo) - summary["files"]  # 파싱 또는 저장 실패
+
+    print(
+        f"\n✅ 적재 완료: 파일 {summary['files']}개, 청크 {summary['chunks']}개, "
+        f"건너뜀 {summary['skipped']}개, 삭제 {summary['removed']}개, 실패 {summary['failed']}개 "
+        f"({time.monotonic() - t0:.1f}s)"
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse regulation PDF/HWP files into chunks and store them in MongoDB")
+    parser.add_argument("--input-dir", dest="input_dir", default=str(pdfs_dir), help="Directory with PDF/HWP files")
+    parser.add_argument("--workers", dest="workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--manifest", dest="manifest", default=str(MANIFEST_PATH), help="Manifest file used to skip unchanged files")
+    parser.add_argument("--force", action="store_true", help="Re-ingest every file even if unchanged")
+    parser.add_argument("--verbose", action="store_true", help="Print a preview of every chunk")
+    args = parser.parse_args()
 
+    ingest_documents(
+        input_dir=Path(args.input_dir),
+        workers=args.workers,
+        manifest_path=Path(args.manifest),
+        force=args.force,
+        verbose=args.verbose,
+    )
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+질의 임베딩 캐시
+
+같은 질문(예: "휴학 신청 기간")이 하루에도 수백 번 들어오므로,
+임베딩 API를 매번 호출하지 않도록 (모델, 정규화된 질문 해시) 키로 벡터를 캐시합니다.
+
+- 1단계: 프로세스 내 LRU (TTLCache)
+- 2단계(선택): sqlite 디스크 캐시 — 재시작 후에도 유지
+- 벡터는 Python float 리스트 대신 float32 array로 보관 (메모리 약 1/4)
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, Optional
+
+from app.ai.cache import TTLCache, normalize_text, text_hash
+
+
+class EmbeddingCache:
+    """embed_fn 앞에 두는 2단 캐시. 인스턴스 자체를 embed_fn처럼 호출할 수 있습니다."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Iterable[float]],
+        *,
+        model_name: str,
+        max_entries: int = 4096,
+        disk_path: Optional[str] = None,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self._embed = embed_fn
+        self._model_name = model_name
+        self._memory: TTLCache[array] = TTLCache(maxsize=max_entries)
+        self._debug = debug_fn or (lambda _: None)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def key_for(self, text: str) -> str:
+        return text_hash(self._model_name, normalize_text(text))
+
+    def _load_disk(self, key: str) -> Optional[array]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        vec = array("f")
+        vec.frombytes(row[0])
+        return vec
+
+    def _store_disk(self, key: str, vec: array) -> None:
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vec, created_at) VALUES (?, ?, ?, ?)",
+                    (key, len(vec), vec.tobytes(), time.time()),
+                )
+                self._db.commit()
+        except sqlite3.Error as exc:
+            self._debug(f"embedding_cache: 디스크 저장 실패 -> {exc}")
+
+    def get_vector(self, text: str) -> array:
+        """float32 array 형태의 임베딩을 반환합니다 (캐시 우선)."""
+        key = self.key_for(text)
+        vec = self._memory.get(key)
+        if vec is not None:
+            self.memory_hits += 1
+            return vec
+
+        vec = self._load_disk(key)
+        if vec is not None:
+            self.disk_hits += 1
+            self._memory.set(key, vec)
+            return vec
+
+        self.misses += 1
+        vec = array("f", self._embed(text))
+        self._memory.set(key, vec)
+        self._store_disk(key, vec)
+        self._debug(f"embedding_cache: miss -> embedded dim={len(vec)} stats={self.stats()}")
+        return vec
+
+    def __call__(self, text: str) -> list[float]:
+        """embed_fn 호환 인터페이스 (Pinecone 질의용 float 리스트 반환)."""
+        return self.get_vector(text).tolist()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_size": len(self._memory),
+        }
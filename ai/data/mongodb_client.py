@@ -1,9 +1,12 @@
 from pymongo import MongoClient
 from typing import List, Dict
+import json
 import os
 from dotenv import load_dotenv
 import certifi
 
+from app.ai.cache import text_hash
+
 # .env에서 MONGODB_URI 불러오기
 load_dotenv('apikey.env')
 MONGODB_URI = os.getenv("MONGODB_URI")
@@ -41,7 +44,27 @@ db = client[DB_NAME]
 collection = db[COLLECTION_NAME]
 
 
-def insert_chunks_to_mongo(chunks: List[Dict]):
+# 업로드 상태 필드 (vector_uploader가 기록, 청크 내용 해시에서는 제외)
+UPLOAD_STATE_KEYS = ("content_hash", "vector_hash", "vector_parts")
+
+
+def chunk_content_hash(chunk: Dict) -> str:
+    """청크 본문 + metadata의 해시 (재적재 시 바뀌지 않은 청크를 알아보는 데 사용)"""
+    md = {k: v for k, v in (chunk.get("metadata") or {}).items() if k not in UPLOAD_STATE_KEYS}
+    return text_hash(chunk.get("text", ""), json.dumps(md, sort_keys=True, ensure_ascii=False, default=str))
+
+
+INSERT_BATCH_SIZE = 500  # insert_many 한 번에 넣는 문서 수
+
+
+def insert_chunks_to_mongo(chunks: List[Dict]) -> bool:
+    """파일별로 청크를 저장합니다.
+
+    metadata.content_hash가 같은 기존 문서는 _id와 업로드 상태를 그대로 두고,
+    바뀐/새 청크만 추가하고 사라진 청크만 삭제합니다.
+    → mongo_id가 유지되므로 vector_uploader --incremental이 바뀐 조문만 다시 임베딩합니다.
+    저장에 성공하면 True를 반환합니다.
+    """
     try:
         if not MONGO_AVAILABLE:
             print("[Mongo] 현재 연결이 불안정합니다(ping 실패). 저장 시도는 계속합니다.")
@@ -50,12 +73,53 @@ def insert_chunks_to_mongo(chunks: List[Dict]):
         db = cluster[DB_NAME]
         collection = db[COLLECTION_NAME]
 
-        filenames = set(chunk['metadata']['source_file'] for chunk in chunks)
-        for fname in filenames:
-            delete_result = collection.delete_many({"metadata.source_file": fname})
-            print(f" {fname} 삭제: {delete_result.deleted_count}개")
+        by_file: Dict[str, List[Dict]] = {}
+        for chunk in chunks:
+            chunk.setdefault("metadata", {})["content_hash"] = chunk_content_hash(chunk)
+            by_file.setdefault(chunk["metadata"]["source_file"], []).append(chunk)
 
-        result = collection.insert_many(chunks)
-        print(f"저장 완료: {len(result.inserted_ids)}개")
+        inserted = 0
+        for fname, file_chunks in by_file.items():
+            existing: Dict[str, List] = {}
+            for doc in collection.find({"metadata.source_file": fname}, {"metadata.content_hash": 1}):
+                existing.setdefault((doc.get("metadata") or {}).get("content_hash"), []).append(doc["_id"])
+
+            new_chunks = []
+            for chunk in file_chunks:
+                same = existing.get(chunk["metadata"]["content_hash"])
+                if same:
+                    same.pop()
+                else:
+                    new_chunks.append(chunk)
+            stale_ids = [_id for ids in existing.values() for _id in ids]
+
+            if stale_ids:
+                collection.delete_many({"_id": {"$in": stale_ids}})
+            for i in range(0, len(new_chunks), INSERT_BATCH_SIZE):
+                inserted += len(collection.insert_many(new_chunks[i:i + INSERT_BATCH_SIZE], ordered=False).inserted_ids)
+            kept = len(file_chunks) - len(new_chunks)
+            print(f" {fname}: 유지 {kept}개, 삭제 {len(stale_ids)}개, 추가 {len(new_chunks)}개")
+
+        print(f"저장 완료: {inserted}개 추가")
+        return True
+    except Exception as e:
+        print(f" Mongo 에러: {str(e)} URI/네트워크/TLS 설정을 확인하세요")
+        return False
+
+
+def delete_chunks_for_files(filenames: List[str]) -> bool:
+    """파일의 청크를 모두 삭제합니다 (청크가 하나도 안 나오게 바뀐 파일, pdfs/에서 지운 파일).
+
+    Pinecone의 해당 벡터는 vector_uploader --incremental이 고아 벡터로 정리합니다.
+    삭제에 성공하면 True를 반환합니다.
+    """
+    if not filenames:
+        return True
+    try:
+        collection = client[DB_NAME][COLLECTION_NAME]
+        deleted = collection.delete_many({"metadata.source_file": {"$in": list(filenames)}}).deleted_count
+        print(f"삭제 완료: {', '.join(filenames)} 청크 {deleted}개")
+        return True
     except Exception as e:
-        print(f" Mongo 에러: {str(e)} URI/네트워크/TLS 설정을 확인하세요")
\ No newline at end of file
+        print(f" Mongo 에러: {str(e)} URI/네트워크/TLS 설정을 확인하세요")
+        return False
@@ -1,17 +1,27 @@
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pymongo.errors import ServerSelectionTimeoutError, NetworkTimeout, PyMongoError
 from bson import ObjectId
 import certifi
 from pinecone import Pinecone, ServerlessSpec
 from openai import OpenAI
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 import tiktoken
 import time
+import json
 import logging
-from typing import List, Dict
+import random
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Iterable, List, Dict, Optional, Set, Tuple
 import argparse
-import uuid  # ID 생성용
+import uuid  # ID 생성용 (mongo_id가 없는 경우)
+
+from app.ai.cache import text_hash
+from app.ai.data.embedding_cache import EmbeddingCache
 #from sentence_transformers import SentenceTransformer  # 추가: Ko-BGE용
 
 # apikey.env를 명시적으로 로드 (기본 .env가 아닐 수 있음)
@@ -70,15 +80,39 @@ OVERLAP_TOKENS = 50
 
 # OpenAI 임베딩 클라이언트
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
+EMBEDDING_MODEL = "text-embedding-3-small"  # 비용/성능 균형 좋은 모델
 
 def get_embedding(text: str) -> List[float]:
     response = openai_client.embeddings.create(
         input=text,
-        model="text-embedding-3-small"  # 비용/성능 균형 좋은 모델
+        model=EMBEDDING_MODEL
     )
     return response.data[0].embedding
 
 
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """여러 텍스트를 embeddings.create 한 번으로 임베딩합니다 (입력 순서 유지)."""
+    response = openai_client.embeddings.create(
+        input=texts,
+        model=EMBEDDING_MODEL
+    )
+    return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
+# 질의용 임베딩 캐시 (검색 시 반복 질문의 임베딩 호출 생략)
+# EMBEDDING_CACHE_PATH를 지정하면 sqlite 디스크 캐시도 사용합니다.
+query_embedding_cache = EmbeddingCache(
+    get_embedding,
+    model_name=EMBEDDING_MODEL,
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    disk_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+)
+
+def get_cached_embedding(text: str) -> List[float]:
+    """query_embedding_cache를 거치는 get_embedding (검색 질의용)."""
+    return query_embedding_cache(text)
+
+
 def split_text_into_token_chunks(text: str, max_tokens: int = MAX_TOKENS_PER_CHUNK, overlap: int = OVERLAP_TOKENS):
     """토큰 단위로 안전하게 텍스트를 분할해 문자열 조각 리스트를 반환합니다."""
     try:
@@ -101,30 +135,122 @@ def split_text_into_token_chunks(text: str, max_tokens: int = MAX_TOKENS_PER_CHU
     return chunks
 
 
-def safe_embed_and_upsert(text: str, metadata: Dict, namespace: str, batch_list: List[Dict], batch_size: int = 100):
-    """텍스트를 안전히 분할해 임베딩하고 batch_list에 추가; batch가 차면 upsert 수행."""
-    chunks = split_text_into_token_chunks(text)
-    parts_embedded = 0
-    embed_time_total = 0.0
-    for idx, part in enumerate(chunks):
-        start = time.monotonic()
+# 배치 임베딩 설정 (조각 여러 개를 embeddings.create 한 번에 보냄)
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "100000"))  # 요청당 토큰 상한 (API 한도 300k)
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "256"))  # 요청당 입력 수 상한 (API 한도 2048)
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))  # 동시에 보내는 임베딩 요청 수
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "2"))  # 동시에 보내는 upsert 요청 수
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+
+_RETRYABLE_EMBED_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class _RateLimitGate:
+    """429를 받으면 모든 임베딩 스레드가 같은 시각까지 함께 쉬도록 공유하는 대기 시각"""
+
+    def __init__(self) -> None:
+        self._until = 0.0
+        self._lock = threading.Lock()
+
+    def hold(self, seconds: float) -> None:
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+    def wait(self) -> None:
+        delay = self._until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limit_gate = _RateLimitGate()
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """응답 헤더의 retry-after(-ms)를 초 단위로 읽습니다."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
         try:
-            emb = get_embedding(part)
-            elapsed = time.monotonic() - start
-            embed_time_total += elapsed
-            parts_embedded += 1
-            logger.debug(f"embedded mongo_id={metadata.get('mongo_id')} sub={idx} tokens~{len(enc.encode(part))} time={elapsed:.3f}s")
-        except Exception as e:
-            elapsed = time.monotonic() - start
-            logger.warning(f"get_embedding failed for mongo_id={metadata.get('mongo_id')} sub={idx} time={elapsed:.3f}s error={e}")
+            return float(headers.get(name)) * scale
+        except (TypeError, ValueError):
             continue
+    return None
 
-        vec_id = str(uuid.uuid4())
-        md = dict(metadata or {})
-        md["sub_index"] = idx
-        md["text_preview"] = part[:200]
-        batch_list.append({"id": vec_id, "values": emb, "metadata": md})
 
+def embed_batch_with_retry(texts: List[str], max_retries: int = EMBED_MAX_RETRIES) -> List[List[float]]:
+    """get_embeddings + 지수 백오프 재시도. 429는 retry-after를 따르고 다른 스레드도 함께 기다립니다."""
+    delay = 1.0
+    for attempt in range(max_retries + 1):
+        _rate_limit_gate.wait()
+        try:
+            return get_embeddings(texts)
+        except _RETRYABLE_EMBED_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            wait = max(delay, _retry_after(e) or 0.0) * (1 + random.random() * 0.25)
+            logger.warning(f"embedding batch retry {attempt + 1}/{max_retries} inputs={len(texts)} wait={wait:.1f}s error={e}")
+            if isinstance(e, RateLimitError):
+                _rate_limit_gate.hold(wait)
+            else:
+                time.sleep(wait)
+            delay = min(delay * 2, 60.0)
+    raise RuntimeError("unreachable")
+
+
+# Mongo metadata에 기록하는 업로드 상태 (벡터 metadata에는 넣지 않음)
+VECTOR_STATE_KEYS = ("vector_hash", "vector_parts")
+
+
+def vector_id(mongo_id: str, sub_index: int) -> str:
+    """Mongo 문서 id + 조각 번호로 만든 결정적 벡터 id (다시 올리면 같은 벡터를 덮어씀)"""
+    return f"{mongo_id}:{sub_index}"
+
+
+def parse_vector_id(vec_id: str) -> Tuple[Optional[str], Optional[int]]:
+    """vector_id의 역함수. 예전 uuid 형식 id는 (None, None)."""
+    mongo_id, sep, sub = vec_id.rpartition(":")
+    if not sep or not sub.isdigit():
+        return None, None
+    return mongo_id, int(sub)
+
+
+def vector_source_hash(text: str, metadata: Dict) -> str:
+    """벡터 내용을 결정하는 값(임베딩 모델, 분할 설정, 본문, metadata)의 해시"""
+    md = {k: v for k, v in (metadata or {}).items() if k not in VECTOR_STATE_KEYS}
+    return text_hash(
+        EMBEDDING_MODEL,
+        MAX_TOKENS_PER_CHUNK,
+        OVERLAP_TOKENS,
+        text,
+        json.dumps(md, sort_keys=True, ensure_ascii=False, default=str),
+    )
+
+
+def _vector_for(part: str, metadata: Dict, sub_index: int, embedding: List[float]) -> Dict:
+    md = {k: v for k, v in (metadata or {}).items() if k not in VECTOR_STATE_KEYS}
+    md["sub_index"] = sub_index
+    md["text_preview"] = part[:200]
+    mongo_id = md.get("mongo_id")
+    vec_id = vector_id(mongo_id, sub_index) if mongo_id else str(uuid.uuid4())
+    return {"id": vec_id, "values": embedding, "metadata": md}
+
+
+def safe_embed_and_upsert(text: str, metadata: Dict, namespace: str, batch_list: List[Dict], batch_size: int = 100):
+    """텍스트를 안전히 분할해 (한 번의 배치 요청으로) 임베딩하고 batch_list에 추가; batch가 차면 upsert 수행.
+
+    문서 하나만 올릴 때 쓰는 동기 경로입니다. 대량 업로드는 BatchEmbedUpserter를 사용하세요.
+    """
+    chunks = split_text_into_token_chunks(text)
+    if not chunks:
+        return batch_list
+    start = time.monotonic()
+    try:
+        embeddings = embed_batch_with_retry(chunks)
+    except Exception as e:
+        logger.warning(f"get_embeddings failed for mongo_id={metadata.get('mongo_id')} parts={len(chunks)} time={time.monotonic() - start:.3f}s error={e}")
+        return batch_list
+
+    for idx, (part, emb) in enumerate(zip(chunks, embeddings)):
+        batch_list.append(_vector_for(part, metadata, idx, emb))
         if len(batch_list) >= batch_size:
             upsert_start = time.monotonic()
             index.upsert(vectors=batch_list, namespace=namespace or "default")
@@ -132,142 +258,594 @@ def safe_embed_and_upsert(text: str, metadata: Dict, namespace: str, batch_list:
             logger.info(f"Upserted batch of {len(batch_list)} vectors to namespace={namespace} in {upsert_elapsed:.3f}s")
             batch_list.clear()
 
-    logger.info(f"safe_embed_and_upsert finished mongo_id={metadata.get('mongo_id')} parts={parts_embedded} embed_time_total={embed_time_total:.3f}s")
+    logger.info(f"safe_embed_and_upsert finished mongo_id={metadata.get('mongo_id')} parts={len(chunks)} embed_time_total={time.monotonic() - start:.3f}s")
     return batch_list
 
-def upload_chunks_to_pinecone(category: str = None, batch_size: int = 100, dry_run: bool = False):
+
+@dataclass
+class UploadStats:
+    documents: int = 0
+    parts: int = 0
+    tokens: int = 0
+    embed_requests: int = 0
+    embed_time: float = 0.0  # 요청별 소요 시간의 합 (동시 실행이므로 벽시계 시간보다 큼)
+    vectors_upserted: int = 0
+    upsert_time: float = 0.0
+    errors: int = 0
+    skipped: int = 0  # incremental 모드에서 해시가 같아 건너뛴 문서 수
+    vectors_deleted: int = 0
+
+    def throughput(self, elapsed: float) -> str:
+        elapsed = max(elapsed, 1e-9)
+        return (
+            f"{self.parts / elapsed:.1f} chunks/s, {self.tokens / elapsed:,.0f} tokens/s "
+            f"(parts={self.parts} tokens={self.tokens} embed_requests={self.embed_requests} "
+            f"vectors_upserted={self.vectors_upserted} elapsed={elapsed:.1f}s)"
+        )
+
+
+class BatchEmbedUpserter:
+    """문서 조각을 토큰 예산 단위로 묶어 여러 스레드에서 임베딩하고, 끝난 배치부터 Pinecone에 upsert합니다.
+
+    - 임베딩: 요청당 max_batch_tokens / max_batch_inputs까지 묶어 concurrency개 스레드에서 동시 요청
+    - upsert: 별도 스레드에서 upsert_batch_size개씩 → 임베딩 요청과 upsert 요청의 네트워크 대기가 겹침
+    - 처리 중인 배치 수를 제한해 전체 코퍼스를 메모리에 쌓지 않음
+    - on_document_done(mongo_id, parts): 문서의 모든 조각이 upsert된 뒤 호출 (임베딩/upsert 실패 문서는 호출 안 함)
+
+    with 문으로 쓰거나 마지막에 close()를 호출해 남은 배치를 flush하세요.
+    """
+
+    def __init__(
+        self,
+        namespace: Optional[str],
+        *,
+        upsert_batch_size: int = 100,
+        max_batch_tokens: int = EMBED_BATCH_MAX_TOKENS,
+        max_batch_inputs: int = EMBED_BATCH_MAX_INPUTS,
+        concurrency: int = EMBED_CONCURRENCY,
+        upsert_concurrency: int = UPSERT_CONCURRENCY,
+        upsert: bool = True,
+        stats: Optional[UploadStats] = None,
+        on_document_done: Optional[Callable[[str, int], None]] = None,
+    ) -> None:
+        self.namespace = namespace or "default"
+        self.upsert_batch_size = upsert_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.concurrency = max(1, concurrency)
+        self.upsert_concurrency = max(1, upsert_concurrency)
+        self.upsert = upsert
+        self.stats = stats or UploadStats()
+        self._on_document_done = on_document_done
+        self._remaining: Dict[str, int] = {}  # mongo_id → 아직 upsert되지 않은 조각 수
+        self._parts: Dict[str, int] = {}
+        self.failed: Set[str] = set()  # 임베딩/upsert에 실패한 mongo_id
+
+        self._embed_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+        self._upsert_pool = ThreadPoolExecutor(max_workers=self.upsert_concurrency, thread_name_prefix="upsert")
+        self._pending: List[Tuple[str, Dict, int]] = []  # (조각 텍스트, 벡터 metadata, 토큰 수)
+        self._pending_tokens = 0
+        self._embedding: Deque[Future] = deque()
+        self._upserting: Deque[Future] = deque()
+        self._vectors: List[Dict] = []
+
+    def __enter__(self) -> "BatchEmbedUpserter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, text: str, metadata: Dict) -> int:
+        """문서 하나를 조각내 임베딩 대기열에 넣고 조각 수를 반환합니다."""
+        parts = split_text_into_token_chunks(text)
+        mongo_id = (metadata or {}).get("mongo_id")
+        if mongo_id:
+            self._parts[mongo_id] = len(parts)
+            self._remaining[mongo_id] = len(parts)
+            if not parts:
+                self._finish(mongo_id)
+        for idx, part in enumerate(parts):
+            tokens = len(enc.encode(part))
+            if self._pending and (
+                self._pending_tokens + tokens > self.max_batch_tokens or len(self._pending) >= self.max_batch_inputs
+            ):
+                self._submit_embed()
+            md = dict(metadata or {})
+            md["sub_index"] = idx
+            self._pending.append((part, md, tokens))
+            self._pending_tokens += tokens
+        self.stats.documents += 1
+        self._drain(block=False)
+        return len(parts)
+
+    # ----- 임베딩 -----
+    def _submit_embed(self) -> None:
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        # 처리 중인 배치가 너무 많으면 가장 오래된 배치가 끝날 때까지 대기 (메모리 상한)
+        while len(self._embedding) >= self.concurrency * 2:
+            self._reap_embed(self._embedding.popleft())
+        self._embedding.append(self._embed_pool.submit(self._embed_batch, batch))
+
+    @staticmethod
+    def _embed_batch(batch: List[Tuple[str, Dict, int]]) -> Tuple[List[Tuple[str, Dict, int]], Any, float]:
+        start = time.monotonic()
+        try:
+            result: Any = embed_batch_with_retry([part for part, _, _ in batch])
+        except Exception as e:
+            result = e
+        return batch, result, time.monotonic() - start
+
+    def _reap_embed(self, future: Future) -> None:
+        batch, result, elapsed = future.result()
+        tokens = sum(t for _, _, t in batch)
+        self.stats.embed_requests += 1
+        self.stats.embed_time += elapsed
+        if isinstance(result, Exception):
+            self.stats.errors += 1
+            ids = sorted({md.get("mongo_id") for _, md, _ in batch if md.get("mongo_id")})
+            self._fail(ids)
+            logger.warning(f"embedding batch failed inputs={len(batch)} tokens={tokens} time={elapsed:.3f}s mongo_ids={ids[:5]}... error={result}")
+            return
+        self.stats.parts += len(batch)
+        self.stats.tokens += tokens
+        logger.debug(f"embedded batch inputs={len(batch)} tokens={tokens} time={elapsed:.3f}s")
+        for (part, md, _), emb in zip(batch, result):
+            self._vectors.append(_vector_for(part, md, md["sub_index"], emb))
+        while len(self._vectors) >= self.upsert_batch_size:
+            vectors = self._vectors[:self.upsert_batch_size]
+            del self._vectors[:self.upsert_batch_size]
+            self._submit_upsert(vectors)
+
+    def _drain(self, block: bool) -> None:
+        # 제출 순서대로 회수 (완료된 앞쪽 배치만, block이면 전부)
+        while self._embedding and (block or self._embedding[0].done()):
+            self._reap_embed(self._embedding.popleft())
+        while self._upserting and (block or self._upserting[0].done()):
+            self._reap_upsert(self._upserting.popleft())
+
+    # ----- upsert -----
+    def _submit_upsert(self, vectors: List[Dict]) -> None:
+        if not self.upsert:
+            logger.debug(f"[DRY_RUN] skip upsert of {len(vectors)} vectors to namespace={self.namespace}")
+            self._count_down(vectors)
+            return
+        while len(self._upserting) >= self.upsert_concurrency * 2:
+            self._reap_upsert(self._upserting.popleft())
+        self._upserting.append(self._upsert_pool.submit(self._upsert_batch, vectors))
+
+    def _upsert_batch(self, vectors: List[Dict]) -> Tuple[List[Dict], Optional[Exception], float]:
+        start = time.monotonic()
+        try:
+            index.upsert(vectors=vectors, namespace=self.namespace)
+            error = None
+        except Exception as e:
+            error = e
+        return vectors, error, time.monotonic() - start
+
+    def _reap_upsert(self, future: Future) -> None:
+        vectors, error, elapsed = future.result()
+        if error is not None:
+            self.stats.errors += 1
+            self._fail({v["metadata"].get("mongo_id") for v in vectors} - {None})
+            logger.warning(f"upsert failed namespace={self.namespace} vectors={len(vectors)} time={elapsed:.3f}s error={error}")
+            return
+        self.stats.vectors_upserted += len(vectors)
+        self.stats.upsert_time += elapsed
+        logger.info(f"Upserted batch of {len(vectors)} vectors to namespace={self.namespace} in {elapsed:.3f}s")
+        self._count_down(vectors)
+
+    # ----- 문서 단위 완료 추적 -----
+    def _count_down(self, vectors: Iterable[Dict]) -> None:
+        for v in vectors:
+            mongo_id = v["metadata"].get("mongo_id")
+            if mongo_id in self._remaining:
+                self._remaining[mongo_id] -= 1
+                if self._remaining[mongo_id] <= 0:
+                    self._finish(mongo_id)
+
+    def _finish(self, mongo_id: str) -> None:
+        del self._remaining[mongo_id]
+        parts = self._parts.pop(mongo_id, 0)
+        if self._on_document_done is not None:
+            self._on_document_done(mongo_id, parts)
+
+    def _fail(self, mongo_ids: Iterable[str]) -> None:
+        for mongo_id in mongo_ids:
+            self.failed.add(mongo_id)
+            self._remaining.pop(mongo_id, None)
+            self._parts.pop(mongo_id, None)
+
+    def close(self) -> UploadStats:
+        """남은 조각을 모두 임베딩/upsert하고 스레드를 정리합니다."""
+        if self._pending:
+            self._submit_embed()
+        self._drain(block=True)
+        if self._vectors:
+            vectors, self._vectors = self._vectors, []
+            self._submit_upsert(vectors)
+            self._drain(block=True)
+        self._embed_pool.shutdown(wait=True)
+        self._upsert_pool.shutdown(wait=True)
+        return self.stats
+
+MONGO_STATE_FLUSH_SIZE = 500  # 업로드 상태(vector_hash)를 Mongo에 모아 쓰는 단위
+PINECONE_DELETE_BATCH = 1000
+
+
+def prune_stale_vectors(namespace: str, expected_parts: Dict[str, int], keep: Set[str], dry_run: bool = False) -> int:
+    """namespace의 벡터 중 현재 Mongo 문서에 해당하지 않는 벡터를 삭제하고 개수를 반환합니다.
+
+    - expected_parts: mongo_id → 현재 조각 수 (sub_index가 그 이상이면 조각 수가 줄어든 문서의 남은 벡터)
+    - keep: 이번에 갱신하지 못한 문서 → 기존 벡터 유지
+    - 예전 uuid 형식 id(중복 업로드의 흔적)도 삭제 대상입니다.
+    """
+    stale: List[str] = []
+    try:
+        for ids in index.list(namespace=namespace):
+            for vec_id in ids:
+                mongo_id, sub_index = parse_vector_id(vec_id)
+                if mongo_id in keep:
+                    continue
+                if mongo_id is None or mongo_id not in expected_parts or sub_index >= expected_parts[mongo_id]:
+                    stale.append(vec_id)
+    except Exception as e:
+        logger.warning(f"index.list failed namespace={namespace}, skip pruning stale vectors: {e}")
+        return 0
+
+    if dry_run:
+        logger.info(f"[DRY_RUN] would delete {len(stale)} stale vectors from namespace={namespace}")
+        return len(stale)
+    for i in range(0, len(stale), PINECONE_DELETE_BATCH):
+        index.delete(ids=stale[i:i + PINECONE_DELETE_BATCH], namespace=namespace)
+    logger.info(f"Deleted {len(stale)} stale vectors from namespace={namespace}")
+    return len(stale)
+
+
+# 업로드 작업 설정 (cron/K8s에서 무인 실행)
+MONGO_MAX_RETRIES = int(os.getenv("MONGO_MAX_RETRIES", "8"))  # 진전 없이 연속으로 실패하면 중단
+MONGO_RETRY_MAX_DELAY = float(os.getenv("MONGO_RETRY_MAX_DELAY", "300"))
+CHECKPOINT_EVERY_DOCS = int(os.getenv("UPLOAD_CHECKPOINT_EVERY", "200"))
+CHECKPOINT_EVERY_SECONDS = float(os.getenv("UPLOAD_CHECKPOINT_SECONDS", "30"))
+EMBEDDING_PRICE_PER_1M_TOKENS = float(os.getenv("EMBEDDING_PRICE_PER_1M_TOKENS", "0.02"))  # text-embedding-3-small (USD)
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path_for(checkpoint_dir: str, namespace: str) -> str:
+    return os.path.join(checkpoint_dir, f"upload_checkpoint_{namespace}.json")
+
+
+def load_checkpoint(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"checkpoint {path} unreadable, starting from scratch: {e}")
+        return None
+    return data if data.get("version") == CHECKPOINT_VERSION else None
+
+
+def save_checkpoint(path: str, data: Dict[str, Any]) -> None:
+    """임시 파일에 쓴 뒤 교체 (쓰는 도중 죽어도 이전 체크포인트가 깨지지 않음)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def estimate_embedding_cost(tokens: int) -> float:
+    return tokens / 1_000_000 * EMBEDDING_PRICE_PER_1M_TOKENS
+
+
+def upload_chunks_to_pinecone(
+    category: str = None,
+    batch_size: int = 100,
+    dry_run: bool = False,
+    incremental: bool = False,
+    checkpoint_path: Optional[str] = None,
+    max_retries: int = MONGO_MAX_RETRIES,
+):
     """Mongo에서 청크를 읽어 안전 분할 후 Pinecone에 업로드합니다.
-    네트워크 오류 발생 시 사용자에게 재시도 여부를 물어보고, 'y'이면 재접속 후 마지막 처리된 _id 이후로 재개합니다.
+    임베딩은 BatchEmbedUpserter가 토큰 예산 단위 배치로 동시에 요청하고, upsert와 겹쳐 실행합니다.
+    벡터 id는 "{mongo_id}:{sub_index}"라 다시 올려도 중복되지 않고, 올린 문서에는 metadata.vector_hash/vector_parts를 기록합니다.
+    incremental=True면 vector_hash가 같은 문서는 건너뜁니다.
+    끝까지 읽으면 Mongo에 없는 문서(와 예전 uuid id)의 벡터를 namespace에서 삭제합니다.
+
+    무인 실행용:
+    - Mongo 네트워크 오류는 지수 백오프로 재접속해 마지막으로 읽은 _id 이후부터 재개 (max_retries번 연속 실패하면 예외)
+    - checkpoint_path를 주면 "여기까지는 모두 처리됨"이 보장된 _id, 처리 중인 문서 id, 그 앞에서 실패한 문서 id, 카운터를
+      주기적으로 저장하고 다음 실행 때 실패한 문서를 다시 올린 뒤 그 _id 이후부터 이어서 처리 (정상 종료 시 파일 삭제)
+    - dry_run=True면 임베딩/upsert/Mongo 기록/삭제를 하지 않고 tiktoken으로 토큰 수와 비용만 추정
     """
     query = {"metadata.category": category} if category else {}
 
     # allow reassigning module-level client/db/collection on reconnect
     global client, db, collection
 
-    batch = []
-    total = 0
-    total_parts = 0
-    total_embed_time = 0.0
-    total_upsert_time = 0.0
+    namespace = category or "default"
+    job = {"category": category, "incremental": incremental, "dry_run": dry_run}
+    completed = False
+
+    expected_parts: Dict[str, int] = {}  # mongo_id → Pinecone에 있어야 할 조각 수
+    keep: Set[str] = set()  # 올리지 못한 문서 → 기존 벡터 유지
+    pending_hash: Dict[str, str] = {}  # 업로드 중인 mongo_id → vector_hash
+    state_updates: List[UpdateOne] = []
+    # 읽은 순서대로의 처리 중 문서: 앞에서부터 끝난 만큼 watermark를 당김
+    in_flight: Deque[str] = deque()
+    finished: Set[str] = set()
+    watermark: Optional[str] = None  # 이 _id까지는 모두 처리 완료 또는 실패 (체크포인트에 저장)
+    retry_ids: Set[str] = set()  # 이전 실행에서 watermark 앞에서 실패해 다시 올려야 하는 문서
+    done_docs = 0
+
+    stats = UploadStats()
     errors = 0
+    elapsed_before = 0.0
+    last_id = None  # 이번 실행에서 마지막으로 읽은 _id (재접속 시 재개 지점)
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get("job") != job:
+        logger.warning(f"checkpoint {checkpoint_path} is for a different job {checkpoint.get('job')}, ignoring it")
+        checkpoint = None
+    if checkpoint:
+        watermark = last_id = checkpoint["last_id"]
+        retry_ids = set(checkpoint.get("failed_ids", []))
+        counters = checkpoint.get("counters", {})
+        done_docs = int(counters.pop("documents_done", 0))
+        errors = int(counters.pop("errors_outer", 0))
+        elapsed_before = float(counters.pop("elapsed", 0.0))
+        stats = UploadStats(**{k: v for k, v in counters.items() if k in UploadStats.__dataclass_fields__})
+        logger.info(
+            f"Resuming category={category} from checkpoint after _id={watermark} "
+            f"(documents_done={done_docs}, re-processing {len(checkpoint.get('pending_ids', []))} in-flight docs, "
+            f"retrying {len(retry_ids)} failed docs)"
+        )
+
+    def flush_state() -> None:
+        if not state_updates:
+            return
+        try:
+            collection.bulk_write(state_updates, ordered=False)
+        except PyMongoError as e:
+            # 기록하지 못한 문서는 다음 incremental 실행에서 다시 임베딩될 뿐
+            logger.warning(f"failed to record vector_hash for {len(state_updates)} docs: {e}")
+        state_updates.clear()
+
+    def on_document_done(mongo_id: str, parts: int) -> None:
+        expected_parts[mongo_id] = parts
+        keep.discard(mongo_id)
+        if mongo_id in retry_ids:
+            # 재시도 문서는 watermark 앞에 있으므로 in_flight에 없음
+            retry_ids.discard(mongo_id)
+        else:
+            finished.add(mongo_id)
+        vec_hash = pending_hash.pop(mongo_id, None)
+        if dry_run or vec_hash is None:
+            return
+        state_updates.append(UpdateOne(
+            {"_id": ObjectId(mongo_id)},
+            {"$set": {"metadata.vector_hash": vec_hash, "metadata.vector_parts": parts}},
+        ))
+        if len(state_updates) >= MONGO_STATE_FLUSH_SIZE:
+            flush_state()
+
+    uploader = BatchEmbedUpserter(
+        namespace, upsert_batch_size=batch_size, upsert=not dry_run, stats=stats, on_document_done=on_document_done
+    )
 
-    start_all = time.monotonic()
-    last_id = None
+    def advance_watermark() -> None:
+        nonlocal watermark, done_docs
+        while in_flight and (in_flight[0] in finished or in_flight[0] in uploader.failed):
+            watermark = in_flight.popleft()
+            finished.discard(watermark)
+            done_docs += 1
 
-    # cursor may be recreated after reconnect; use a while loop to allow resume
-    while True:
+    start_all = time.monotonic()
+    last_checkpoint_at = start_all
+    docs_since_checkpoint = 0
+
+    def write_checkpoint() -> None:
+        nonlocal last_checkpoint_at, docs_since_checkpoint
+        if not checkpoint_path:
+            return
+        advance_watermark()
+        # Mongo에 vector_hash를 먼저 기록해야 재개 후 incremental 판정이 맞음
+        flush_state()
+        # watermark를 지나간 실패 문서는 다음 실행에서 다시 올림 (in_flight에 남은 문서는 어차피 다시 읽음)
+        failed_ids = (retry_ids | uploader.failed) - set(in_flight)
+        counters = dict(
+            asdict(stats),
+            documents_done=done_docs,
+            errors_outer=errors,
+            elapsed=elapsed_before + time.monotonic() - start_all,
+        )
         try:
-            # create cursor, optionally resuming after last_id
-            if last_id is not None:
-                resume_query = dict(query)
-                resume_query.update({"_id": {"$gt": ObjectId(last_id)}})
-                cursor = collection.find(resume_query).sort([("_id", 1)])
+            save_checkpoint(checkpoint_path, {
+                "version": CHECKPOINT_VERSION,
+                "job": job,
+                "last_id": watermark,
+                "pending_ids": list(in_flight),
+                "failed_ids": sorted(failed_ids),
+                "counters": counters,
+                "updated_at": time.time(),
+            })
+        except OSError as e:
+            logger.warning(f"failed to write checkpoint {checkpoint_path}: {e}")
+        last_checkpoint_at = time.monotonic()
+        docs_since_checkpoint = 0
+
+    def preload_done_docs() -> None:
+        # 체크포인트 이전 문서의 조각 수 (끝난 뒤 오래된 벡터 정리에 필요)
+        done_query = dict(query, _id={"$lte": ObjectId(watermark)})
+        for doc in collection.find(done_query, {"metadata.vector_parts": 1}):
+            parts = (doc.get("metadata") or {}).get("vector_parts")
+            if parts is None:
+                keep.add(str(doc["_id"]))
             else:
-                cursor = collection.find(query).sort([("_id", 1)])
-
-            for doc in cursor:
-                total += 1
-                text = doc.get("text", "")
-                metadata = dict(doc.get("metadata", {}))
-                metadata["mongo_id"] = str(doc.get("_id"))
-
-                try:
-                    batch_before = len(batch)
-                    batch = safe_embed_and_upsert(text, metadata, namespace=category or "default", batch_list=batch, batch_size=batch_size)
-                    parts_added = len(batch) - batch_before if len(batch) >= batch_before else 0
-                    total_parts += parts_added
-                except Exception as e:
-                    errors += 1
-                    logger.exception(f"Error processing mongo_id={metadata.get('mongo_id')}: {e}")
-
-                # remember last processed id for resume
-                last_id = metadata.get("mongo_id")
-
-                if total % 50 == 0:
-                    logger.info(f"Processed {total} documents so far...")
-
-                # If dry_run, log periodically
-                if dry_run and total % 200 == 0:
-                    logger.info(f"[DRY_RUN] processed {total} docs, current pending batch size {len(batch)}")
+                expected_parts[str(doc["_id"])] = int(parts)
+
+    def process_document(doc: Dict) -> None:
+        nonlocal errors
+        text = doc.get("text", "")
+        metadata = dict(doc.get("metadata", {}))
+        metadata["mongo_id"] = mongo_id = str(doc.get("_id"))
+        vec_hash = vector_source_hash(text, metadata)
+
+        if incremental and metadata.get("vector_hash") == vec_hash:
+            # 내용이 그대로인 문서: 임베딩/upsert 생략
+            stats.skipped += 1
+            on_document_done(mongo_id, int(metadata.get("vector_parts") or 0))
+        elif dry_run:
+            # 임베딩 호출 없이 토큰 수만 계산
+            parts = split_text_into_token_chunks(text)
+            stats.documents += 1
+            stats.parts += len(parts)
+            stats.tokens += sum(len(enc.encode(part)) for part in parts)
+            on_document_done(mongo_id, len(parts))
+        else:
+            pending_hash[mongo_id] = vec_hash
+            try:
+                uploader.add(text, metadata)
+            except Exception as e:
+                errors += 1
+                uploader.failed.add(mongo_id)
+                logger.exception(f"Error processing mongo_id={mongo_id}: {e}")
+
+    retry_sent: Set[str] = set()
+
+    def retry_failed_docs() -> None:
+        # 이전 실행에서 실패한 문서를 다시 올림 (watermark/last_id는 건드리지 않음)
+        todo = sorted(retry_ids - retry_sent)
+        if not todo:
+            return
+        logger.info(f"Retrying {len(todo)} documents that failed before the checkpoint")
+        retry_query = dict(query, _id={"$in": [ObjectId(mongo_id) for mongo_id in todo]})
+        for doc in collection.find(retry_query):
+            mongo_id = str(doc.get("_id"))
+            retry_sent.add(mongo_id)
+            process_document(doc)
+        # Mongo에서 사라진 문서는 다시 올릴 것이 없음
+        retry_ids.intersection_update(retry_sent)
+
+    attempt = 0
+    preloaded = watermark is None
+    try:
+        # cursor may be recreated after reconnect; use a while loop to allow resume
+        while True:
+            try:
+                if not preloaded:
+                    preload_done_docs()
+                    preloaded = True
+                retry_failed_docs()
+
+                # create cursor, optionally resuming after last_id
+                if last_id is not None:
+                    resume_query = dict(query)
+                    resume_query.update({"_id": {"$gt": ObjectId(last_id)}})
+                    cursor = collection.find(resume_query).sort([("_id", 1)])
+                else:
+                    cursor = collection.find(query).sort([("_id", 1)])
+
+                for doc in cursor:
+                    attempt = 0  # 진전이 있으면 재시도 횟수 초기화
+                    mongo_id = str(doc.get("_id"))
+                    in_flight.append(mongo_id)
+                    process_document(doc)
+
+                    # remember last processed id for resume
+                    last_id = mongo_id
+                    docs_since_checkpoint += 1
+                    advance_watermark()
+
+                    if (done_docs + len(in_flight)) % 50 == 0:
+                        logger.info(f"Processed {done_docs + len(in_flight)} documents so far...")
+
+                    if docs_since_checkpoint >= CHECKPOINT_EVERY_DOCS or time.monotonic() - last_checkpoint_at >= CHECKPOINT_EVERY_SECONDS:
+                        write_checkpoint()
+
+                # finished iteration without errors -> exit loop
+                completed = True
+                break
 
-            # finished iteration without errors -> exit loop
-            break
+            except (ServerSelectionTimeoutError, NetworkTimeout, PyMongoError) as e:
+                # Network or server selection error: back off, reconnect and resume after last_id
+                attempt += 1
+                write_checkpoint()
+                if attempt > max_retries:
+                    logger.error(f"MongoDB connection error, giving up after {max_retries} retries: {e}")
+                    raise
+                delay = min(MONGO_RETRY_MAX_DELAY, 2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+                logger.error(f"MongoDB connection error (retry {attempt}/{max_retries} in {delay:.1f}s): {e}")
+                time.sleep(delay)
 
-        except (ServerSelectionTimeoutError, NetworkTimeout, PyMongoError) as e:
-            # Network or server selection error: prompt user to retry or abort
-            logger.error(f"MongoDB connection error: {e}")
-            answer = None
-            while answer not in ("y", "n"):
                 try:
-                    answer = input("네트워크 오류 발생. 다시 시도하시겠습니까? (y/n): ").strip().lower()
-                except KeyboardInterrupt:
-                    answer = "n"
-                    print()
-                if answer not in ("y", "n"):
-                    print("y 또는 n을 입력하세요.")
-
-            if answer == "n":
-                logger.info("User chose not to retry. Aborting upload.")
-                break
-
-            # attempt to recreate client and continue loop
-            logger.info("Attempting to reconnect to MongoDB...")
-            try:
-                client = create_mongo_client()
-                db = client["halla_academic_db"]
-                collection = db["regulation_chunks"]
-                logger.info("Reconnected to MongoDB, resuming...")
+                    client = create_mongo_client()
+                    db = client["halla_academic_db"]
+                    collection = db["regulation_chunks"]
+                    logger.info("Reconnected to MongoDB, resuming...")
+                except Exception as re:
+                    logger.exception(f"Reconnection attempt failed: {re}")
                 # continue while loop to recreate cursor (with last_id resume)
                 continue
-            except Exception as re:
-                logger.exception(f"Reconnection attempt failed: {re}")
-                # prompt again in next loop iteration
-                continue
-
-    # 남아있는 배치 flush (실제 업서트는 dry_run False일 때만 수행)
-    if batch:
-        if dry_run:
-            logger.info(f"[DRY_RUN] final pending vectors: {len(batch)} (not upserting)")
-        else:
-            upsert_start = time.monotonic()
-            index.upsert(vectors=batch, namespace=category or "default")
-            upsert_elapsed = time.monotonic() - upsert_start
-            total_upsert_time += upsert_elapsed
-            logger.info(f"Final upserted {len(batch)} vectors to namespace={category} in {upsert_elapsed:.3f}s")
 
-    elapsed_all = time.monotonic() - start_all
-    logger.info(f"upload_chunks_to_pinecone completed category={category} processed_documents={total} total_parts_estimate={total_parts} errors={errors} elapsed={elapsed_all:.3f}s")
-
-    # 남아있는 배치 flush (실제 업서트는 dry_run False일 때만 수행)
-    if batch:
-        if dry_run:
-            logger.info(f"[DRY_RUN] final pending vectors: {len(batch)} (not upserting)")
-        else:
-            upsert_start = time.monotonic()
-            index.upsert(vectors=batch, namespace=category or "default")
-            upsert_elapsed = time.monotonic() - upsert_start
-            total_upsert_time += upsert_elapsed
-            logger.info(f"Final upserted {len(batch)} vectors to namespace={category} in {upsert_elapsed:.3f}s")
-
-    elapsed_all = time.monotonic() - start_all
-    logger.info(f"upload_chunks_to_pinecone completed category={category} processed_documents={total} total_parts_estimate={total_parts} errors={errors} elapsed={elapsed_all:.3f}s")
+        # 남아있는 조각 임베딩 + 배치 flush (실제 업서트는 dry_run False일 때만 수행)
+        uploader.close()
+        flush_state()
+        advance_watermark()
+    except BaseException:
+        # 중단(예외/Ctrl+C) 시에도 끝난 문서까지는 체크포인트에 남김
+        try:
+            uploader.close()
+        finally:
+            write_checkpoint()
+        raise
+
+    keep |= uploader.failed
+    if dry_run:
+        logger.info(
+            f"[DRY_RUN] would embed docs={stats.documents} parts={stats.parts} tokens={stats.tokens:,} "
+            f"estimated_cost=${estimate_embedding_cost(stats.tokens):.4f} (model={EMBEDDING_MODEL})"
+        )
+
+    # 전체를 끝까지 읽었을 때만 정리 (중간에 중단하면 expected_parts가 불완전)
+    if completed:
+        stats.vectors_deleted = prune_stale_vectors(namespace, expected_parts, keep, dry_run=dry_run)
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    elapsed_all = elapsed_before + time.monotonic() - start_all
+    logger.info(
+        f"upload_chunks_to_pinecone completed category={category} processed_documents={done_docs} "
+        f"skipped={stats.skipped} total_parts={stats.parts} deleted_vectors={stats.vectors_deleted} "
+        f"errors={errors + stats.errors} elapsed={elapsed_all:.3f}s"
+    )
+    logger.info(f"throughput category={category}: {stats.throughput(elapsed_all)}")
+    return stats
 
 
 def main():
     parser = argparse.ArgumentParser(description="Upload Mongo chunks to Pinecone with mongo_id metadata")
     parser.add_argument("--category", dest="category", default=None, help="Category(namespace) to upload (e.g., law_articles, appendix_tables). If omitted, upload all.")
     parser.add_argument("--batch-size", dest="batch_size", type=int, default=100, help="Batch size for upserts")
+    parser.add_argument("--incremental", action="store_true", help="Only embed/upsert chunks whose content hash changed since the last upload")
+    parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Skip embedding/upsert and estimate token cost only")
+    parser.add_argument("--checkpoint-dir", dest="checkpoint_dir", default=os.getenv("UPLOAD_CHECKPOINT_DIR"), help="Directory for resumable checkpoint files (one per category)")
+    parser.add_argument("--max-retries", dest="max_retries", type=int, default=MONGO_MAX_RETRIES, help="Consecutive MongoDB retries before giving up")
     args = parser.parse_args()
 
-    if args.category:
-        upload_chunks_to_pinecone(category=args.category, batch_size=args.batch_size)
-    else:
-        # 업로드 대상이 명확하면 여기서 목록을 지정하세요
-        for cat in ["law_articles", "appendix_tables"]:
-            print(f"\n=== Uploading category: {cat} ===")
-            upload_chunks_to_pinecone(category=cat, batch_size=args.batch_size)
+    # 업로드 대상이 명확하면 여기서 목록을 지정하세요
+    categories = [args.category] if args.category else ["law_articles", "appendix_tables"]
+    for cat in categories:
+        print(f"\n=== Uploading category: {cat} ===")
+        upload_chunks_to_pinecone(
+            category=cat,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+            incremental=args.incremental,
+            checkpoint_path=checkpoint_path_for(args.checkpoint_dir, cat) if args.checkpoint_dir else None,
+            max_retries=args.max_retries,
+        )
 
 
 if __name__ == "__main__":
     main()
-
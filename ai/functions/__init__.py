@@ -5,5 +5,6 @@
 """
 
 from .analyzer import FunctionCalling, tools
+from .router import RouteDecision, ToolRouter
 
-__all__ = ["FunctionCalling", "tools"]
+__all__ = ["FunctionCalling", "tools", "ToolRouter", "RouteDecision"]
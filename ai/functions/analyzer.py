@@ -1,17 +1,19 @@
 import json
-import requests
 from pprint import pprint
 import re
 import time
 from datetime import datetime, timedelta
-from typing import Optional
-from bs4 import BeautifulSoup
+from typing import Dict, Optional
 import os
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 from dataclasses import dataclass
 
+from app.ai.concurrency import run_blocking
+from app.ai.functions.cafeteria import cafeteria_cache, render_menu
+from app.ai.functions.search_cache import WebSearchResult, web_search_cache
+
 # 순환 참조 방지: config 대신 직접 생성
 _BASE_DIR = Path(__file__).resolve().parent.parent.parent  # app/
 _DOTENV_PATH = _BASE_DIR / "apikey.env"
@@ -25,8 +27,21 @@ class Model:
     o1: str = "o1"
 
 model = Model()
+
+
+@dataclass
+class ToolResult:
+    """FunctionCalling.aexecute 결과
+
+    output만 LLM에 전달하고, cache 같은 실행 정보는 FunctionCallMetadata에 바로 기록합니다.
+    """
+
+    output: str
+    cache: Optional[Dict[str, str]] = None  # 웹검색 단계별 캐시 적중 여부 {단계: hit|miss}
+
 api_key = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=api_key, max_retries=1)
+async_client = AsyncOpenAI(api_key=api_key, max_retries=1)
 
 def makeup_response(message, finish_reason="ERROR"):
     '''api 응답형식으로 반환해서
@@ -92,67 +107,100 @@ tools = [
     ]
 
 # --- 공지 카테고리 LLM 분류기 ---
-def _classify_notice_category_llm(user_input: str, context_info: str | None = None) -> str | None:
+NOTICE_CATEGORIES = ["학사공지", "비교과공지", "장학공지", "일반공지", "해당없음"]
+
+def _notice_classifier_request(user_input: str, context_info: str | None = None) -> dict:
+    """공지 카테고리 분류용 Responses API 요청 인자 (동기/비동기 공용)."""
+    prompt = (
+        "다음 사용자의 요청이 한라대학교 '공지' 중 어떤 카테고리에 해당하는지 하나만 선택해 답하세요.\n"
+        "카테고리: 학사공지 | 비교과공지 | 장학공지 | 일반공지 | 해당없음\n"
+        "규칙:\n"
+        "- 정확히 위의 단어 중 하나만 출력하세요. 다른 말, 설명, 따옴표 없이.\n"
+        f"사용자 입력: {user_input}\n"
+        f"대화 문맥: {context_info or '(없음)'}\n\n"
+        "정답:"
+    )
+    return {
+        "model": model.o3_mini,
+        "input": [{
+            "role": "user",
+            "content": [{"type": "input_text", "text": prompt}],
+        }],
+    }
+
+def _pick_notice_category(resp) -> str | None:
+    raw = (getattr(resp, "output_text", None) or "").strip()
+    print("공지 카테고리 분류기 원문:", raw)
+    # 정규화 및 선택
+    text_norm = raw.replace(" ", "").replace("\n", "")
+    for a in NOTICE_CATEGORIES:
+        if a in text_norm:
+            return a
+    return None
+
+def _classify_notice_category_llm(user_input: str, context_info: str | None = None, stages: dict | None = None) -> str | None:
     """사용자 입력이 어떤 공지사항 카테고리인지 LLM으로 분류하여 카테고리 문자열을 반환.
     반환 가능 값: "학사공지", "비교과공지", "장학공지", "일반공지", "해당없음". 인식 실패 시 None.
+    같은 (질문, 문맥)의 분류 결과는 web_search_cache.classifier에서 재사용합니다.
     """
+    stages = stages if stages is not None else {}
+    cached = web_search_cache.get_query(web_search_cache.classifier, user_input, context_info)
+    if cached is not None:
+        stages["classifier"] = "hit"
+        return cached
+    stages["classifier"] = "miss"
     try:
-        allowed = ["학사공지", "비교과공지", "장학공지", "일반공지", "해당없음"]
-        prompt = (
-            "다음 사용자의 요청이 한라대학교 '공지' 중 어떤 카테고리에 해당하는지 하나만 선택해 답하세요.\n"
-            "카테고리: 학사공지 | 비교과공지 | 장학공지 | 일반공지 | 해당없음\n"
-            "규칙:\n"
-            "- 정확히 위의 단어 중 하나만 출력하세요. 다른 말, 설명, 따옴표 없이.\n"
-            f"사용자 입력: {user_input}\n"
-            f"대화 문맥: {context_info or '(없음)'}\n\n"
-            "정답:"
-        )
-
-        resp = client.responses.create(
-            model=model.o3_mini,
-            input=[{
-                "role": "user",
-                "content": [{"type": "input_text", "text": prompt}],
-            }],
-        )
-        raw = (getattr(resp, "output_text", None) or "").strip()
-        print("공지 카테고리 분류기 원문:", raw)
-        # 정규화 및 선택
-        text_norm = raw.replace(" ", "").replace("\n", "")
-        for a in allowed:
-            if a in text_norm:
-                return a
+        resp = client.responses.create(**_notice_classifier_request(user_input, context_info))
+        category = _pick_notice_category(resp)
+    except Exception:
         return None
+    web_search_cache.put_query(web_search_cache.classifier, user_input, context_info, category)
+    return category
+
+async def _aclassify_notice_category_llm(user_input: str, context_info: str | None = None, stages: dict | None = None) -> str | None:
+    """_classify_notice_category_llm의 비동기 버전."""
+    stages = stages if stages is not None else {}
+    cached = web_search_cache.get_query(web_search_cache.classifier, user_input, context_info)
+    if cached is not None:
+        stages["classifier"] = "hit"
+        return cached
+    stages["classifier"] = "miss"
+    try:
+        resp = await async_client.responses.create(**_notice_classifier_request(user_input, context_info))
+        category = _pick_notice_category(resp)
     except Exception:
         return None
+    web_search_cache.put_query(web_search_cache.classifier, user_input, context_info, category)
+    return category
 
 # --- 규칙 기반 사이트 선호 라우팅 ---
-def _prefer_halla_site_query(user_input: str, context_info: str | None = None) -> str | None:
-    """특정 요구사항일 때 한라대 특정 페이지를 우선 탐색하도록 검색어를 구성.
-    매칭되면 URL과 site 필터를 포함한 쿼리를 반환, 없으면 None.
-    """
+NOTICE_CATEGORY_URLS = {
+    "학사공지": "https://www.halla.ac.kr/kr/242/subview.do",
+    "비교과공지": "https://www.halla.ac.kr/kr/243/subview.do",
+    "장학공지": "https://www.halla.ac.kr/kr/244/subview.do",
+    "일반공지": "https://www.halla.ac.kr/kr/241/subview.do",
+}
+
+def _routing_text(user_input: str, context_info: str | None) -> str:
     base = (context_info or "")
-    text = f"{user_input}\n{base}".lower()
+    return f"{user_input}\n{base}".lower()
 
+def _menu_site_query(user_input: str, text: str) -> str | None:
     # 메뉴/학식 라우팅
     menu_keywords = ["학식", "식단", "메뉴", "점심", "저녁", "오늘 메뉴"]
     if any(k in text for k in menu_keywords):
         url = "https://www.halla.ac.kr/kr/211/subview.do"
         return f"site:halla.ac.kr {url} {user_input}"
+    return None
 
-    # 공지 라우팅: LLM 분류 기반 → 실패 시 키워드 기반 폴백
-    category = _classify_notice_category_llm(user_input, context_info)
-    category_to_url = {
-        "학사공지": "https://www.halla.ac.kr/kr/242/subview.do",
-        "비교과공지": "https://www.halla.ac.kr/kr/243/subview.do",
-        "장학공지": "https://www.halla.ac.kr/kr/244/subview.do",
-        "일반공지": "https://www.halla.ac.kr/kr/241/subview.do",
-    }
+def _category_site_query(category: str | None, user_input: str) -> str | None:
     if category and category != "해당없음":
-        url = category_to_url.get(category)
+        url = NOTICE_CATEGORY_URLS.get(category)
         if url:
             return f"site:halla.ac.kr {url} {user_input}"
+    return None
 
+def _keyword_site_query(user_input: str, text: str) -> str | None:
     # 폴백: 단순 키워드 매칭
     if "학사공지" in text:
         url = "https://www.halla.ac.kr/kr/242/subview.do"
@@ -170,89 +218,184 @@ def _prefer_halla_site_query(user_input: str, context_info: str | None = None) -
     # 미매칭 시 라우팅 없음
     return None
 
+def _prefer_halla_site_query(user_input: str, context_info: str | None = None, stages: dict | None = None) -> str | None:
+    """특정 요구사항일 때 한라대 특정 페이지를 우선 탐색하도록 검색어를 구성.
+    매칭되면 URL과 site 필터를 포함한 쿼리를 반환, 없으면 None.
+    """
+    text = _routing_text(user_input, context_info)
+    menu_query = _menu_site_query(user_input, text)
+    if menu_query:
+        return menu_query
+
+    # 공지 라우팅: LLM 분류 기반 → 실패 시 키워드 기반 폴백
+    category = _classify_notice_category_llm(user_input, context_info, stages)
+    return _category_site_query(category, user_input) or _keyword_site_query(user_input, text)
+
+async def _aprefer_halla_site_query(user_input: str, context_info: str | None = None, stages: dict | None = None) -> str | None:
+    """_prefer_halla_site_query의 비동기 버전."""
+    text = _routing_text(user_input, context_info)
+    menu_query = _menu_site_query(user_input, text)
+    if menu_query:
+        return menu_query
+
+    category = await _aclassify_notice_category_llm(user_input, context_info, stages)
+    return _category_site_query(category, user_input) or _keyword_site_query(user_input, text)
+
+def _recent_context_info(chat_context) -> str:
+    if chat_context:
+        print("[WEB] context available -> trimming recent messages")
+        recent_messages = chat_context[-4:]
+        return "\n".join([
+            f"{m.get('role','unknown')}: {m.get('content','')}" for m in recent_messages if m.get('role') != 'system'
+        ])
+    return ""
+
+def _rewrite_request(user_input: str, context_info: str) -> dict:
+    # 재작성 요청
+    rewrite_prompt = (
+        f"{user_input}\n\n[대화 문맥]: {context_info} 를 참고해 (이전 문맥과 연결된 후속 질문이면 연관된 핵심 키워드 포함) "
+        "간결한 검색어 조합을 새로 만들어라. 가능하면 site:halla.ac.kr 또는 관련 공식 URL 포함."
+    )
+    return {
+        "model": "gpt-4o",
+        "input": [{"role": "user", "content": [{"type": "input_text", "text": rewrite_prompt}]}],
+        "text": {"format": {"type": "text"}},
+    }
+
+def _web_search_request(search_text: str) -> dict:
+    context_input = [{
+        "role": "user",
+        "content": [{"type": "input_text", "text": search_text}]
+    }]
+    return {
+        "model": model.advanced,
+        "input": context_input,
+        "text": {"format": {"type": "text"}},
+        "reasoning": {},
+        "tools": [{
+            "type": "web_search_preview",
+            "user_location": {"type": "approximate", "country": "KR"},
+            "search_context_size": "medium"
+        }],
+        "tool_choice": {"type": "web_search_preview"},
+        "temperature": 1,
+        "max_output_tokens": 2048,
+        "top_p": 1,
+        "store": True,
+    }
+
+def _extract_web_search_result(response) -> WebSearchResult | str:
+    """web_search_preview 응답에서 본문과 출처를 뽑습니다. 실패하면 오류 메시지 문자열을 반환."""
+    did_call = any(getattr(item, "type", None) == "web_search_call" for item in getattr(response, "output", []))
+    print(f"[WEB] search_call_performed={did_call}")
+
+    message = next((item for item in response.output if getattr(item, "type", None) == "message"), None)
+    if not message:
+        return "❌ GPT 응답 메시지를 찾을 수 없습니다."
+    content_block = next((block for block in message.content if getattr(block, "type", None) == "output_text"), None)
+    if not content_block:
+        return "❌ GPT 응답 내 output_text 항목을 찾을 수 없습니다."
+    output_text = getattr(content_block, "text", "").strip()
+    print(f"[WEB][DEBUG] LLM output_text:\n{output_text}")
+    annotations = getattr(content_block, "annotations", [])
+    citations = []
+    for a in annotations:
+        if getattr(a, "type", None) == "url_citation":
+            title = getattr(a, "title", "출처")
+            url = getattr(a, "url", "")
+            if url:
+                citations.append({"title": title, "url": url})
+    return WebSearchResult(text=output_text, citations=citations, did_call=did_call)
+
+def _render_web_search_result(result: WebSearchResult, start_ts: float) -> str:
+    text = result.text
+    if result.citations:
+        text += "\n\n📎 출처:\n" + "\n".join(f"[{c['title']}]({c['url']})" for c in result.citations)
+    print(f"[WEB][END] success total_elapsed={time.time()-start_ts:.2f}s")
+    return text + "\n[WEB_METADATA]elapsed={:.2f}s did_call={}".format(time.time()-start_ts, result.did_call)
+
+def _cached_rewrite(user_input: str, context_info: str, stages: dict) -> str | None:
+    cached = web_search_cache.get_query(web_search_cache.rewrite, user_input, context_info)
+    stages["rewrite"] = "hit" if cached is not None else "miss"
+    return cached
+
+def _cached_search_result(search_text: str, stages: dict) -> WebSearchResult | None:
+    print(f"[WEB] final_search_text='{search_text}'")
+    cached = web_search_cache.get_result(search_text)
+    stages["result"] = "hit" if cached is not None else "miss"
+    return cached
+
+def _store_search_result(search_text: str, result: WebSearchResult | str) -> None:
+    # 오류/빈 응답은 캐시하지 않음
+    if isinstance(result, WebSearchResult) and result.text:
+        web_search_cache.put_result(search_text, result)
+
 def search_internet(user_input: str, chat_context=None) -> str:
     start_ts = time.time()
     print(f"[WEB][START] query='{user_input}' chat_ctx={'Y' if chat_context else 'N'}")
     try:
-        if chat_context:
-            print("[WEB] context available -> trimming recent messages")
-            recent_messages = chat_context[-4:]
-            context_info = "\n".join([
-                f"{m.get('role','unknown')}: {m.get('content','')}" for m in recent_messages if m.get('role') != 'system'
-            ])
-        else:
-            recent_messages = []
-            context_info = ""
+        context_info = _recent_context_info(chat_context)
+        stages: dict = {}
 
-        preferred = _prefer_halla_site_query(user_input, context_info if context_info else None)
+        preferred = _prefer_halla_site_query(user_input, context_info if context_info else None, stages)
         if preferred:
             search_text = preferred
         else:
-            # 재작성 요청
-            rewrite_prompt = (
-                f"{user_input}\n\n[대화 문맥]: {context_info} 를 참고해 (이전 문맥과 연결된 후속 질문이면 연관된 핵심 키워드 포함) "
-                "간결한 검색어 조합을 새로 만들어라. 가능하면 site:halla.ac.kr 또는 관련 공식 URL 포함."
-            )
-            rewrite_resp = client.responses.create(
-                model="gpt-4o",
-                input=[{"role": "user", "content": [{"type": "input_text", "text": rewrite_prompt}]}],
-                text={"format": {"type": "text"}},
-            )
-            search_text = rewrite_resp.output_text.strip()
-        print(f"[WEB] final_search_text='{search_text}'")
-
-        context_input = [{
-            "role": "user",
-            "content": [{"type": "input_text", "text": search_text}]
-        }]
-
-        call_ts = time.time()
-        response = client.responses.create(
-            model=model.advanced,
-            input=context_input,
-            text={"format": {"type": "text"}},
-            reasoning={},
-            tools=[{
-                "type": "web_search_preview",
-                "user_location": {"type": "approximate", "country": "KR"},
-                "search_context_size": "medium"
-            }],
-            tool_choice={"type": "web_search_preview"},
-            temperature=1,
-            max_output_tokens=2048,
-            top_p=1,
-            store=True
-        )
-        print(f"[WEB] openai.responses.create elapsed={time.time()-call_ts:.2f}s total={time.time()-start_ts:.2f}s")
-
-        did_call = any(getattr(item, "type", None) == "web_search_call" for item in getattr(response, "output", []))
-        print(f"[WEB] search_call_performed={did_call}")
-
-        message = next((item for item in response.output if getattr(item, "type", None) == "message"), None)
-        if not message:
-            return "❌ GPT 응답 메시지를 찾을 수 없습니다."
-        content_block = next((block for block in message.content if getattr(block, "type", None) == "output_text"), None)
-        if not content_block:
-            return "❌ GPT 응답 내 output_text 항목을 찾을 수 없습니다."
-        output_text = getattr(content_block, "text", "").strip()
-        print(f"[WEB][DEBUG] LLM output_text:\n{output_text}")
-        annotations = getattr(content_block, "annotations", [])
-        citations = []
-        for a in annotations:
-            if getattr(a, "type", None) == "url_citation":
-                title = getattr(a, "title", "출처")
-                url = getattr(a, "url", "")
-                if url:
-                    citations.append(f"[{title}]({url})")
-        result = output_text
-        if citations:
-            result += "\n\n📎 출처:\n" + "\n".join(citations)
-        print(f"[WEB][END] success total_elapsed={time.time()-start_ts:.2f}s")
-        return result + "\n[WEB_METADATA]elapsed={:.2f}s did_call={}".format(time.time()-start_ts, did_call)
+            search_text = _cached_rewrite(user_input, context_info, stages)
+            if search_text is None:
+                rewrite_resp = client.responses.create(**_rewrite_request(user_input, context_info))
+                search_text = rewrite_resp.output_text.strip()
+                web_search_cache.put_query(web_search_cache.rewrite, user_input, context_info, search_text)
+
+        result = _cached_search_result(search_text, stages)
+        if result is None:
+            call_ts = time.time()
+            response = client.responses.create(**_web_search_request(search_text))
+            print(f"[WEB] openai.responses.create elapsed={time.time()-call_ts:.2f}s total={time.time()-start_ts:.2f}s")
+            result = _extract_web_search_result(response)
+            _store_search_result(search_text, result)
+        if isinstance(result, str):
+            return result
+        return _render_web_search_result(result, start_ts)
     except Exception as e:
         print(f"[WEB][ERROR] {e} total_elapsed={time.time()-start_ts:.2f}s")
         return f"🚨 웹검색 오류: {str(e)}"
 
+async def asearch_internet(user_input: str, chat_context=None) -> ToolResult:
+    """search_internet의 비동기 버전 (AsyncOpenAI 사용).
+
+    결과 문자열과 함께 단계별 캐시 적중 여부(cache)를 ToolResult로 돌려줍니다.
+    """
+    start_ts = time.time()
+    print(f"[WEB][START] async query='{user_input}' chat_ctx={'Y' if chat_context else 'N'}")
+    try:
+        context_info = _recent_context_info(chat_context)
+        stages: dict = {}
+
+        preferred = await _aprefer_halla_site_query(user_input, context_info if context_info else None, stages)
+        if preferred:
+            search_text = preferred
+        else:
+            search_text = _cached_rewrite(user_input, context_info, stages)
+            if search_text is None:
+                rewrite_resp = await async_client.responses.create(**_rewrite_request(user_input, context_info))
+                search_text = rewrite_resp.output_text.strip()
+                web_search_cache.put_query(web_search_cache.rewrite, user_input, context_info, search_text)
+
+        result = _cached_search_result(search_text, stages)
+        if result is None:
+            call_ts = time.time()
+            response = await async_client.responses.create(**_web_search_request(search_text))
+            print(f"[WEB] openai.responses.create elapsed={time.time()-call_ts:.2f}s total={time.time()-start_ts:.2f}s")
+            result = _extract_web_search_result(response)
+            _store_search_result(search_text, result)
+        if isinstance(result, str):
+            return ToolResult(result, cache=stages or None)
+        return ToolResult(_render_web_search_result(result, start_ts), cache=stages or None)
+    except Exception as e:
+        print(f"[WEB][ERROR] {e} total_elapsed={time.time()-start_ts:.2f}s")
+        return ToolResult(f"🚨 웹검색 오류: {str(e)}")
+
 
 def _parse_date_input(date_text: Optional[str]) -> datetime.date:
     today = datetime.now().date()
@@ -285,7 +428,8 @@ def _parse_date_input(date_text: Optional[str]) -> datetime.date:
 
 
 def get_halla_cafeteria_menu(date: Optional[str] = None, meal: Optional[str] = None) -> str:
-    """원주 한라대 학생식당 주간 식단 페이지를 파싱하여 특정 날짜/끼니 메뉴를 반환.
+    """원주 한라대 학생식당 주간 식단에서 특정 날짜/끼니 메뉴를 반환.
+    주간 식단은 cafeteria_cache 스냅샷에서 조회하며, 스냅샷이 없거나 다른 주일 때만 페이지를 다시 받습니다.
     제한: 서버가 주차 변경을 JS/폼으로 처리하면 과거/미래 주 선택은 어려울 수 있음. 이 경우 현재 주만 반환.
     """
     t0 = time.time()
@@ -296,151 +440,30 @@ def get_halla_cafeteria_menu(date: Optional[str] = None, meal: Optional[str] = N
         print(f"[CAF][ERROR] date-parse {e}")
         return f"❌ 날짜 해석 실패: {e}"
 
-    url = "https://www.halla.ac.kr/kr/211/subview.do"
-    try:
-        net_t = time.time()
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        print(f"[CAF] fetch ok elapsed={time.time()-net_t:.2f}s status={resp.status_code}")
-    except Exception as e:
-        print(f"[CAF][ERROR] fetch {e}")
-        return f"❌ 페이지 요청 실패: {e}"
+    snapshot, status = cafeteria_cache.get(target_date)
+    print(f"[CAF] snapshot status={status}")
+    if snapshot is None:
+        print(f"[CAF][ERROR] fetch {status}")
+        return f"❌ 페이지 요청 실패: {status}"
+    return render_menu(snapshot, target_date, meal, cafeteria_cache.url, t0)
 
-    soup = BeautifulSoup(resp.text, "html.parser")
 
-    # 주간 범위 텍스트 찾기 (예: 2025.08.25 ~ 2025.08.31)
-    text = soup.get_text("\n", strip=True)
-    m = re.search(r"(\d{4}\.\d{2}\.\d{2})\s*~\s*(\d{4}\.\d{2}\.\d{2})", text)
-    week_start = week_end = None
-    if m:
-        try:
-            week_start = datetime.strptime(m.group(1), "%Y.%m.%d").date()
-            week_end = datetime.strptime(m.group(2), "%Y.%m.%d").date()
-        except Exception:
-            pass
-
-    # 현재 주 확인 및 대상 날짜가 해당 주에 포함되는지 체크
-    if week_start and week_end and not (week_start <= target_date <= week_end):
-        # 다른 주일 경우, 서버가 파라미터 없이 현재 주만 제공하면 한계 안내
-        info = f"현재 페이지는 {week_start}~{week_end} 주간 식단입니다."
-        return info + " 원하는 날짜는 다른 주입니다. 페이지가 주차 파라미터를 제공하지 않아 현재 주만 조회 가능합니다: " + url
-
-    # 테이블 탐색: 요일 헤더와 끼니 라벨이 있는 표를 찾아 파싱
-    tables = soup.find_all("table")
-
-    days = ["월", "화", "수", "목", "금", "토", "일"]
-    weekday_idx = target_date.weekday()  # 0=월
-    target_day_label = days[weekday_idx]
-
-    def clean(txt: str) -> str:
-        return re.sub(r"\s+", " ", txt).strip()
-
-    def pick_table_and_parse() -> dict:
-        # 반환: {"조식": str|None, "중식": str|None, "석식": str|None}
-        result = {"조식": None, "중식": None, "석식": None}
-        for tbl in tables:
-            rows = tbl.find_all("tr")
-            if not rows:
-                continue
-            # 1) 요일 열 인덱스 매핑 찾기 (헤더 1~2행을 살펴봄)
-            day_col_index = None
-            header_candidates = rows[:2] if len(rows) >= 2 else rows[:1]
-            for hdr in header_candidates:
-                cells = hdr.find_all(["th", "td"])
-                for i, c in enumerate(cells):
-                    txt = clean(c.get_text())
-                    if target_day_label in txt or (txt.endswith("요일") and target_day_label in txt):
-                        day_col_index = i
-                        break
-                if day_col_index is not None:
-                    break
-
-            # 일부 표는 첫 열이 '구분', 이후 월~일이므로 day_col_index를 못 찾으면 월~일 패턴으로 추정
-            if day_col_index is None:
-                # 헤더 행에서 월~일이 연속으로 나타나는지 확인
-                for hdr in header_candidates:
-                    cells = [clean(c.get_text()) for c in hdr.find_all(["th", "td"])]
-                    if any(d in "".join(cells) for d in days):
-                        # 기본적으로 첫 열이 라벨, 이후 월=1, 화=2 ...로 가정
-                        day_col_index = 1 + weekday_idx
-                        break
-
-            if day_col_index is None:
-                continue
+async def aget_halla_cafeteria_menu(date: Optional[str] = None, meal: Optional[str] = None) -> str:
+    """get_halla_cafeteria_menu의 비동기 버전 (오래된 스냅샷은 즉시 반환하고 뒤에서 갱신)."""
+    t0 = time.time()
+    print(f"[CAF][START] async date={date} meal={meal}")
+    try:
+        target_date = _parse_date_input(date)
+    except Exception as e:
+        print(f"[CAF][ERROR] date-parse {e}")
+        return f"❌ 날짜 해석 실패: {e}"
 
-            # 2) 끼니 라벨 행을 찾아 해당 요일 열의 셀을 추출
-            for tr in rows:
-                cells = tr.find_all(["th", "td"])
-                if not cells:
-                    continue
-                label = clean(cells[0].get_text()) if cells else ""
-                # 끼니명은 변형될 수 있어 부분 일치 허용 (예: 중식(11:30~13:30))
-                for meal_label in list(result.keys()):
-                    if meal_label in label:
-                        # 요일 열이 범위 안에 있는지 확인
-                        if len(cells) > day_col_index:
-                            result[meal_label] = clean(cells[day_col_index].get_text())
-            # 하나라도 수집되었으면 이 테이블을 채택
-            if any(v for v in result.values()):
-                return result
-        return result
-
-    parse_t = time.time()
-    found = pick_table_and_parse()
-    print(f"[CAF] primary-parse elapsed={time.time()-parse_t:.2f}s result={found}")
-
-    # 폴백: 표 파싱 실패 시 페이지 텍스트에서 라인 기반 추론(부정확할 수 있음)
-    if all(v is None for v in found.values()):
-        lines = [l for l in text.split("\n") if l]
-        # 매우 단순 추정: '중식 | ...' 같은 라인이 있으면 그 다음 토큰들을 사용
-        for key in list(found.keys()):
-            for ln in lines:
-                if key in ln and "|" in ln:
-                    # 파이프 구분으로 분해 후 요일 인덱스 사용
-                    parts = [clean(p) for p in ln.split("|")]
-                    # parts 예: [라벨, 조식, 월, 화, 수, ...] 형태일 수 있음 → 월이 parts에서 어디에 있는지 동적으로 탐색
-                    try:
-                        # 월~일 중 target_day_label의 첫 등장 위치를 찾음
-                        day_pos = None
-                        for i, token in enumerate(parts):
-                            if token.startswith(target_day_label):
-                                day_pos = i
-                                break
-                        if day_pos is None:
-                            # 기본 오프셋 가정: [라벨, 끼니, 월, 화, 수, ...]
-                            base = 2
-                            day_pos = base + weekday_idx
-                        if len(parts) > day_pos:
-                            found[key] = parts[day_pos]
-                    except Exception:
-                        pass
-                        break
-
-    # 결과 구성
-    day_label = target_day_label
-    header = f"한라대 학생식당 식단 ({target_date} {day_label})"
-
-    if meal in ("조식", "중식", "석식"):
-        val = found.get(meal)
-        if not val:
-            out = header + f"\n[{meal}] 정보 없음\n추가 사항: 원문: {url}"
-            print(f"[CAF][END] elapsed={time.time()-t0:.2f}s meal-miss")
-            print(f"[CAF][DEBUG] LLM output_text:\n{out}")
-            return out
-        out = header + f"\n[{meal}] {val}\n추가 사항: 원문: {url}"
-        print(f"[CAF][END] elapsed={time.time()-t0:.2f}s meal-hit")
-        print(f"[CAF][DEBUG] LLM output_text:\n{out}")
-        return out
-
-    # 3끼 모두 반환
-    lines_out = []
-    for k in ["조식", "중식", "석식"]:
-        v = found.get(k)
-        lines_out.append(f"[{k}] {v if v else '정보 없음'}")
-    out = header + "\n" + "\n".join(lines_out) + f"\n추가 사항: 원문: {url}"
-    print(f"[CAF][END] elapsed={time.time()-t0:.2f}s all-meals")
-    print(f"[CAF][DEBUG] LLM output_text:\n{out}")
-    return out
+    snapshot, status = await cafeteria_cache.aget(target_date)
+    print(f"[CAF] snapshot status={status}")
+    if snapshot is None:
+        print(f"[CAF][ERROR] fetch {status}")
+        return f"❌ 페이지 요청 실패: {status}"
+    return render_menu(snapshot, target_date, meal, cafeteria_cache.url, t0)
 
 class FunctionCalling:
     def __init__(self, model, available_functions=None):
@@ -450,14 +473,21 @@ class FunctionCalling:
             "get_halla_cafeteria_menu": get_halla_cafeteria_menu,
         }
 
+        # 비동기 경로에서 사용할 코루틴 버전 (없는 함수는 스레드 풀에서 동기 버전을 실행)
+        self.async_functions = {
+            "search_internet": asearch_internet,
+            "get_halla_cafeteria_menu": aget_halla_cafeteria_menu,
+        }
+
         if available_functions:
             default_functions.update(available_functions)
+            # 사용자가 교체한 함수는 비동기 기본 구현을 쓰지 않음
+            for name in available_functions:
+                self.async_functions.pop(name, None)
 
         self.available_functions = default_functions
-       
-    def analyze(self, user_message, tools):
-        if not user_message or user_message.strip() == "":
-            return {"type": "error", "message": "입력이 비어있습니다. 질문을 입력해주세요."}
+
+    def _analyze_request(self, user_message, tools) -> dict:
         # 구조화된 input 사용 (tool 선택 정확도 향상)
         structured_input = [
             {
@@ -467,18 +497,51 @@ class FunctionCalling:
                 ],
             }
         ]
+        return {
+            "model": model.o3_mini,
+            "input": structured_input,
+            "tools": tools,
+            "tool_choice": "auto",
+        }
+       
+    def analyze(self, user_message, tools):
+        if not user_message or user_message.strip() == "":
+            return {"type": "error", "message": "입력이 비어있습니다. 질문을 입력해주세요."}
         try:
-            response = client.responses.create(
-                model=model.o3_mini,
-                input=structured_input,
-                tools=tools,
-                tool_choice="auto",
-            )
+            response = client.responses.create(**self._analyze_request(user_message, tools))
             print("[DEBUG][analyze] raw_output_types:",[getattr(o,'type',None) for o in response.output])
             return response.output
         except Exception as e:
             print(f"[DEBUG][analyze] tool analyze failed: {e}")
             return []
+
+    async def aanalyze(self, user_message, tools):
+        """analyze의 비동기 버전 (AsyncOpenAI 사용)."""
+        if not user_message or user_message.strip() == "":
+            return {"type": "error", "message": "입력이 비어있습니다. 질문을 입력해주세요."}
+        try:
+            response = await async_client.responses.create(**self._analyze_request(user_message, tools))
+            print("[DEBUG][analyze] raw_output_types:",[getattr(o,'type',None) for o in response.output])
+            return response.output
+        except Exception as e:
+            print(f"[DEBUG][analyze] tool analyze failed: {e}")
+            return []
+
+    async def aexecute(self, func_name: str, **func_args) -> ToolResult:
+        """함수를 비동기로 실행합니다.
+
+        코루틴 버전이 있으면 그대로 await 하고, 없으면 동기 함수를 공용 스레드 풀에서 실행합니다.
+        결과는 항상 ToolResult (문자열을 반환하는 함수는 output에 담고 cache=None).
+        """
+        async_func = self.async_functions.get(func_name)
+        if async_func is not None:
+            result = await async_func(**func_args)
+        else:
+            func = self.available_functions[func_name]
+            result = await run_blocking(func, **func_args)
+        if isinstance(result, ToolResult):
+            return result
+        return ToolResult(str(result))
     
 
     def run(self, analyzed,context):
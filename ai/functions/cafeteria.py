@@ -0,0 +1,488 @@
+"""
+한라대 학생식당 주간 식단 스냅샷
+
+식단 페이지(kr/211/subview.do)는 길어야 일주일에 한 번 바뀌므로, 질문마다 페이지를 받아
+파싱하지 않고 주간 식단 전체를 {날짜: {끼니: 메뉴}} 형태로 한 번 파싱해 메모리에 보관합니다.
+
+- 스냅샷 키: 페이지에 표시된 주간 범위(week_start ~ week_end)
+- 백그라운드 prefetch: FastAPI 시작 시 주기적으로 갱신 (CAFETERIA_REFRESH_INTERVAL초)
+- 조건부 GET: ETag/Last-Modified로 바뀌지 않은 페이지는 다시 받거나 파싱하지 않음 (304)
+- 파싱: 식단 표만 골라(lxml 또는 SoupStrainer) 7일 × 3끼 격자를 한 번에 읽음 (CAFETERIA_PARSER)
+- stale-while-revalidate: 오래된 스냅샷은 즉시 반환하고 갱신은 뒤에서 진행,
+  다른 주 스냅샷만 있으면 갱신을 잠시(CAFETERIA_WAIT_TIMEOUT초) 기다리고,
+  스냅샷이 아예 없으면(재시작 직후, prefetch 실패) 페이지 요청 제한 시간(fetch_timeout)까지 기다림
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+from app.ai.concurrency import run_blocking
+
+try:  # 선택 의존성: 설치되어 있으면 식단 표를 lxml로 파싱
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - lxml 미설치 환경
+    lxml_html = None
+
+CAFETERIA_URL = "https://www.halla.ac.kr/kr/211/subview.do"
+
+MEALS: Tuple[str, ...] = ("조식", "중식", "석식")
+DAY_LABELS: Tuple[str, ...] = ("월", "화", "수", "목", "금", "토", "일")
+
+_WEEK_RANGE_RE = re.compile(r"(\d{4}\.\d{2}\.\d{2})\s*~\s*(\d{4}\.\d{2}\.\d{2})")
+_SPACE_RE = re.compile(r"\s+")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# 식단 페이지 파서: auto(lxml 있으면 lxml, 없으면 bs4) | lxml | bs4 | legacy(요일마다 전체 표 탐색)
+PARSER_BACKENDS = ("auto", "lxml", "bs4", "legacy")
+CAFETERIA_PARSER = os.getenv("CAFETERIA_PARSER", "auto").lower()
+
+
+@dataclass
+class WeeklyMenu:
+    """주간 식단 스냅샷
+
+    menus: {"YYYY-MM-DD": {"조식": str|None, "중식": str|None, "석식": str|None}}
+    """
+
+    week_start: date
+    week_end: date
+    menus: Dict[str, Dict[str, Optional[str]]]
+    fetched_at: float = field(default_factory=time.time)
+
+    def covers(self, target: date) -> bool:
+        return self.week_start <= target <= self.week_end
+
+    def lookup(self, target: date) -> Dict[str, Optional[str]]:
+        return self.menus.get(target.isoformat()) or {m: None for m in MEALS}
+
+
+def _clean(txt: str) -> str:
+    return _SPACE_RE.sub(" ", txt).strip()
+
+
+def _week_range(text: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """페이지의 주간 범위(예: 2025.08.25 ~ 2025.08.31). 없으면 이번 주 월~일로 가정."""
+    m = _WEEK_RANGE_RE.search(text)
+    if m:
+        try:
+            return (
+                datetime.strptime(m.group(1), "%Y.%m.%d").date(),
+                datetime.strptime(m.group(2), "%Y.%m.%d").date(),
+            )
+        except ValueError:
+            pass
+    today = today or datetime.now().date()
+    monday = today - timedelta(days=today.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def _pick_table_and_parse(tables, weekday_idx: int) -> Dict[str, Optional[str]]:
+    """요일 헤더와 끼니 라벨이 있는 표에서 해당 요일 열의 메뉴를 찾습니다."""
+    # 반환: {"조식": str|None, "중식": str|None, "석식": str|None}
+    result: Dict[str, Optional[str]] = {m: None for m in MEALS}
+    target_day_label = DAY_LABELS[weekday_idx]
+    for tbl in tables:
+        rows = tbl.find_all("tr")
+        if not rows:
+            continue
+        # 1) 요일 열 인덱스 매핑 찾기 (헤더 1~2행을 살펴봄)
+        day_col_index = None
+        header_candidates = rows[:2] if len(rows) >= 2 else rows[:1]
+        for hdr in header_candidates:
+            cells = hdr.find_all(["th", "td"])
+            for i, c in enumerate(cells):
+                txt = _clean(c.get_text())
+                if target_day_label in txt or (txt.endswith("요일") and target_day_label in txt):
+                    day_col_index = i
+                    break
+            if day_col_index is not None:
+                break
+
+        # 일부 표는 첫 열이 '구분', 이후 월~일이므로 day_col_index를 못 찾으면 월~일 패턴으로 추정
+        if day_col_index is None:
+            for hdr in header_candidates:
+                cells = [_clean(c.get_text()) for c in hdr.find_all(["th", "td"])]
+                if any(d in "".join(cells) for d in DAY_LABELS):
+                    # 기본적으로 첫 열이 라벨, 이후 월=1, 화=2 ...로 가정
+                    day_col_index = 1 + weekday_idx
+                    break
+
+        if day_col_index is None:
+            continue
+
+        # 2) 끼니 라벨 행을 찾아 해당 요일 열의 셀을 추출
+        for tr in rows:
+            cells = tr.find_all(["th", "td"])
+            if not cells:
+                continue
+            label = _clean(cells[0].get_text())
+            # 끼니명은 변형될 수 있어 부분 일치 허용 (예: 중식(11:30~13:30))
+            for meal_label in MEALS:
+                if meal_label in label and len(cells) > day_col_index:
+                    result[meal_label] = _clean(cells[day_col_index].get_text())
+        # 하나라도 수집되었으면 이 테이블을 채택
+        if any(v for v in result.values()):
+            return result
+    return result
+
+
+def _parse_lines_fallback(lines: List[str], weekday_idx: int) -> Dict[str, Optional[str]]:
+    """표 파싱 실패 시 페이지 텍스트에서 라인 기반 추론(부정확할 수 있음)"""
+    found: Dict[str, Optional[str]] = {m: None for m in MEALS}
+    target_day_label = DAY_LABELS[weekday_idx]
+    for key in MEALS:
+        for ln in lines:
+            if key in ln and "|" in ln:
+                # 파이프 구분으로 분해 후 요일 인덱스 사용
+                parts = [_clean(p) for p in ln.split("|")]
+                # parts 예: [라벨, 조식, 월, 화, 수, ...] → target_day_label의 첫 등장 위치를 찾음
+                day_pos = next(
+                    (i for i, token in enumerate(parts) if token.startswith(target_day_label)),
+                    None,
+                )
+                if day_pos is None:
+                    # 기본 오프셋 가정: [라벨, 끼니, 월, 화, 수, ...]
+                    day_pos = 2 + weekday_idx
+                if len(parts) > day_pos:
+                    found[key] = parts[day_pos]
+    return found
+
+
+def parse_weekly_menu_legacy(html: str, today: Optional[date] = None) -> WeeklyMenu:
+    """기존 방식: 페이지 전체를 파싱한 뒤 요일마다 모든 표를 다시 훑습니다 (격자 파싱 실패 시 폴백)."""
+    soup = BeautifulSoup(html, "html.parser")
+    text = soup.get_text("\n", strip=True)
+    week_start, week_end = _week_range(text, today)
+    tables = soup.find_all("table")
+    lines = [l for l in text.split("\n") if l]
+
+    menus: Dict[str, Dict[str, Optional[str]]] = {}
+    day = week_start
+    while day <= week_end:
+        found = _pick_table_and_parse(tables, day.weekday())
+        if all(v is None for v in found.values()):
+            found = _parse_lines_fallback(lines, day.weekday())
+        menus[day.isoformat()] = found
+        day += timedelta(days=1)
+    return WeeklyMenu(week_start=week_start, week_end=week_end, menus=menus)
+
+
+def _cell_text(txt: str) -> str:
+    # <br>로 나뉜 메뉴가 붙어 버리지 않도록 공백으로 이어 붙인 뒤 공백 정리 (정규식 없이)
+    return " ".join(txt.split())
+
+
+def _tables_lxml(html: str) -> List[List[List[str]]]:
+    """lxml로 표만 골라 [표][행][셀] 텍스트로 변환합니다."""
+    doc = lxml_html.fromstring(html)
+    return [
+        [[_cell_text(" ".join(c.itertext())) for c in tr.xpath("./th|./td")] for tr in tbl.iter("tr")]
+        for tbl in doc.iter("table")
+    ]
+
+
+def _tables_bs4(html: str) -> List[List[List[str]]]:
+    """bs4로 <table> 요소만 파싱(SoupStrainer)해 [표][행][셀] 텍스트로 변환합니다."""
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("table"))
+    return [
+        [[_cell_text(c.get_text(" ")) for c in tr.find_all(["th", "td"], recursive=False)] for tr in tbl.find_all("tr")]
+        for tbl in soup.find_all("table")
+    ]
+
+
+def _day_columns(header_rows: List[List[str]]) -> Dict[int, int]:
+    """헤더 1~2행에서 {요일 인덱스(0=월): 열 인덱스}를 찾습니다."""
+    for cells in header_rows:
+        columns: Dict[int, int] = {}
+        for col, txt in enumerate(cells):
+            # '월요일'의 '일'을 일요일로 오인하지 않도록 '요일'을 떼고 비교
+            label = txt.replace("요일", "")
+            for idx, day_label in enumerate(DAY_LABELS):
+                if idx not in columns and day_label in label:
+                    columns[idx] = col
+                    break
+        if columns:
+            return columns
+    # 첫 열이 '구분', 이후 월~일 순서라고 가정
+    joined = "".join("".join(cells) for cells in header_rows)
+    if any(d in joined for d in DAY_LABELS):
+        return {idx: 1 + idx for idx in range(len(DAY_LABELS))}
+    return {}
+
+
+def parse_menu_grid(tables: List[List[List[str]]]) -> Optional[Dict[int, Dict[str, Optional[str]]]]:
+    """요일 헤더와 끼니 라벨이 있는 첫 표에서 {요일 인덱스: {끼니: 메뉴}} 격자를 한 번에 읽습니다."""
+    for rows in tables:
+        if not rows:
+            continue
+        columns = _day_columns(rows[:2])
+        if not columns:
+            continue
+        grid: Dict[int, Dict[str, Optional[str]]] = {
+            idx: {m: None for m in MEALS} for idx in range(len(DAY_LABELS))
+        }
+        found = False
+        for cells in rows:
+            if not cells:
+                continue
+            # 끼니명은 변형될 수 있어 부분 일치 허용 (예: 중식(11:30~13:30))
+            meal_label = next((m for m in MEALS if m in cells[0]), None)
+            if meal_label is None:
+                continue
+            for idx, col in columns.items():
+                if col < len(cells):
+                    grid[idx][meal_label] = cells[col]
+                    found = found or bool(cells[col])
+        if found:
+            return grid
+    return None
+
+
+def _resolve_backend(backend: Optional[str]) -> str:
+    backend = (backend or CAFETERIA_PARSER).lower()
+    if backend not in PARSER_BACKENDS or backend == "auto":
+        backend = "lxml" if lxml_html is not None else "bs4"
+    if backend == "lxml" and lxml_html is None:
+        backend = "bs4"
+    return backend
+
+
+def parse_weekly_menu(
+    html: str,
+    today: Optional[date] = None,
+    *,
+    backend: Optional[str] = None,
+) -> WeeklyMenu:
+    """식단 페이지를 한 번 파싱해 주간(월~일) × 끼니 스냅샷을 만듭니다.
+
+    표 요소만 파싱해 7일 × 3끼 격자를 한 번에 읽고, 이후 조회는 dict 접근만 합니다.
+    격자를 찾지 못하면 기존 방식(parse_weekly_menu_legacy)의 표/라인 폴백을 사용합니다.
+    """
+    backend = _resolve_backend(backend)
+    if backend == "legacy":
+        return parse_weekly_menu_legacy(html, today)
+
+    # 주간 범위는 표 밖에 있으므로 원문에서 직접 찾음 (태그로 나뉘어 있으면 태그 제거 후 재시도)
+    if _WEEK_RANGE_RE.search(html):
+        week_start, week_end = _week_range(html, today)
+    else:
+        week_start, week_end = _week_range(_TAG_RE.sub(" ", html), today)
+
+    tables = _tables_lxml(html) if backend == "lxml" else _tables_bs4(html)
+    grid = parse_menu_grid(tables)
+    if grid is None:
+        return parse_weekly_menu_legacy(html, today)
+
+    menus: Dict[str, Dict[str, Optional[str]]] = {}
+    day = week_start
+    while day <= week_end:
+        menus[day.isoformat()] = dict(grid[day.weekday()])
+        day += timedelta(days=1)
+    return WeeklyMenu(week_start=week_start, week_end=week_end, menus=menus)
+
+
+def render_menu(
+    snapshot: WeeklyMenu,
+    target_date: date,
+    meal: Optional[str],
+    url: str = CAFETERIA_URL,
+    t0: Optional[float] = None,
+) -> str:
+    """스냅샷에서 대상 날짜/끼니 메뉴를 찾아 응답 문자열로 구성합니다."""
+    t0 = t0 or time.time()
+    # 대상 날짜가 현재 주에 포함되지 않으면 한계 안내
+    if not snapshot.covers(target_date):
+        info = f"현재 페이지는 {snapshot.week_start}~{snapshot.week_end} 주간 식단입니다."
+        return info + " 원하는 날짜는 다른 주입니다. 페이지가 주차 파라미터를 제공하지 않아 현재 주만 조회 가능합니다: " + url
+
+    found = snapshot.lookup(target_date)
+    day_label = DAY_LABELS[target_date.weekday()]
+    header = f"한라대 학생식당 식단 ({target_date} {day_label})"
+
+    if meal in MEALS:
+        val = found.get(meal)
+        if not val:
+            out = header + f"\n[{meal}] 정보 없음\n추가 사항: 원문: {url}"
+            print(f"[CAF][END] elapsed={time.time()-t0:.2f}s meal-miss")
+            print(f"[CAF][DEBUG] LLM output_text:\n{out}")
+            return out
+        out = header + f"\n[{meal}] {val}\n추가 사항: 원문: {url}"
+        print(f"[CAF][END] elapsed={time.time()-t0:.2f}s meal-hit")
+        print(f"[CAF][DEBUG] LLM output_text:\n{out}")
+        return out
+
+    # 3끼 모두 반환
+    lines_out = [f"[{k}] {found.get(k) or '정보 없음'}" for k in MEALS]
+    out = header + "\n" + "\n".join(lines_out) + f"\n추가 사항: 원문: {url}"
+    print(f"[CAF][END] elapsed={time.time()-t0:.2f}s all-meals")
+    print(f"[CAF][DEBUG] LLM output_text:\n{out}")
+    return out
+
+
+class CafeteriaMenuCache:
+    """주간 식단 스냅샷 저장소 (조건부 GET + stale-while-revalidate + 백그라운드 prefetch)"""
+
+    def __init__(
+        self,
+        url: str = CAFETERIA_URL,
+        *,
+        refresh_interval: Optional[float] = None,
+        max_age: Optional[float] = None,
+        min_recheck: float = 60.0,
+        wait_timeout: Optional[float] = None,
+        fetch_timeout: float = 10.0,
+        parser: Callable[[str], WeeklyMenu] = parse_weekly_menu,
+    ) -> None:
+        self.url = url
+        self.refresh_interval = refresh_interval or float(
+            os.getenv("CAFETERIA_REFRESH_INTERVAL", "1800")
+        )
+        # 이 시간이 지나면 stale: 그대로 반환하되 뒤에서 갱신
+        self.max_age = max_age or 2 * self.refresh_interval
+        # 다른 주 날짜를 물어도 이 간격 안에는 다시 확인하지 않음
+        self.min_recheck = min_recheck
+        self.wait_timeout = wait_timeout or float(os.getenv("CAFETERIA_WAIT_TIMEOUT", "3"))
+        self.fetch_timeout = fetch_timeout
+        self._parser = parser
+
+        self.snapshot: Optional[WeeklyMenu] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._checked_at = 0.0  # 마지막으로 서버와 확인(200/304)한 시각
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+
+    # ----- 갱신 -----
+    def _conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.snapshot is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        return headers
+
+    def _remember_validators(self, headers) -> None:
+        self._etag = headers.get("ETag") or self._etag
+        self._last_modified = headers.get("Last-Modified") or self._last_modified
+        self._checked_at = time.time()
+
+    def refresh(self) -> WeeklyMenu:
+        """동기 갱신 (requests). 페이지가 바뀌지 않았으면(304) 파싱을 건너뜁니다."""
+        net_t = time.time()
+        resp = requests.get(self.url, headers=self._conditional_headers(), timeout=self.fetch_timeout)
+        if resp.status_code == 304 and self.snapshot is not None:
+            self._remember_validators(resp.headers)
+            print(f"[CAF] not-modified elapsed={time.time()-net_t:.2f}s")
+            return self.snapshot
+        resp.raise_for_status()
+        print(f"[CAF] fetch ok elapsed={time.time()-net_t:.2f}s status={resp.status_code}")
+        snapshot = self._parser(resp.text)
+        self.snapshot = snapshot
+        self._remember_validators(resp.headers)
+        return snapshot
+
+    async def arefresh(self) -> WeeklyMenu:
+        """비동기 갱신 (httpx). HTML 파싱은 공용 스레드 풀에서 실행합니다."""
+        net_t = time.time()
+        async with httpx.AsyncClient(timeout=self.fetch_timeout) as http:
+            resp = await http.get(self.url, headers=self._conditional_headers())
+        if resp.status_code == 304 and self.snapshot is not None:
+            self._remember_validators(resp.headers)
+            print(f"[CAF] not-modified elapsed={time.time()-net_t:.2f}s")
+            return self.snapshot
+        resp.raise_for_status()
+        print(f"[CAF] fetch ok elapsed={time.time()-net_t:.2f}s status={resp.status_code}")
+        snapshot = await run_blocking(self._parser, resp.text)
+        self.snapshot = snapshot
+        self._remember_validators(resp.headers)
+        print(f"[CAF] snapshot week={snapshot.week_start}~{snapshot.week_end}")
+        return snapshot
+
+    def _schedule_refresh(self) -> asyncio.Task:
+        """진행 중인 갱신이 있으면 그것을, 없으면 새 갱신 작업을 반환합니다 (single-flight)."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.arefresh())
+            self._refresh_task.add_done_callback(self._log_refresh_error)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[CAF][ERROR] refresh {task.exception()}")
+
+    # ----- 조회 -----
+    def _state(self, target: date) -> str:
+        snap = self.snapshot
+        if snap is None:
+            return "miss"
+        age = time.time() - self._checked_at
+        if not snap.covers(target):
+            return "recent" if age < self.min_recheck else "miss"
+        return "fresh" if age < self.max_age else "stale"
+
+    async def aget(self, target: date) -> Tuple[Optional[WeeklyMenu], str]:
+        """(스냅샷, 상태)를 반환합니다. 상태: fresh | stale | refreshed | 오류 메시지"""
+        state = self._state(target)
+        if state in ("fresh", "recent"):
+            return self.snapshot, "fresh"
+        task = self._schedule_refresh()
+        if state == "stale":
+            return self.snapshot, "stale"
+        # 돌려줄 스냅샷이 없으면 짧게 기다릴 이유가 없으므로 페이지 요청 제한 시간까지 기다림
+        wait = self.fetch_timeout if self.snapshot is None else self.wait_timeout
+        try:
+            await asyncio.wait_for(asyncio.shield(task), wait)
+            return self.snapshot, "refreshed"
+        except asyncio.TimeoutError:
+            # 사이트가 느리면 있는 스냅샷이라도 반환 (갱신은 계속 진행)
+            return self.snapshot, "timeout"
+        except Exception as e:
+            return self.snapshot, f"error: {e}"
+
+    def get(self, target: date) -> Tuple[Optional[WeeklyMenu], str]:
+        """aget의 동기 버전 (필요할 때만 직접 갱신)."""
+        state = self._state(target)
+        if state in ("fresh", "recent"):
+            return self.snapshot, "fresh"
+        try:
+            self.refresh()
+            return self.snapshot, "refreshed"
+        except Exception as e:
+            return self.snapshot, f"error: {e}"
+
+    # ----- 백그라운드 prefetch -----
+    async def _prefetch_loop(self) -> None:
+        while True:
+            try:
+                await self._schedule_refresh()
+            except Exception:
+                pass  # _log_refresh_error에서 기록
+            await asyncio.sleep(self.refresh_interval)
+
+    def start_prefetch(self) -> None:
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.create_task(self._prefetch_loop())
+
+    async def stop_prefetch(self) -> None:
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            try:
+                await self._prefetch_task
+            except asyncio.CancelledError:
+                pass
+            self._prefetch_task = None
+
+
+# 프로세스 전체에서 공유하는 스냅샷 저장소
+cafeteria_cache = CafeteriaMenuCache()
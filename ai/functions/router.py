@@ -0,0 +1,341 @@
+"""
+단계별 도구 라우터 (ToolRouter)
+
+매 질문마다 o3-mini에 도구 목록을 보내 호출 여부를 묻는 대신, 다음 순서로 판정합니다.
+
+1) rule: 학식/공지/웹 키워드, 인사말, 규정 질문 패턴 (네트워크 없음)
+2) model(선택): 기록된 질문으로 학습한 TF-IDF + 로지스틱 회귀 분류기
+   - scikit-learn이 설치되어 있고 ROUTER_MODEL_PATH 파일이 있을 때만 사용
+3) llm: 위 단계의 확신도가 ROUTER_MIN_CONFIDENCE보다 낮을 때만 기존 LLM 분석(FunctionCalling.aanalyze)
+
+키워드만 맞고 의도가 분명하지 않은 경우는 WEAK_RULE_CONFIDENCE로 두어 다음 단계로 넘깁니다.
+- 학식: 메뉴를 묻는 표현(메뉴/식단/뭐 나와)과 날짜 또는 끼니가 함께 있고, 시간/가격/위치를 묻지 않을 때만 확정
+  (예: "수강신청 메뉴 어디야?", "학식 가격 얼마야?", "조식 몇 시부터야?"는 확정하지 않음)
+- 공지: '공지/공고'처럼 공지를 직접 찾는 표현이 있을 때만 확정 ('모집', '비교과'만으로는 확정하지 않음)
+- 규정 질문(regulation_fn)은 공지를 직접 찾는 경우가 아니면 웹 키워드 규칙보다 먼저 판정
+  (예: "장학금 모집 기준이 뭐야?"는 웹검색 없이 RAG가 답함)
+
+LLM 판정은 ROUTER_LOG_PATH(JSONL)에 남겨 분류기 학습 데이터로 씁니다.
+학습 (app 패키지의 상위 디렉터리에서):
+    python -m app.ai.functions.router --log router_log.jsonl --out router_model.pkl
+ROUTER_MODE=llm이면 항상 LLM으로 판정합니다 (기존 동작).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pickle
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:  # 선택 의존성: 로컬 분류기
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+except ImportError:  # pragma: no cover - scikit-learn 미설치 환경
+    make_pipeline = None
+
+CAFETERIA_TOOL = "get_halla_cafeteria_menu"
+SEARCH_TOOL = "search_internet"
+NO_TOOL = "none"
+
+# 학식: 강한 키워드는 학식 질문이 분명한 표현, 약한 키워드(끼니 시간대 등)는 다른 뜻으로도 쓰이는 표현
+# (어느 쪽이든 확정 여부는 is_menu_lookup으로 메뉴 자체를 묻는지 보고 정함)
+CAFETERIA_STRONG_KEYWORDS: Tuple[str, ...] = ("학식", "식단", "학생식당", "조식", "중식", "석식", "오늘 메뉴", "밥 뭐")
+CAFETERIA_WEAK_KEYWORDS: Tuple[str, ...] = ("메뉴", "점심", "저녁", "아침")
+
+# 학식 메뉴를 묻는 표현과, 메뉴가 아닌 것(운영시간/가격/위치 등)을 묻는 표현
+MENU_INTENT_KEYWORDS: Tuple[str, ...] = ("메뉴", "식단", "뭐 나와", "뭐나와", "뭐야", "뭐 있", "뭐임", "밥 뭐", "반찬")
+MEAL_KEYWORDS: Tuple[str, ...] = ("조식", "중식", "석식", "아침", "점심", "저녁")
+DATE_KEYWORDS: Tuple[str, ...] = ("오늘", "내일", "모레", "어제", "이번 주", "이번주", "요일")
+NON_MENU_KEYWORDS: Tuple[str, ...] = (
+    "시간", "몇 시", "몇시", "언제", "운영", "가격", "얼마", "요금", "결제", "카드", "위치", "어디", "가는 길",
+)
+
+# 공지/웹검색 (analyzer._keyword_site_query와 같은 공지 분류 기준)
+# NOTICE_KEYWORDS는 공지를 직접 찾는 표현, NOTICE_TOPIC_KEYWORDS는 공지에 자주 나오지만 규정 질문에도 쓰이는 주제어
+NOTICE_KEYWORDS: Tuple[str, ...] = ("공지", "공고", "학사공지", "장학공지")
+NOTICE_TOPIC_KEYWORDS: Tuple[str, ...] = ("비교과", "모집")
+WEB_KEYWORDS: Tuple[str, ...] = ("홈페이지", "사이트", "검색", "링크", "최신", "뉴스", "날씨", "행사")
+
+GREETING_RE = re.compile(
+    r"^\s*(안녕|하이|ㅎㅇ|hi|hello|hey|고마워|고맙습니다|감사|ㄱㅅ|thanks|thank you|반가워)[\s!?.~ㅎㅋ]*$",
+    re.IGNORECASE,
+)
+
+_DATE_RE = re.compile(r"(\d{4}[./-]\d{1,2}[./-]\d{1,2})")
+_KOREAN_DATE_RE = re.compile(r"\d{1,2}\s*월\s*\d{1,2}\s*일")
+
+ROUTER_MODE = os.getenv("ROUTER_MODE", "tiered").lower()
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.75"))
+
+# 키워드만 맞고 의도가 분명하지 않을 때의 확신도 (ROUTER_MIN_CONFIDENCE보다 낮아 분류기/LLM 확인을 거침)
+WEAK_RULE_CONFIDENCE = 0.6
+
+
+@dataclass
+class RoutedCall:
+    """Responses API의 function_call 출력과 같은 모양의 도구 호출 (stream.py가 그대로 처리)"""
+
+    name: str
+    arguments: str
+    call_id: str
+    type: str = "function_call"
+
+
+@dataclass
+class RouteDecision:
+    calls: List[Any] = field(default_factory=list)
+    tier: str = "rule"  # 판정한 단계: rule | model | llm
+    confidence: float = 1.0
+    reason: str = ""
+    # 학식 메뉴 자체만 묻는 질문 (DirectAnswerer가 최종 LLM 없이 답해도 되는 경우)
+    pure_lookup: bool = False
+
+    @property
+    def tool_names(self) -> List[str]:
+        return [getattr(c, "name", "") for c in self.calls if getattr(c, "type", None) == "function_call"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier,
+            "confidence": round(self.confidence, 3),
+            "tools": self.tool_names,
+            "reason": self.reason,
+            "pure_lookup": self.pure_lookup,
+        }
+
+
+def extract_meal(text: str) -> Optional[str]:
+    """질문에서 끼니를 추출합니다 (없으면 None = 전체 끼니)."""
+    if any(x in text for x in ("조식", "아침")):
+        return "조식"
+    if any(x in text for x in ("석식", "저녁")):
+        return "석식"
+    if any(x in text for x in ("중식", "점심")):
+        return "중식"
+    return None
+
+
+def extract_date(text: str) -> str:
+    """질문에서 날짜 표현을 추출합니다 (analyzer._parse_date_input이 해석하는 형식, 기본 '오늘')."""
+    for word in ("모레", "내일", "어제"):
+        if word in text:
+            return word
+    m = _DATE_RE.search(text) or _KOREAN_DATE_RE.search(text)
+    return m.group(0) if m else "오늘"
+
+
+def cafeteria_arguments(message: str) -> Dict[str, Optional[str]]:
+    lowered = message.lower()
+    return {"date": extract_date(message), "meal": extract_meal(lowered)}
+
+
+def is_menu_lookup(message: str) -> bool:
+    """날짜/끼니의 학식 메뉴 자체를 묻는 질문인지 (운영시간/가격/위치 등을 묻는 질문은 제외)"""
+    lowered = message.lower()
+    if not any(k in lowered for k in MENU_INTENT_KEYWORDS):
+        return False
+    if any(k in lowered for k in NON_MENU_KEYWORDS):
+        return False
+    has_date = any(k in lowered for k in DATE_KEYWORDS) or bool(_DATE_RE.search(message) or _KOREAN_DATE_RE.search(message))
+    return has_date or any(k in lowered for k in MEAL_KEYWORDS + ("학식", "학생식당"))
+
+
+def _is_pure_lookup(tool_names: Sequence[str], message: str) -> bool:
+    return list(tool_names) == [CAFETERIA_TOOL] and is_menu_lookup(message)
+
+
+def _label_of(tool_names: Iterable[str]) -> str:
+    names = sorted(set(tool_names))
+    return "+".join(names) if names else NO_TOOL
+
+
+def train_router_model(queries: Sequence[str], labels: Sequence[str], path: str) -> None:
+    """기록된 질문/라벨로 TF-IDF(글자 n-gram) + 로지스틱 회귀 분류기를 학습해 저장합니다."""
+    if make_pipeline is None:
+        raise RuntimeError("scikit-learn이 설치되어 있지 않습니다.")
+    pipeline = make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(1, 3), min_df=1),
+        LogisticRegression(max_iter=1000),
+    )
+    pipeline.fit(list(queries), list(labels))
+    with open(path, "wb") as f:
+        pickle.dump(pipeline, f)
+
+
+def load_router_log(path: str) -> Tuple[List[str], List[str]]:
+    """ROUTER_LOG_PATH(JSONL)에서 (질문, 라벨) 목록을 읽습니다."""
+    queries: List[str] = []
+    labels: List[str] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("query") and row.get("label"):
+                queries.append(row["query"])
+                labels.append(row["label"])
+    return queries, labels
+
+
+class ToolRouter:
+    """규칙 → (선택) 로컬 분류기 → LLM 순서로 도구 호출을 결정합니다."""
+
+    def __init__(
+        self,
+        *,
+        analyze_fn: Callable[[str, Any], Awaitable[Any]],
+        tools: Any,
+        mode: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        model_path: Optional[str] = None,
+        log_path: Optional[str] = None,
+        regulation_fn: Optional[Callable[[str], bool]] = None,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self._analyze = analyze_fn
+        self._tools = tools
+        self.mode = (mode or ROUTER_MODE).lower()
+        self.min_confidence = min_confidence if min_confidence is not None else ROUTER_MIN_CONFIDENCE
+        self._regulation = regulation_fn or (lambda _: False)
+        self._debug = debug_fn or (lambda _: None)
+        self._log_path = log_path if log_path is not None else os.getenv("ROUTER_LOG_PATH")
+        self._log_lock = threading.Lock()
+        self._model = self._load_model(model_path or os.getenv("ROUTER_MODEL_PATH"))
+
+    def _load_model(self, path: Optional[str]):
+        if not path or make_pipeline is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+            self._debug(f"router: 로컬 분류기 로드 classes={list(model.classes_)}")
+            return model
+        except Exception as exc:
+            self._debug(f"router: 로컬 분류기 로드 실패 -> {exc}")
+            return None
+
+    # ----- 1) 규칙 -----
+    def _calls_for(self, tool_names: Iterable[str], message: str, tier: str) -> List[RoutedCall]:
+        calls: List[RoutedCall] = []
+        for name in tool_names:
+            if name == CAFETERIA_TOOL:
+                args: Dict[str, Any] = cafeteria_arguments(message)
+            elif name == SEARCH_TOOL:
+                args = {"user_input": message}
+            else:
+                continue
+            calls.append(RoutedCall(name=name, arguments=json.dumps(args, ensure_ascii=False), call_id=f"{tier}_{name}"))
+        return calls
+
+    def rule_route(self, message: str) -> Optional[RouteDecision]:
+        """키워드로 분명한 경우만 판정합니다. 애매하면 None."""
+        lowered = message.lower()
+        tools: List[str] = []
+        confidence = 1.0
+        reasons: List[str] = []
+
+        cafeteria = next((k for k in CAFETERIA_STRONG_KEYWORDS + CAFETERIA_WEAK_KEYWORDS if k in lowered), None)
+        if cafeteria:
+            tools.append(CAFETERIA_TOOL)
+            reasons.append(f"cafeteria '{cafeteria}'")
+            # 키워드가 있어도 메뉴 자체를 묻는 게 아니면(운영시간/가격 등) LLM 확인을 거침
+            confidence = min(confidence, 0.95 if is_menu_lookup(message) else WEAK_RULE_CONFIDENCE)
+
+        notice = next((k for k in NOTICE_KEYWORDS if k in lowered), None)
+        regulation = self._regulation(message)
+        # 규정 질문은 공지를 직접 찾는 경우가 아니면 웹 키워드로 웹검색을 붙이지 않음
+        web = None if notice or regulation else next(
+            (k for k in NOTICE_TOPIC_KEYWORDS + WEB_KEYWORDS if k in lowered), None
+        )
+        if notice or web:
+            tools.append(SEARCH_TOOL)
+            reasons.append(f"web '{notice or web}'")
+            confidence = min(confidence, 0.9 if notice else WEAK_RULE_CONFIDENCE)
+
+        if tools:
+            return RouteDecision(
+                self._calls_for(tools, message, "rule"), "rule", confidence, ", ".join(reasons),
+                pure_lookup=_is_pure_lookup(tools, message),
+            )
+        if GREETING_RE.match(message):
+            return RouteDecision([], "rule", 0.95, "greeting")
+        if regulation:
+            # 규정 질문은 RAG 갈래가 답하므로 도구 호출 없음
+            return RouteDecision([], "rule", 0.85, "regulation")
+        return None
+
+    # ----- 2) 로컬 분류기 -----
+    def model_route(self, message: str) -> Optional[RouteDecision]:
+        if self._model is None:
+            return None
+        try:
+            probs = self._model.predict_proba([message])[0]
+        except Exception as exc:
+            self._debug(f"router: 로컬 분류기 예측 실패 -> {exc}")
+            return None
+        best = max(range(len(probs)), key=lambda i: probs[i])
+        label = str(self._model.classes_[best])
+        tools = [] if label == NO_TOOL else label.split("+")
+        return RouteDecision(
+            self._calls_for(tools, message, "model"), "model", float(probs[best]), f"model '{label}'",
+            pure_lookup=_is_pure_lookup(tools, message),
+        )
+
+    # ----- 3) LLM -----
+    async def llm_route(self, message: str) -> RouteDecision:
+        analyzed = await self._analyze(message, self._tools)
+        calls = analyzed if isinstance(analyzed, list) else []
+        decision = RouteDecision(list(calls), "llm", 1.0, "llm analyze")
+        self._log(message, _label_of(decision.tool_names))
+        return decision
+
+    def _log(self, message: str, label: str) -> None:
+        if not self._log_path:
+            return
+        try:
+            with self._log_lock, open(self._log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"query": message, "label": label}, ensure_ascii=False) + "\n")
+        except OSError as exc:
+            self._debug(f"router: 판정 기록 실패 -> {exc}")
+
+    async def aroute(self, message: str) -> RouteDecision:
+        """도구 호출 목록과 판정 단계/확신도를 반환합니다."""
+        if self.mode != "llm":
+            for tier_fn in (self.rule_route, self.model_route):
+                decision = tier_fn(message)
+                if decision is not None and decision.confidence >= self.min_confidence:
+                    self._debug(f"router: {decision.to_dict()}")
+                    return decision
+        decision = await self.llm_route(message)
+        self._debug(f"router: {decision.to_dict()}")
+        return decision
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the local tool-router classifier from logged LLM routing decisions")
+    parser.add_argument("--log", dest="log_path", default=os.getenv("ROUTER_LOG_PATH"), help="JSONL log written by ToolRouter (default: ROUTER_LOG_PATH)")
+    parser.add_argument("--out", dest="model_path", default=os.getenv("ROUTER_MODEL_PATH"), help="Where to write the pickled classifier (default: ROUTER_MODEL_PATH)")
+    parser.add_argument("--min-samples", dest="min_samples", type=int, default=50, help="Refuse to train on fewer logged questions than this")
+    args = parser.parse_args()
+
+    if not args.log_path or not args.model_path:
+        parser.error("--log/--out 또는 ROUTER_LOG_PATH/ROUTER_MODEL_PATH가 필요합니다.")
+    queries, labels = load_router_log(args.log_path)
+    counts: Dict[str, int] = {}
+    for label in labels:
+        counts[label] = counts.get(label, 0) + 1
+    print(f"📚 라우팅 기록 {len(queries)}개 라벨 분포: {counts}")
+    if len(queries) < args.min_samples or len(counts) < 2:
+        raise SystemExit(f"❌ 학습 데이터 부족: 최소 {args.min_samples}개, 라벨 2종 이상 필요")
+    train_router_model(queries, labels, args.model_path)
+    print(f"✅ 분류기 저장: {args.model_path} (ROUTER_MODEL_PATH로 지정하면 다음 실행부터 사용)")
+
+
+if __name__ == "__main__":
+    main()
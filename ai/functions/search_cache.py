@@ -0,0 +1,115 @@
+"""
+웹검색(search_internet) 결과 캐시
+
+같은 공지/안내 질문이 계속 반복되므로 한 질문에 최대 3번인 LLM 호출
+(공지 카테고리 분류 → 검색어 재작성 → web_search_preview)을 단계별로 캐시합니다.
+
+- classifier: (질문, 대화 문맥) → 공지 카테고리
+- rewrite: (질문, 대화 문맥) → 재작성된 검색어
+- results: 최종 search_text → 본문 + 출처(citations)
+  검색 대상 페이지 종류에 따라 TTL이 다름 (학사공지는 짧게, 정적 안내 페이지는 길게)
+
+단계별 hit/miss는 asearch_internet이 ToolResult.cache로 돌려주고 (LLM에 넘기는 결과 문자열에는 넣지 않음),
+stream.py가 FunctionCallMetadata.cache에 그대로 기록합니다.
+"""
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.ai.cache import TTLCache, normalize_text, text_hash
+
+# 검색 대상별 결과 TTL(초)
+SEARCH_RESULT_TTLS: Dict[str, float] = {
+    "학사공지": 10 * 60,
+    "장학공지": 30 * 60,
+    "비교과공지": 30 * 60,
+    "일반공지": 30 * 60,
+    "menu": 60 * 60,
+    "general": 6 * 60 * 60,
+}
+
+# search_text에 포함된 한라대 페이지 URL → TTL 카테고리
+CATEGORY_URLS: Dict[str, str] = {
+    "https://www.halla.ac.kr/kr/242/subview.do": "학사공지",
+    "https://www.halla.ac.kr/kr/243/subview.do": "비교과공지",
+    "https://www.halla.ac.kr/kr/244/subview.do": "장학공지",
+    "https://www.halla.ac.kr/kr/241/subview.do": "일반공지",
+    "https://www.halla.ac.kr/kr/211/subview.do": "menu",
+}
+
+@dataclass
+class WebSearchResult:
+    """web_search_preview 응답에서 뽑은 본문과 출처"""
+
+    text: str
+    citations: List[Dict[str, str]] = field(default_factory=list)  # [{"title", "url"}]
+    did_call: bool = True
+    created_at: float = field(default_factory=time.time)
+
+
+def search_category(search_text: str) -> str:
+    """search_text가 가리키는 페이지 종류 (결과 TTL 선택용)"""
+    for url, category in CATEGORY_URLS.items():
+        if url in search_text:
+            return category
+    return "general"
+
+
+class WebSearchCache:
+    """search_internet 단계별 캐시 묶음"""
+
+    def __init__(
+        self,
+        *,
+        enabled: Optional[bool] = None,
+        maxsize: int = 1024,
+        query_ttl: float = 60 * 60,
+        result_ttls: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.enabled = enabled if enabled is not None else os.getenv("WEB_SEARCH_CACHE", "1") != "0"
+        self.result_ttls = dict(SEARCH_RESULT_TTLS, **(result_ttls or {}))
+        self.classifier: TTLCache[str] = TTLCache(maxsize=maxsize, ttl=query_ttl)
+        self.rewrite: TTLCache[str] = TTLCache(maxsize=maxsize, ttl=query_ttl)
+        self.results: TTLCache[WebSearchResult] = TTLCache(maxsize=maxsize)
+
+    @staticmethod
+    def query_key(user_input: str, context_info: Optional[str]) -> str:
+        return text_hash(normalize_text(user_input), normalize_text(context_info or ""))
+
+    @staticmethod
+    def result_key(search_text: str) -> str:
+        return text_hash(normalize_text(search_text))
+
+    def get_result(self, search_text: str) -> Optional[WebSearchResult]:
+        if not self.enabled:
+            return None
+        return self.results.get(self.result_key(search_text))
+
+    def put_result(self, search_text: str, result: WebSearchResult) -> None:
+        if not self.enabled:
+            return
+        ttl = self.result_ttls.get(search_category(search_text), self.result_ttls["general"])
+        self.results.set(self.result_key(search_text), result, ttl=ttl)
+
+    def get_query(self, cache: TTLCache[str], user_input: str, context_info: Optional[str]) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return cache.get(self.query_key(user_input, context_info))
+
+    def put_query(self, cache: TTLCache[str], user_input: str, context_info: Optional[str], value: str) -> None:
+        if self.enabled and value:
+            cache.set(self.query_key(user_input, context_info), value)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "classifier": self.classifier.stats(),
+            "rewrite": self.rewrite.stats(),
+            "results": self.results.stats(),
+        }
+
+
+# 프로세스 전체에서 공유하는 웹검색 캐시
+web_search_cache = WebSearchCache()
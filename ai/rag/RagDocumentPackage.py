@@ -15,6 +15,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Callable, Sequence
 
+from app.ai.cache import text_hash
+
 from .repository import MongoChunkRepository
 
 
@@ -34,6 +36,8 @@ class RagDocumentPackage:
     preview_count: int = 0
     # source_documents: 검색된 문서들의 메타데이터 (law_article_id, source_file, title)
     source_documents: list[dict] = None
+    # content_hash: 조립된 본문의 해시 (재적재로 본문이 바뀌면 요약 캐시가 무효화되도록 키에 사용)
+    content_hash: str | None = None
     
     def __post_init__(self):
         if self.source_documents is None:
@@ -65,6 +69,22 @@ class ContextBuilder:
             return RagDocumentPackage(merged_documents_text=None, source="none")
 
         retrieved_chunks = self._repository.fetch_chunks(chunk_ids)
+        return self._assemble(hits, retrieved_chunks)
+
+    async def abuild(self, hits: Sequence[Any], chunk_ids: Sequence[Any]) -> RagDocumentPackage:
+        """build의 비동기 버전 (Mongo 조회만 비동기로 수행하고 조립 로직은 공유)."""
+        self._debug(
+            f"context_builder.abuild: 히트 수={len(hits)} 청크ID 수={len(chunk_ids)}"
+        )
+        if not chunk_ids:
+            self._debug("context_builder.abuild: 청크ID 없음 -> 컨텍스트 없음(None)")
+            return RagDocumentPackage(merged_documents_text=None, source="none")
+
+        retrieved_chunks = await self._repository.afetch_chunks(chunk_ids)
+        return self._assemble(hits, retrieved_chunks)
+
+    def _assemble(self, hits: Sequence[Any], retrieved_chunks: list[dict]) -> RagDocumentPackage:
+        """조회된 Mongo 문서(없으면 Pinecone 미리보기)로 문서 패키지를 조립합니다."""
         if retrieved_chunks:
             extracted_texts = [chunk.get("text", "") for chunk in retrieved_chunks]
             merged_text = self._joiner.join(filter(None, extracted_texts))
@@ -96,6 +116,7 @@ class ContextBuilder:
                 source="mongo",
                 document_count=len(retrieved_chunks),
                 source_documents=source_docs,
+                content_hash=text_hash(final_merged_text) if final_merged_text else None,
             )
 
         # MongoDB에서 문서를 찾지 못했을 때는 Pinecone 매치의 metadata.text_preview를 모아 임시 컨텍스트로 사용합니다.
@@ -116,6 +137,7 @@ class ContextBuilder:
                 merged_documents_text=fallback,
                 source="preview",
                 preview_count=len(previews),
+                content_hash=text_hash(fallback),
             )
 
         # Mongo 문서도, 미리보기 텍스트도 없을 때
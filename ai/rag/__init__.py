@@ -1,17 +1,21 @@
 """RAG (Retrieval-Augmented Generation) module."""
 
 from .RagDocumentPackage import RagDocumentPackage, ContextBuilder
+from .condenser import CondenseRouter, ExtractiveCondenser
 from .gate import GateDecision, RegulationGate
-from .repository import MongoChunkRepository
+from .repository import MongoChunkRepository, RepositoryStats
 from .retriever import PineconeRetriever, RetrieverResult
 from .service import RagResult, RagService
 
 __all__ = [
 	"RagDocumentPackage",
 	"ContextBuilder",
+	"CondenseRouter",
+	"ExtractiveCondenser",
 	"GateDecision",
 	"RegulationGate",
 	"MongoChunkRepository",
+	"RepositoryStats",
 	"PineconeRetriever",
 	"RetrieverResult",
 	"RagResult",
@@ -0,0 +1,193 @@
+"""Local extractive condenser for RAG context.
+
+LLM 요약(_condense_rag_context) 대신 네트워크 없이 수 ms 안에 동작하는 추출형 요약기입니다.
+
+처리 흐름:
+1) Mongo에서 병합한 본문을 줄 단위로 나누고, 조문(제N조)/별표(<별표N>)/번호 항목 경계로 단위(unit)를 만듭니다.
+   (ai/data/document_loader.py가 청크를 나눌 때 쓰는 것과 같은 표기 기준)
+2) 질문과 각 단위를 글자 bigram BM25로 점수화합니다. (형태소 분석기 없이 한국어에 동작)
+3) 상위 단위를 앞뒤 ±N줄 맥락, 소속 조문/별표 제목 줄과 함께 <반영> 태그로 감싸 원문 순서대로 반환합니다.
+
+CondenseRouter는 RAG_CONDENSE_MODE(llm | local | auto, 기본 llm)와 본문 길이로 두 경로 중 하나를 고릅니다.
+추출형 요약은 원문 줄을 그대로 고르기만 하므로 답변 품질이 달라질 수 있어, 명시적으로 켰을 때만 사용합니다.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+# document_loader.extract_chunks_finditer / extract_star_tables 와 같은 표기
+ARTICLE_RE = re.compile(r"^\s*제\s*\d+\s*조(?:의\s*\d+)?")
+TABLE_RE = re.compile(r"^\s*<\s*별표\s*\d+\s*>")
+ITEM_RE = re.compile(r"^\s*(?:\d{1,2}[.)]|\(\d{1,2}\)|[①-⑳]|[가-하][.)])\s*")
+
+_SPACE_RE = re.compile(r"\s+")
+
+CONDENSE_MODES = ("auto", "local", "llm")
+
+
+@dataclass(slots=True)
+class ContextUnit:
+    """조문/별표/번호 항목 하나 (줄 범위는 [start, end))"""
+
+    start: int
+    end: int
+    heading: int | None  # 소속 조문/별표 제목 줄 번호 (자기 자신이 제목이면 None)
+    text: str
+
+
+def _bigrams(text: str) -> list[str]:
+    compact = _SPACE_RE.sub("", text.lower())
+    if len(compact) < 2:
+        return [compact] if compact else []
+    return [compact[i : i + 2] for i in range(len(compact) - 1)]
+
+
+def split_units(lines: Sequence[str]) -> list[ContextUnit]:
+    """줄 목록을 조문/별표/번호 항목 경계로 나눕니다."""
+    units: list[ContextUnit] = []
+    start = 0
+    heading: int | None = None
+    unit_heading: int | None = None
+
+    def close(end: int) -> None:
+        if end > start:
+            text = "\n".join(lines[start:end]).strip()
+            if text:
+                units.append(ContextUnit(start, end, unit_heading, text))
+
+    for idx, line in enumerate(lines):
+        is_heading = bool(ARTICLE_RE.match(line) or TABLE_RE.match(line))
+        is_item = bool(ITEM_RE.match(line))
+        if idx > start and (is_heading or is_item or not line.strip()):
+            close(idx)
+            start = idx
+            unit_heading = None if is_heading else heading
+        if is_heading:
+            heading = idx
+            unit_heading = None
+    close(len(lines))
+    return units
+
+
+class ExtractiveCondenser:
+    """BM25(글자 bigram)로 질문과 가까운 단위를 골라 <반영> 블록으로 반환합니다."""
+
+    def __init__(
+        self,
+        *,
+        top_k: int = 6,
+        context_lines: int = 5,
+        max_chars: int = 6000,
+        k1: float = 1.5,
+        b: float = 0.75,
+        debug_fn: Callable[[str], None] | None = None,
+    ) -> None:
+        self._top_k = top_k
+        self._context_lines = context_lines
+        self._max_chars = max_chars
+        self._k1 = k1
+        self._b = b
+        self._debug = debug_fn or (lambda _: None)
+
+    def score_units(self, question: str, units: Sequence[ContextUnit]) -> list[float]:
+        query_terms = set(_bigrams(question))
+        if not units or not query_terms:
+            return [0.0] * len(units)
+
+        docs = [Counter(_bigrams(unit.text)) for unit in units]
+        avg_len = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+        df = Counter(term for doc in docs for term in query_terms if term in doc)
+        n = len(docs)
+
+        scores: list[float] = []
+        for doc in docs:
+            length = sum(doc.values())
+            score = 0.0
+            for term in query_terms:
+                tf = doc.get(term)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf + self._k1 * (1 - self._b + self._b * length / avg_len)
+                score += idf * tf * (self._k1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def condense(self, question: str, raw_context: str) -> str:
+        lines = raw_context.splitlines()
+        units = split_units(lines)
+        scores = self.score_units(question, units)
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > 0),
+            key=lambda i: scores[i],
+            reverse=True,
+        )[: self._top_k]
+        if not ranked:
+            self._debug("condenser.local: 질문과 겹치는 단위 없음 -> 앞부분 사용")
+            return f"<반영>\n{raw_context[: self._max_chars].strip()}\n</반영>"
+
+        # 선택 단위 ±N줄 범위를 만들고 겹치는 범위는 합침 (점수 높은 순으로 글자 예산 안에서)
+        ranges: list[tuple[int, int]] = []
+        budget = self._max_chars
+        for i in ranked:
+            unit = units[i]
+            lo = max(0, unit.start - self._context_lines)
+            hi = min(len(lines), unit.end + self._context_lines)
+            cost = sum(len(line) + 1 for line in lines[lo:hi])
+            if ranges and cost > budget:
+                continue
+            budget -= cost
+            ranges.append((lo, hi))
+            if unit.heading is not None and unit.heading < lo:
+                ranges.append((unit.heading, unit.heading + 1))
+
+        merged: list[list[int]] = []
+        for lo, hi in sorted(ranges):
+            if merged and lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+
+        blocks = [
+            "<반영>\n" + "\n".join(lines[lo:hi]).strip() + "\n</반영>" for lo, hi in merged
+        ]
+        condensed = "\n".join(blocks)
+        self._debug(
+            f"condenser.local: 단위 {len(units)}개 중 {len(ranked)}개 선택 -> 블록 {len(blocks)}개, {len(condensed)}자"
+        )
+        return condensed
+
+
+class CondenseRouter:
+    """요약 경로를 고릅니다.
+
+    - "llm": 기존 LLM 요약 ("quality" 모드, 기본값)
+    - "local": ExtractiveCondenser (수 ms, 네트워크 없음)
+    - "auto": local_max_chars 이하는 local, 그보다 길면 llm
+    """
+
+    def __init__(
+        self,
+        mode: str | None = None,
+        *,
+        local_max_chars: int | None = None,
+    ) -> None:
+        mode = (mode or os.getenv("RAG_CONDENSE_MODE", "llm")).lower()
+        if mode == "quality":
+            mode = "llm"
+        self.mode = mode if mode in CONDENSE_MODES else "llm"
+        self.local_max_chars = (
+            local_max_chars
+            if local_max_chars is not None
+            else int(os.getenv("RAG_CONDENSE_LOCAL_MAX_CHARS", "8000"))
+        )
+
+    def choose(self, raw_context: str) -> str:
+        if self.mode != "auto":
+            return self.mode
+        return "local" if len(raw_context) <= self.local_max_chars else "llm"
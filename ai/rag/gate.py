@@ -2,17 +2,58 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
-from typing import Callable
+import os
+import re
+from array import array
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable
 
+from app.ai.cache import TTLCache, dot, normalize_text, unit_vector
 from app.ai.chatbot import character
-from app.ai.chatbot.config import client, model
+from app.ai.chatbot.config import async_client, client, model
+from app.ai.concurrency import run_blocking
+
+# 규정 질문으로 바로 판정하는 키워드 (LLM 실패 시 fallback에도 동일하게 사용)
+REGULATION_KEYWORDS: tuple[str, ...] = ("학사", "규정", "졸업", "수강", "성적", "장학", "징계")
+
+# 규정 번호/조문 표기: "제12조", "제3조의2", "3-2-29", "<별표 1>", "학칙", "시행세칙"
+REGULATION_PATTERNS: tuple[re.Pattern[str], ...] = (
+    re.compile(r"제\s*\d+\s*조"),
+    re.compile(r"(?<!\d)\d{1,2}-\d{1,2}-\d{1,3}(?!\d)"),
+    re.compile(r"별표\s*\d+"),
+    re.compile(r"학칙|세칙|내규"),
+)
+
+# 규정과 무관한 것이 분명한 질문 (규정 키워드가 함께 없을 때만 적용)
+NON_REGULATION_KEYWORDS: tuple[str, ...] = ("학식", "식단", "메뉴", "조식", "중식", "석식", "날씨")
+
+# gate 캐시 설정 (GATE_SEMANTIC_THRESHOLD를 주면 유사 질문 캐시도 사용)
+GATE_CACHE_SIZE = int(os.getenv("GATE_CACHE_SIZE", "2048"))
+GATE_CACHE_TTL = float(os.getenv("GATE_CACHE_TTL", str(6 * 3600)))
+GATE_SEMANTIC_THRESHOLD = float(os.getenv("GATE_SEMANTIC_THRESHOLD", "0")) or None
+GATE_SEMANTIC_SIZE = int(os.getenv("GATE_SEMANTIC_SIZE", "256"))
 
 
 @dataclass(slots=True)
 class GateDecision:
     is_regulation: bool
     reason: str | None = None
+    tier: str = "llm"  # 판정한 단계: rule | cache | semantic | llm | fallback
+
+
+def rule_decide(question: str) -> GateDecision | None:
+    """키워드/규정 번호 패턴으로 명확한 경우만 판정합니다. 애매하면 None."""
+    for keyword in REGULATION_KEYWORDS:
+        if keyword in question:
+            return GateDecision(True, f"rule: keyword '{keyword}'", tier="rule")
+    for pattern in REGULATION_PATTERNS:
+        match = pattern.search(question)
+        if match:
+            return GateDecision(True, f"rule: pattern '{match.group(0)}'", tier="rule")
+    for keyword in NON_REGULATION_KEYWORDS:
+        if keyword in question:
+            return GateDecision(False, f"rule: non-regulation keyword '{keyword}'", tier="rule")
+    return None
 
 
 class RegulationGate:
@@ -22,17 +63,38 @@ class RegulationGate:
         self,
         *,
         openai_client=client,
+        async_openai_client=async_client,
         model_name: str | None = None,
+        use_rules: bool = True,
+        cache_size: int = GATE_CACHE_SIZE,
+        cache_ttl: float | None = GATE_CACHE_TTL,
+        semantic_threshold: float | None = GATE_SEMANTIC_THRESHOLD,
+        semantic_size: int = GATE_SEMANTIC_SIZE,
+        embed_fn: Callable[[str], Iterable[float]] | None = None,
         debug_fn: Callable[[str], None] | None = None,
     ) -> None:
         self._client = openai_client
+        self._async_client = async_openai_client
         self._model_name = model_name or model.advanced
         self._debug = debug_fn or (lambda _: None)
-
-    def decide(self, question: str) -> GateDecision:
-        self._debug(
-            f"gate.decide: evaluating question='{question[:60]}...' with model={self._model_name}"
+        self._use_rules = use_rules
+        # 정규화된 질문 → LLM 판정 (완전 일치 캐시)
+        self._cache: TTLCache[GateDecision] = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # 정규화된 질문 → (단위 질의 임베딩, LLM 판정) (유사 질문 캐시)
+        # 조회가 저장된 벡터 전체를 훑으므로 최근 판정 semantic_size개(완전 일치 캐시 이하)만 유지
+        self._semantic_threshold = semantic_threshold
+        self._semantic: TTLCache[tuple[array, GateDecision]] = TTLCache(
+            maxsize=max(1, min(semantic_size, cache_size)), ttl=cache_ttl
         )
+        if semantic_threshold and embed_fn is None:
+            # retriever와 같은 질의 임베딩 캐시를 공유 → 규정 질문이면 검색 시 재사용됨
+            from app.ai.data import query_embedding_cache
+
+            embed_fn = query_embedding_cache.get_vector
+        self._embed = embed_fn
+
+    def _build_request(self, question: str) -> dict:
+        """gate 판정용 Responses API 요청 인자를 구성합니다 (동기/비동기 공용)."""
         prompt = [
             {"role": "system", "content": character.decide_rag},
             {"role": "user", "content": question},
@@ -48,30 +110,133 @@ class RegulationGate:
             "additionalProperties": False,
         }
 
+        return {
+            "model": self._model_name,
+            "input": prompt,
+            "text": {
+                "format": {
+                    "type": "json_schema",
+                    "name": "rag_gate_schema",
+                    "schema": schema,
+                    "strict": True,
+                }
+            },
+        }
+
+    def _parse_response(self, response) -> GateDecision:
+        raw = (getattr(response, "output_text", "") or "").strip()
+        payload = json.loads(raw) if raw else {}
+        is_reg = bool(payload.get("is_regulation"))
+        reason = (payload.get("reason") or "").strip() or None
+        if reason:
+            self._debug(f"gate.decide: reason='{reason}'")
+        self._debug(f"gate.decide: decision={is_reg}")
+        return GateDecision(is_regulation=is_reg, reason=reason)
+
+    def _keyword_fallback(self, question: str, exc: Exception) -> GateDecision:
+        self._debug(f"gate.decide: structured output failure -> {exc}")
+        fallback = any(keyword in question for keyword in REGULATION_KEYWORDS) or any(
+            pattern.search(question) for pattern in REGULATION_PATTERNS
+        )
+        self._debug(f"gate.decide: keyword fallback decision={fallback}")
+        return GateDecision(is_regulation=fallback, tier="fallback")
+
+    def _lookup(self, question: str) -> tuple[str, GateDecision | None]:
+        """규칙 → 완전 일치 캐시 순서로 판정을 찾습니다. (캐시 키, 판정 또는 None)"""
+        key = normalize_text(question)
+        if self._use_rules:
+            decision = rule_decide(question)
+            if decision is not None:
+                self._debug(f"gate.decide: {decision.reason} -> decision={decision.is_regulation}")
+                return key, decision
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._debug(f"gate.decide: cache hit -> decision={cached.is_regulation}")
+            return key, replace(cached, tier="cache")
+        return key, None
+
+    def _lookup_semantic(self, key: str, vector: array | None) -> GateDecision | None:
+        """최근 LLM 판정 중 질의 임베딩이 threshold 이상 비슷한 것이 있으면 재사용합니다.
+
+        저장된 벡터는 모두 단위 벡터이므로 코사인 유사도는 내적입니다 (최대 semantic_size번).
+        """
+        if vector is None:
+            return None
+        best_score, best = 0.0, None
+        for _, (other_vec, decision) in self._semantic.items():
+            score = dot(vector, other_vec)
+            if score > best_score:
+                best_score, best = score, decision
+        if best is None or best_score < self._semantic_threshold:
+            return None
+        self._debug(f"gate.decide: semantic hit score={best_score:.3f} -> decision={best.is_regulation}")
+        self._cache.set(key, best)
+        return replace(best, tier="semantic")
+
+    def _embed_safely(self, question: str) -> array | None:
+        try:
+            return unit_vector(self._embed(question))
+        except Exception as exc:
+            self._debug(f"gate.decide: semantic embedding failure -> {exc}")
+            return None
+
+    def _embed_and_lookup(self, key: str, question: str) -> tuple[array | None, GateDecision | None]:
+        """질의 임베딩 + 유사 질문 조회 (adecide에서 한 번에 스레드 풀로 넘김)"""
+        vector = self._embed_safely(question)
+        return vector, self._lookup_semantic(key, vector)
+
+    def _remember(self, key: str, vector: array | None, decision: GateDecision) -> GateDecision:
+        """LLM 판정만 캐시합니다 (fallback 판정은 일시적 오류일 수 있어 저장하지 않음)."""
+        if decision.tier == "llm":
+            self._cache.set(key, decision)
+            if vector is not None:
+                self._semantic.set(key, (vector, decision))
+        return decision
+
+    def decide(self, question: str) -> GateDecision:
+        key, decision = self._lookup(question)
+        if decision is not None:
+            return decision
+
+        vector = None
+        if self._semantic_threshold and self._embed is not None:
+            vector = self._embed_safely(question)
+            decision = self._lookup_semantic(key, vector)
+            if decision is not None:
+                return decision
+
+        self._debug(
+            f"gate.decide: evaluating question='{question[:60]}...' with model={self._model_name}"
+        )
+        try:
+            response = self._client.responses.create(**self._build_request(question))
+            decision = self._parse_response(response)
+        except Exception as exc:
+            decision = self._keyword_fallback(question, exc)
+        return self._remember(key, vector, decision)
+
+    async def adecide(self, question: str) -> GateDecision:
+        """decide의 비동기 버전 (AsyncOpenAI 사용, 이벤트 루프를 막지 않음)."""
+        key, decision = self._lookup(question)
+        if decision is not None:
+            return decision
+
+        vector = None
+        if self._semantic_threshold and self._embed is not None:
+            # 임베딩과 유사도 비교 모두 CPU/네트워크 작업이므로 이벤트 루프 밖에서 실행
+            vector, decision = await run_blocking(self._embed_and_lookup, key, question)
+            if decision is not None:
+                return decision
+
+        self._debug(
+            f"gate.adecide: evaluating question='{question[:60]}...' with model={self._model_name}"
+        )
         try:
-            response = self._client.responses.create(
-                model=self._model_name,
-                input=prompt,
-                text={
-                    "format": {
-                        "type": "json_schema",
-                        "name": "rag_gate_schema",
-                        "schema": schema,
-                        "strict": True,
-                    }
-                },
-            )
-            raw = (getattr(response, "output_text", "") or "").strip()
-            payload = json.loads(raw) if raw else {}
-            is_reg = bool(payload.get("is_regulation"))
-            reason = (payload.get("reason") or "").strip() or None
-            if reason:
-                self._debug(f"gate.decide: reason='{reason}'")
-            self._debug(f"gate.decide: decision={is_reg}")
-            return GateDecision(is_regulation=is_reg, reason=reason)
+            response = await self._async_client.responses.create(**self._build_request(question))
+            decision = self._parse_response(response)
         except Exception as exc:
-            self._debug(f"gate.decide: structured output failure -> {exc}")
-            keywords = ["학사", "규정", "졸업", "수강", "성적", "장학", "징계"]
-            fallback = any(keyword in question for keyword in keywords)
-            self._debug(f"gate.decide: keyword fallback decision={fallback}")
-            return GateDecision(is_regulation=fallback)
+            decision = self._keyword_fallback(question, exc)
+        return self._remember(key, vector, decision)
+
+    def cache_stats(self) -> dict:
+        return {"exact": self._cache.stats(), "semantic": self._semantic.stats()}
@@ -6,6 +6,7 @@ from typing import Any, Callable, Sequence
 
 from bson import ObjectId, errors
 
+from app.ai.concurrency import run_blocking
 from app.ai.data import MONGO_AVAILABLE, collection
 
 
@@ -15,6 +16,18 @@ class RepositoryStats:
     misses: int
 
 
+# ContextBuilder가 실제로 사용하는 필드만 가져옵니다 (본문 + 출처 메타데이터).
+CHUNK_PROJECTION: dict[str, int] = {
+    "text": 1,
+    "law_article_id": 1,
+    "source_file": 1,
+    "title": 1,
+    "metadata.law_article_id": 1,
+    "metadata.source_file": 1,
+    "metadata.title": 1,
+}
+
+
 class MongoChunkRepository:
     """Repository responsible for fetching chunk documents from MongoDB."""
 
@@ -23,12 +36,27 @@ class MongoChunkRepository:
         mongo_collection=collection,
         *,
         mongo_available: bool = MONGO_AVAILABLE,
+        bulk: bool = True,
+        projection: dict[str, int] | None = CHUNK_PROJECTION,
         debug_fn: Callable[[str], None] | None = None,
     ) -> None:
         self._collection = mongo_collection
         self._mongo_available = mongo_available
+        # bulk=True: $in 질의 한 번으로 조회 / False: 기존처럼 id마다 find_one
+        self._bulk = bulk
+        self._projection = projection
         self._debug = debug_fn or (lambda _: None)
 
+    def _to_object_id(self, chunk_id: Any) -> Any:
+        try:
+            if isinstance(chunk_id, str) and len(chunk_id) == 24:
+                return ObjectId(chunk_id)
+        except errors.InvalidId as exc:
+            self._debug(
+                f"  - ObjectId conversion failed for '{chunk_id}' ({exc}); using raw value"
+            )
+        return chunk_id
+
     def fetch_chunks(self, chunk_ids: Sequence[Any]) -> list[dict]:
         self._debug(
             f"repository.fetch_chunks: requested_ids={len(chunk_ids)} sample={list(chunk_ids)[:5]}"
@@ -39,43 +67,72 @@ class MongoChunkRepository:
             self._debug("repository.fetch_chunks: Mongo unavailable -> returning []")
             return []
 
-        results: list[dict] = []
-        hits = 0
-        misses = 0
+        # 검색 순위를 유지한 채 중복 id 제거 (같은 문서의 여러 sub_index가 함께 검색되는 경우)
+        unique_ids: list[Any] = list(dict.fromkeys(str(cid) for cid in chunk_ids))
+        if len(unique_ids) != len(chunk_ids):
+            self._debug(
+                f"  - duplicate ids removed: {len(chunk_ids)} -> {len(unique_ids)}"
+            )
 
-        for chunk_id in chunk_ids:
-            try:
-                if isinstance(chunk_id, str) and len(chunk_id) == 24:
-                    object_id = ObjectId(chunk_id)
-                    self._debug(f"  - converted '{chunk_id}' to ObjectId")
-                else:
-                    object_id = chunk_id
-                    self._debug(f"  - using id '{chunk_id}' without conversion (type={type(chunk_id).__name__})")
-            except errors.InvalidId as exc:
-                self._debug(
-                    f"  - ObjectId conversion failed for '{chunk_id}' ({exc}); using raw value"
-                )
-                object_id = chunk_id
+        if self._bulk:
+            results = self._fetch_bulk(unique_ids)
+        else:
+            results = self._fetch_one_by_one(unique_ids)
 
+        # 통계는 로그로만 남김 (저장소는 모든 요청이 공유하므로 호출별 상태를 보관하지 않음)
+        hits = len(results)
+        misses = len(unique_ids) - hits
+        self._debug(
+            f"repository.fetch_chunks summary: hits={hits} misses={misses} returned={len(results)}"
+        )
+        return results
+
+    def _fetch_bulk(self, unique_ids: list[str]) -> list[dict]:
+        """$in 질의 한 번으로 조회한 뒤 검색 순위대로 재정렬합니다."""
+        object_ids = [self._to_object_id(cid) for cid in unique_ids]
+        try:
+            cursor = self._collection.find({"_id": {"$in": object_ids}}, self._projection)
+            by_id = {str(doc.get("_id")): doc for doc in cursor}
+        except Exception as exc:  # pragma: no cover - defensive logging
+            self._debug(f"    -> Mongo bulk query error for {len(object_ids)} ids: {exc}")
+            return []
+
+        results: list[dict] = []
+        for chunk_id in unique_ids:
+            document = by_id.get(chunk_id)
+            if document:
+                results.append(document)
+                text_value = document.get("text")
+                text_len = len(text_value) if isinstance(text_value, str) else 0
+                self._debug(f"    -> hit: _id={chunk_id} text_length={text_len}")
+            else:
+                self._debug(f"    -> miss: _id={chunk_id}")
+        return results
+
+    def _fetch_one_by_one(self, unique_ids: list[str]) -> list[dict]:
+        """id마다 find_one을 호출하는 기존 방식 (진단/비교용)."""
+        results: list[dict] = []
+        for chunk_id in unique_ids:
+            object_id = self._to_object_id(chunk_id)
             try:
-                document = self._collection.find_one({"_id": object_id})
+                document = self._collection.find_one({"_id": object_id}, self._projection)
             except Exception as exc:  # pragma: no cover - defensive logging
                 self._debug(f"    -> Mongo query error for _id={chunk_id}: {exc}")
                 continue
 
             if document:
                 results.append(document)
-                hits += 1
                 text_value = document.get("text")
                 text_len = len(text_value) if isinstance(text_value, str) else 0
                 self._debug(
                     f"    -> hit: _id={document.get('_id')} text_length={text_len}"
                 )
             else:
-                misses += 1
                 self._debug(f"    -> miss: _id={chunk_id}")
-
-        self._debug(
-            f"repository.fetch_chunks summary: hits={hits} misses={misses} returned={len(results)}"
-        )
         return results
+
+    async def afetch_chunks(self, chunk_ids: Sequence[Any]) -> list[dict]:
+        """fetch_chunks의 비동기 버전 (pymongo 호출을 공용 스레드 풀로 넘김)."""
+        if not chunk_ids or not self._mongo_available:
+            return self.fetch_chunks(chunk_ids)
+        return await run_blocking(self.fetch_chunks, chunk_ids)
@@ -7,10 +7,12 @@ making the implementation injectable and easier to test.
 from __future__ import annotations
 
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Callable, Iterable, Sequence
 
-from app.ai.data import get_embedding, index
+from app.ai.concurrency import run_blocking
+from app.ai.data import get_cached_embedding, index
 
 # ID 추출 우선순위 (앞에 있을수록 우선)
 ID_KEYS_PRIORITY: tuple[str, ...] = ("mongo_id", "id", "ID", "default")
@@ -25,10 +27,12 @@ class RetrieverResult:
                 * score: 유사도 점수(0~1)
                 * id: 벡터 고유 ID(업서트 시 생성된 UUID)
                 * metadata: 업로드 시 넣어둔 보조정보(dict). 예: mongo_id, text_preview, sub_index 등
-            → 이 목록은 threshold(기본 0.4) 미만 점수는 걸러진 상태로 반환됩니다.
+            → 이 목록은 모든 네임스페이스 결과를 점수순으로 합친 뒤, threshold(기본 0.4) 미만 점수를 걸러내고
+              전역 top_k로 자른 상태로 반환됩니다.
 
         - chunk_ids: 실제 MongoDB에서 본문을 재조회하기 위해 추출한 문서 조각 ID들의 모음입니다.
             우선순위는 metadata.mongo_id → metadata.id → metadata.ID → metadata.default 순서로 사용합니다.
+            hits와 같은 순위이며, threshold로 걸러진 매치의 ID는 포함하지 않습니다.
         """
 
         hits: Sequence[Any]
@@ -45,72 +49,104 @@ class PineconeRetriever:
         *,
         namespaces: Sequence[str] | None = None,
         top_k: int = 5,
+        global_top_k: int | None = None,
+        concurrent: bool = True,
         debug_fn: Callable[[str], None] | None = None,
     ) -> None:
         self._index = index_client
-        self._embed = embed_fn or get_embedding
+        # 기본 embed_fn은 질의 임베딩 캐시를 거칩니다 (반복 질문은 API 호출 없음)
+        self._embed = embed_fn or get_cached_embedding
         self._namespaces = list(namespaces or ("law_articles", "appendix_tables"))
         self._top_k = top_k
+        # 네임스페이스 결과를 점수순으로 합친 뒤 남길 최대 개수 (기본: 네임스페이스별 top_k의 합)
+        self._global_top_k = global_top_k or top_k * len(self._namespaces)
+        # concurrent=True: 네임스페이스 질의를 동시에 실행 / False: 순차 실행
+        self._concurrent = concurrent
+        self._executor: ThreadPoolExecutor | None = None
         self._debug = debug_fn or (lambda _: None)
 
+    def _query_namespace(self, namespace: str, embedding: Any) -> list[Any]:
+        self._debug(f"  - querying namespace='{namespace}'")
+        # include_metadata=True: 업로드 시 저장해둔 metadata(mongo_id, text_preview, sub_index 등)를 함께 받아옵니다.
+        response = self._index.query(
+            namespace=namespace,
+            top_k=self._top_k,
+            include_metadata=True,
+            vector=embedding,
+        )
+        matches = list(getattr(response, "matches", []) or [])
+        self._debug(f"    -> namespace='{namespace}' returned_matches={len(matches)}")
+        return matches
+
+    def _query_all(self, embedding: Any) -> list[list[Any]]:
+        """모든 네임스페이스를 질의해 네임스페이스별 매치 목록을 반환합니다."""
+        if not self._concurrent or len(self._namespaces) < 2:
+            return [self._query_namespace(ns, embedding) for ns in self._namespaces]
+
+        # 전용 스레드 풀 사용: asearch가 공용 풀에서 search를 실행하므로,
+        # 같은 풀에 다시 작업을 넣으면 풀이 가득 찼을 때 교착될 수 있습니다.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(self._namespaces), thread_name_prefix="pinecone-query"
+            )
+        futures = [
+            self._executor.submit(self._query_namespace, ns, embedding) for ns in self._namespaces
+        ]
+        return [future.result() for future in futures]
+
     def search(self, query: str, *, threshold: float = 0.4) -> RetrieverResult:
         start_ts = time.time()
         self._debug(
-            f"retriever.search: query='{query[:80]}' namespaces={self._namespaces} top_k={self._top_k} threshold={threshold}"
+            f"retriever.search: query='{query[:80]}' namespaces={self._namespaces} top_k={self._top_k} "
+            f"global_top_k={self._global_top_k} threshold={threshold} concurrent={self._concurrent}"
         )
         embedding = self._embed(query)
+        if not isinstance(embedding, list):
+            embedding = list(embedding)
 
         # all_hits: 네임스페이스별 Pinecone 질의에서 얻은 "매치 객체"(score/id/metadata 포함)들을 전부 모아둔 임시 바구니
-        #            이후 threshold(점수 하한)로 필터링해 최종 hits 로 돌려줍니다.
-        all_hits: list[Any] = []
-        # all_chunk_ids: 각 매치의 metadata에서 문서 조각 ID를 뽑아 모아둔 리스트
-        #               → 나중에 MongoDB에서 실제 본문을 가져올 때 사용합니다.
-        all_chunk_ids: list[Any] = []
-
-        for namespace in self._namespaces:
-            self._debug(f"  - querying namespace='{namespace}'")
-            # include_metadata=True: 업로드 시 저장해둔 metadata(mongo_id, text_preview, sub_index 등)를 함께 받아옵니다.
-            response = self._index.query(
-                namespace=namespace,
-                top_k=self._top_k,
-                include_metadata=True,
-                vector=embedding,
+        all_hits: list[Any] = [match for matches in self._query_all(embedding) for match in matches]
+
+        # 점수순 병합 → threshold(점수 하한) 필터 → 전역 top_k
+        ranked = sorted(all_hits, key=lambda hit: getattr(hit, "score", 0) or 0, reverse=True)
+        filtered_hits = [hit for hit in ranked if (getattr(hit, "score", 0) or 0) >= threshold]
+        filtered_hits = filtered_hits[: self._global_top_k]
+
+        # chunk_ids: 최종 hits의 metadata에서 문서 조각 ID를 순위대로 뽑은 리스트
+        #            → threshold로 걸러진 매치의 ID는 포함하지 않으므로 Mongo에서 불필요한 문서를 가져오지 않습니다.
+        chunk_ids: list[Any] = []
+        for match in filtered_hits:
+            metadata = getattr(match, "metadata", {}) or {}
+
+            # 우선순위에 따라 첫 번째로 발견되는 유효한 ID를 선택
+            id_source, id_value = next(
+                (
+                    (k, metadata[k])
+                    for k in ID_KEYS_PRIORITY
+                    if k in metadata and metadata[k] is not None
+                ),
+                (None, None),
             )
-            matches = getattr(response, "matches", []) or []
-            self._debug(f"    -> returned_matches={len(matches)}")
-
-            for match in matches:
-                # 매치 전체 객체 자체를 보관합니다(점수, id, metadata를 다 들고 있음)
-                all_hits.append(match)
-                metadata = getattr(match, "metadata", {}) or {}
-
-                # 우선순위에 따라 첫 번째로 발견되는 유효한 ID를 선택
-                id_source, id_value = next(
-                    (
-                        (k, metadata[k])
-                        for k in ID_KEYS_PRIORITY
-                        if k in metadata and metadata[k] is not None
-                    ),
-                    (None, None),
+
+            score = getattr(match, "score", None)
+            if id_value is not None:
+                chunk_ids.append(id_value)
+                self._debug(f"      match: id(source={id_source})={id_value} score={score}")
+            else:
+                self._debug(
+                    f"      match: missing id score={score} metadata_keys={list(metadata.keys())}"
                 )
 
-                score = getattr(match, "score", None)
-                if id_value is not None:
-                    # Mongo 재조회용으로 청크 ID만 따로 수집합니다.
-                    all_chunk_ids.append(id_value)
-                    self._debug(f"      match: id(source={id_source})={id_value} score={score}")
-                else:
-                    self._debug(
-                        f"      match: missing id score={score} metadata_keys={list(metadata.keys())}"
-                    )
-
-        filtered_hits = [hit for hit in all_hits if getattr(hit, "score", 0) >= threshold]
         duration = time.time() - start_ts
         self._debug(
             "retriever.search summary: total_hits={} filtered_hits={} unique_ids={} duration={:.3f}s".format(
-                len(all_hits), len(filtered_hits), len(set(all_chunk_ids)), duration
+                len(all_hits), len(filtered_hits), len(set(map(str, chunk_ids))), duration
             )
         )
 
-        # 결과: 임계값 이상인 매치들만 hits 로, 추출된 청크 ID 모음을 chunk_ids 로 반환합니다.
-        return RetrieverResult(hits=filtered_hits, chunk_ids=all_chunk_ids)
+        # 결과: 임계값 이상인 매치들만 hits 로, 그 매치들의 청크 ID를 chunk_ids 로 반환합니다.
+        return RetrieverResult(hits=filtered_hits, chunk_ids=chunk_ids)
+
+    async def asearch(self, query: str, *, threshold: float = 0.4) -> RetrieverResult:
+        """search의 비동기 버전 (임베딩 + Pinecone 질의를 공용 스레드 풀로 넘김)."""
+        return await run_blocking(self.search, query, threshold=threshold)
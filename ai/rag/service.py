@@ -30,6 +30,8 @@ class RagResult:
         document_count: int = 0            # DB에서 불러온 문서 조각 개수
         preview_count: int = 0             # 미리보기 문장을 사용했다면 그 개수
         source_documents: list = None      # 검색된 문서들의 메타데이터 (law_article_id, source_file, title)
+        gate_tier: Optional[str] = None    # gate 판정 단계: rule | cache | semantic | llm | fallback
+        content_hash: Optional[str] = None # 조립된 본문의 해시 (요약 캐시 키에 사용)
         
         def __post_init__(self):
             if self.source_documents is None:
@@ -69,6 +71,8 @@ class RagService:
         document_count: int = 0,
         preview_count: int = 0,
         source_documents: list = None,
+        gate_tier: str | None = None,
+        content_hash: str | None = None,
     ) -> RagResult:
         """RagResult 생성 및 캐시 저장 헬퍼 (중복 코드 제거용)"""
         result = RagResult(
@@ -81,6 +85,8 @@ class RagService:
             document_count=document_count,
             preview_count=preview_count,
             source_documents=source_documents or [],
+            gate_tier=gate_tier,
+            content_hash=content_hash,
         )
         self._last_result = result
         return result
@@ -99,22 +105,82 @@ class RagService:
         # 1단계: 규정 질문 여부 판정
         self._debug("rag_service.retrieve_context: 레그검사 시작")
         decision: GateDecision = self._gate.decide(question)
-        
-        if not decision.is_regulation:
-            self._debug("rag_service.retrieve_context: 규정 질문 아님 → 검색 생략")
-            print("[INFO] 학사 규정 관련이 아님 → RAG 검색 안 함")
-            return self._make_result(
-                merged_documents_text=None,
-                hits=[],
-                chunk_ids=[],
-                gate_reason=decision.reason,
-                is_regulation=False,
-                context_source="none",
-            )
+        early = self._result_for_decision(decision)
+        if early is not None:
+            return early
 
         # 2단계: 벡터 검색 수행
         self._debug("rag_service.retrieve_context: 레그 검사 통과 → 벡터검색 수행")
         retrieval: RetrieverResult = self._retriever.search(question)
+
+        # 3단계: 검색 결과/청크 ID 확인
+        early = self._result_for_retrieval(decision, retrieval)
+        if early is not None:
+            return early
+
+        # 4단계: MongoDB 본문 조회 + 문서 패키지 조립
+        self._debug("rag_service.retrieve_context: 문서 패키지 조립 시작")
+        doc_package: RagDocumentPackage = self._context_builder.build(retrieval.hits, retrieval.chunk_ids)
+
+        # 5단계: 최종 결과 반환
+        return self._result_for_package(decision, retrieval, doc_package)
+
+    async def aretrieve_context(
+        self,
+        question: str,
+        on_stage: Callable[..., None] | None = None,
+    ) -> RagResult:
+        """retrieve_context의 비동기 버전.
+
+        gate는 AsyncOpenAI로, 벡터 검색/Mongo 조회는 공용 스레드 풀로 실행해
+        이벤트 루프를 막지 않습니다. 처리 흐름과 결과 형식은 동기 버전과 같습니다.
+
+        on_stage(stage, state, **info)를 주면 gate/retrieval 단계의 시작·완료를 알립니다.
+        """
+        emit = on_stage or (lambda *_args, **_kwargs: None)
+
+        self._debug("rag_service.aretrieve_context: 레그검사 시작")
+        emit("gate", "started")
+        decision: GateDecision = await self._gate.adecide(question)
+        emit("gate", "done", is_regulation=decision.is_regulation, tier=decision.tier)
+        early = self._result_for_decision(decision)
+        if early is not None:
+            return early
+
+        self._debug("rag_service.aretrieve_context: 레그 검사 통과 → 벡터검색 수행")
+        emit("retrieval", "started")
+        retrieval: RetrieverResult = await self._retriever.asearch(question)
+        emit("retrieval", "done", hits=len(retrieval.hits))
+        early = self._result_for_retrieval(decision, retrieval)
+        if early is not None:
+            return early
+
+        self._debug("rag_service.aretrieve_context: 문서 패키지 조립 시작")
+        doc_package: RagDocumentPackage = await self._context_builder.abuild(
+            retrieval.hits, retrieval.chunk_ids
+        )
+        return self._result_for_package(decision, retrieval, doc_package)
+
+    def _result_for_decision(self, decision: GateDecision) -> RagResult | None:
+        """규정 질문이 아니면 검색 없이 종료 결과를, 규정 질문이면 None을 반환합니다."""
+        if decision.is_regulation:
+            return None
+        self._debug("rag_service.retrieve_context: 규정 질문 아님 → 검색 생략")
+        print("[INFO] 학사 규정 관련이 아님 → RAG 검색 안 함")
+        return self._make_result(
+            merged_documents_text=None,
+            hits=[],
+            chunk_ids=[],
+            gate_reason=decision.reason,
+            gate_tier=decision.tier,
+            is_regulation=False,
+            context_source="none",
+        )
+
+    def _result_for_retrieval(
+        self, decision: GateDecision, retrieval: RetrieverResult
+    ) -> RagResult | None:
+        """검색 결과나 청크 ID가 없으면 종료 결과를, 조립을 계속할 수 있으면 None을 반환합니다."""
         hits, chunk_ids = retrieval.hits, retrieval.chunk_ids
 
         if not hits:
@@ -125,11 +191,11 @@ class RagService:
                 hits=[],
                 chunk_ids=[],
                 gate_reason=decision.reason,
+                gate_tier=decision.tier,
                 is_regulation=True,
                 context_source="none",
             )
 
-        # 3단계: 청크 ID 확인
         if not chunk_ids:
             self._debug("rag_service.retrieve_context: 청크ID 추출 실패")
             print("[INFO] Pinecone 결과에 id 없음")
@@ -138,30 +204,36 @@ class RagService:
                 hits=hits,
                 chunk_ids=[],
                 gate_reason=decision.reason,
+                gate_tier=decision.tier,
                 is_regulation=True,
                 context_source="none",
             )
+        return None
 
-        # 4단계: MongoDB 본문 조회 + 문서 패키지 조립
-        self._debug("rag_service.retrieve_context: 문서 패키지 조립 시작")
-        doc_package: RagDocumentPackage = self._context_builder.build(hits, chunk_ids)
-        
+    def _result_for_package(
+        self,
+        decision: GateDecision,
+        retrieval: RetrieverResult,
+        doc_package: RagDocumentPackage,
+    ) -> RagResult:
+        """조립된 문서 패키지로 최종 RagResult를 만듭니다."""
         if doc_package.source in {"preview", "none"}:
             print("[INFO] MongoDB에서 매칭된 문서 없음")
         if doc_package.merged_documents_text is None:
             self._debug("rag_service.retrieve_context: 문서 패키지 조립 결과 없음(None)")
 
-        # 5단계: 최종 결과 반환
         return self._make_result(
             merged_documents_text=doc_package.merged_documents_text,
-            hits=hits,
-            chunk_ids=chunk_ids,
+            hits=retrieval.hits,
+            chunk_ids=retrieval.chunk_ids,
             gate_reason=decision.reason,
+            gate_tier=decision.tier,
             is_regulation=True,
             context_source=doc_package.source,
             document_count=doc_package.document_count,
             preview_count=doc_package.preview_count,
             source_documents=doc_package.source_documents,
+            content_hash=doc_package.content_hash,
         )
 
     def is_regulation(self, question: str) -> bool:
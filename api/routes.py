@@ -1,41 +1,78 @@
+import os
+from typing import Optional
+
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.ai.chatbot import ChatbotStream, model
+from app.ai.chatbot.session import InMemorySessionBackend, MongoSessionBackend, SessionStore
 
 class UserRequest(BaseModel):
     message: str
     language: str = "KOR"
+    session_id: Optional[str] = None
 
 
 router = APIRouter()
 
-# ChatbotStream 인스턴스 생성
-chatbot = ChatbotStream(
-    model=model.advanced,
-    system_role="""당신은 학교 생활, 학과 정보, 행사 등 사용자가 궁금한 점이 있으면 아는 범위 안에서 대답합니다. 단 절대 거짓내용을 말하지 않습니다. 아는 범위에서 말하고 부족한 부분은 인정하세요.
+SYSTEM_ROLE = """당신은 학교 생활, 학과 정보, 행사 등 사용자가 궁금한 점이 있으면 아는 범위 안에서 대답합니다. 단 절대 거짓내용을 말하지 않습니다. 아는 범위에서 말하고 부족한 부분은 인정하세요.
     당신은 실시간으로 검색하는 기능이있습니다.
     당신은 한라대 공지사항을 탐색할 수 있습니다.
     당신은 한라대 학식메뉴를 탐색할 수 있습니다.
-    당신은 한라대 학사일정을 탐색할 수 있습니다.""",
+    당신은 한라대 학사일정을 탐색할 수 있습니다."""
+
+# ChatbotStream 인스턴스 생성 (RAG/함수 호출 구성요소는 모든 세션이 공유)
+chatbot = ChatbotStream(
+    model=model.advanced,
+    system_role=SYSTEM_ROLE,
     instruction="당신은 사용자의 질문에 답변하는 역할을 합니다.",
     user="한라대 대학생",
     assistant="memmo"
 )
 
+# 세션 저장소: 대화 문맥은 session_id 별로 분리 보관
+# CHAT_SESSION_BACKEND=mongo 이면 Mongo에 영속화, 기본은 프로세스 메모리
+_session_ttl = int(os.getenv("CHAT_SESSION_TTL", str(6 * 3600)))
+if os.getenv("CHAT_SESSION_BACKEND", "memory").lower() == "mongo":
+    _session_backend = MongoSessionBackend(ttl_seconds=_session_ttl, debug_fn=chatbot._dbg)
+else:
+    _session_backend = InMemorySessionBackend()
+
+session_store = SessionStore(
+    system_role=SYSTEM_ROLE,
+    backend=_session_backend,
+    ttl_seconds=_session_ttl,
+    debug_fn=chatbot._dbg,
+)
+# 응답 후 백그라운드 요약이 적용되면 접힌 문맥을 다시 저장
+chatbot.session_saver = session_store.asave
+
 
 @router.post("/chat")
 async def chat_endpoint(user_input: UserRequest):
     """
     채팅 엔드포인트 - ChatbotStream.stream_chat()에 모든 로직 위임
+
+    session_id가 없으면 새로 발급하며, 응답 헤더 X-Session-Id로 돌려줍니다.
     """
-    stream_generator = chatbot.stream_chat(
-        message=user_input.message,
-        language=user_input.language
-    )
-    
+    session = await session_store.aget_or_create(user_input.session_id)
+
+    async def stream_generator():
+        # 같은 세션의 요청이 겹치면 순서대로 처리 (문맥이 섞이지 않도록)
+        async with session.lock:
+            try:
+                async for line in chatbot.stream_chat(
+                    message=user_input.message,
+                    language=user_input.language,
+                    session=session,
+                ):
+                    yield line
+            finally:
+                await session_store.asave(session)
+
     return StreamingResponse(
-        stream_generator,
-        media_type="application/x-ndjson"
+        stream_generator(),
+        media_type="application/x-ndjson",
+        headers={"X-Session-Id": session.session_id},
     )
@@ -1,6 +1,11 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import os
+
 from app.api.routes import router
+from app.ai.functions.cafeteria import cafeteria_cache
 
 origins = [
     "http://localhost",
@@ -19,17 +24,31 @@ origins = [
     "https://3.34.181.25:443",
 ]
 
-app = FastAPI(title="Chatbot API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 학식 주간 식단을 미리 받아 두고 주기적으로 갱신 (CAFETERIA_PREFETCH=0이면 요청 시에만 조회)
+    if os.getenv("CAFETERIA_PREFETCH", "1") != "0":
+        cafeteria_cache.start_prefetch()
+    try:
+        yield
+    finally:
+        await cafeteria_cache.stop_prefetch()
+
+
+app = FastAPI(title="Chatbot API", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,       
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id"],
 )
 
 app.include_router(router, prefix="/api")
 
+
 @app.get("/")
 async def root():
     return {"message": "chatbot project access"}
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+학식 식단 파서 벤치마크
+
+저장된 식단 페이지(tests/fixtures/*.html)로 기존 파서(legacy: 요일마다 전체 표 탐색)와
+격자 파서(bs4 SoupStrainer / lxml)의 파싱 시간과 결과를 비교합니다.
+
+실행 (app 패키지의 상위 디렉터리에서):
+    python -m app.tests.bench_cafeteria_parser [반복 횟수]
+"""
+import sys
+import time
+from pathlib import Path
+
+from app.ai.functions.cafeteria import MEALS, lxml_html, parse_weekly_menu
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def bench(html: str, backend: str, repeat: int) -> float:
+    parse_weekly_menu(html, backend=backend)  # 워밍업
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        parse_weekly_menu(html, backend=backend)
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def diff_menus(base, other) -> list:
+    diffs = []
+    for day, meals in base.menus.items():
+        for meal in MEALS:
+            a, b = meals.get(meal), other.menus.get(day, {}).get(meal)
+            # 격자 파서는 <br> 사이에 공백을 넣으므로 공백을 무시하고 비교
+            if "".join((a or "").split()) != "".join((b or "").split()):
+                diffs.append(f"{day} {meal}: {a!r} -> {b!r}")
+    return diffs
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    backends = ["legacy", "bs4"] + (["lxml"] if lxml_html is not None else [])
+    fixtures = sorted(FIXTURE_DIR.glob("cafeteria_*.html"))
+    if not fixtures:
+        print(f"식단 HTML fixture가 없습니다: {FIXTURE_DIR}")
+        return
+
+    for path in fixtures:
+        html = path.read_text(encoding="utf-8")
+        print(f"\n📄 {path.name} ({len(html):,} bytes, 반복 {repeat}회)")
+        base = parse_weekly_menu(html, backend="legacy")
+        base_ms = bench(html, "legacy", repeat)
+        for backend in backends:
+            ms = base_ms if backend == "legacy" else bench(html, backend, repeat)
+            print(f"  {backend:<7} {ms:8.2f} ms/page  x{base_ms / ms:5.1f}")
+            if backend != "legacy":
+                snap = parse_weekly_menu(html, backend=backend)
+                diffs = diff_menus(base, snap)
+                print(f"          legacy 대비 다른 칸: {len(diffs)}개")
+                for d in diffs:
+                    print(f"            {d}")
+        if lxml_html is None:
+            print("  (lxml 미설치: pip install lxml 후 lxml 경로도 측정됩니다)")
+
+
+if __name__ == "__main__":
+    main()
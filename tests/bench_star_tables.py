@@ -0,0 +1,125 @@
+"""
+별표 연결 조문(parent_law_article) 찾기 벤치마크
+
+pdfs/의 규정 파일로 기존 방식(별표마다 모든 조문 본문을 뒤에서부터 find)과
+참조 색인 방식(extract_chunks_finditer가 만든 {별표 표기: [조문]} 조회)의 시간과 결과를 비교합니다.
+
+- page: SimpleDirectoryReader가 돌려준 문서(PDF는 쪽) 단위 그대로
+- file: 한 파일의 모든 쪽을 이어 붙인 본문 (HWP처럼 큰 규정 하나가 한 문서인 경우), 배율만큼 반복
+- synthetic: 조문 300×배율개, 별표 30×배율개인 가상 규정. 조문은 '<별표N>'으로 언급하고 별표 제목은 '<별표 N>'인 경우
+  (기존 방식은 별표마다 뒤쪽 조문 본문을 끝까지 find해야 하는 최악의 경우)
+
+실행 (app 패키지의 상위 디렉터리에서):
+    python -m app.tests.bench_star_tables [반복 횟수] [배율]
+"""
+import re
+import sys
+import time
+from typing import Dict, List
+
+from app.ai.data.document_loader import extract_chunks_finditer, extract_star_tables, pdfs_dir
+
+
+def legacy_extract_star_tables(text: str, filename: str, law_blocks: List[Dict]) -> List[Dict]:
+    """기존 extract_star_tables (별표마다 조문 본문을 뒤에서부터 find: 별표 수 × 조문 수 × 본문 길이)"""
+    pattern = re.compile(r"\<별표\s*\d+\>")
+    matches = list(pattern.finditer(text))
+    star_chunks = []
+    for i, match in enumerate(matches):
+        start = match.start()
+        end = matches[i+1].start() if i+1 < len(matches) else len(text)
+        star_text = text[start:end].strip()
+        star_id = match.group().strip("<>").replace(" ", "")
+
+        parent_law = None
+        for law in reversed(law_blocks):
+            if (law['metadata']['source_file'] == filename and
+                law['metadata']['law_article_id']):
+                if law['text'] and law['text'].find(match.group()) > -1:
+                    parent_law = law['metadata']['law_article_id']
+                    break
+
+        star_chunks.append({
+            "text": star_text,
+            "metadata": {
+                "table_id": star_id,
+                "category": "appendix_tables",
+                "parent_law_article": parent_law or "unspecified",
+                "source_file": filename
+            }
+        })
+    return star_chunks
+
+
+def parents(star_chunks: List[Dict]) -> List[str]:
+    return [c["metadata"]["parent_law_article"] for c in star_chunks]
+
+
+def timed(fn, repeat: int) -> float:
+    """repeat번 실행한 시간 중 최솟값(ms) — GC 등 잡음을 줄이기 위해 평균 대신 사용"""
+    fn()  # 워밍업
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def compare(texts: List[str], filename: str, repeat: int) -> Dict[str, float]:
+    """문서들에 대해 (조문 청킹, 색인 포함 조문 청킹, 기존 별표, 색인 별표) 시간과 결과 차이를 잽니다."""
+    result = {"chunk": 0.0, "chunk_index": 0.0, "legacy": 0.0, "indexed": 0.0, "diffs": 0}
+    for text in texts:
+        index: Dict[str, List[str]] = {}
+        law_blocks = extract_chunks_finditer(text, filename, reference_index=index)
+        result["chunk"] += timed(lambda: extract_chunks_finditer(text, filename), repeat)
+        result["chunk_index"] += timed(lambda: extract_chunks_finditer(text, filename, reference_index={}), repeat)
+        result["legacy"] += timed(lambda: legacy_extract_star_tables(text, filename, law_blocks), repeat)
+        result["indexed"] += timed(lambda: extract_star_tables(text, filename, law_blocks, reference_index=index), repeat)
+        old = parents(legacy_extract_star_tables(text, filename, law_blocks))
+        new = parents(extract_star_tables(text, filename, law_blocks, reference_index=index))
+        result["diffs"] += sum(a != b for a, b in zip(old, new)) + abs(len(old) - len(new))
+    return result
+
+
+def synthetic_regulation(scale: int) -> str:
+    articles = 300 * scale
+    tables = 30 * scale
+    body = [
+        f"제{i}조(조항{i}) " + "이 조의 내용은 학칙에 따른다. " * 20
+        + (f"세부 기준은 <별표{i % tables + 1}>과 같다." if i % 10 == 0 else "")
+        for i in range(1, articles + 1)
+    ]
+    appendix = [f"<별표 {j}> 기준표 {j}\n" + "구분 기준 비고\n" * 10 for j in range(1, tables + 1)]
+    return "\n".join(body + appendix)
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scale = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    from llama_index.core import SimpleDirectoryReader
+
+    documents = SimpleDirectoryReader(input_dir=str(pdfs_dir)).load_data()
+    by_file: Dict[str, List[str]] = {}
+    for doc in documents:
+        by_file.setdefault(doc.metadata.get("file_name", "unknown"), []).append(doc.text)
+
+    by_file[f"synthetic x{scale}"] = [synthetic_regulation(scale)]
+
+    for filename, pages in sorted(by_file.items()):
+        joined = "\n".join(pages)
+        stars = len(re.findall(r"\<별표\s*\d+\>", joined))
+        print(f"\n📄 {filename} ({len(pages)}개 문서, {len(joined):,}자, 별표 {stars}개, 반복 {repeat}회)")
+        for mode, texts in (("page", pages), (f"file x{scale}", [joined * scale])):
+            r = compare(texts, filename, repeat)
+            overhead = r["chunk_index"] - r["chunk"]
+            print(
+                f"  {mode:<8} 별표 연결: legacy {r['legacy']:9.2f} ms → indexed {r['indexed']:8.2f} ms "
+                f"(x{r['legacy'] / max(r['indexed'], 1e-9):6.1f}), 색인 생성 {overhead:+.2f} ms, "
+                f"조문 청킹 {r['chunk']:.2f} ms, 연결 조문이 다른 별표 {r['diffs']}개"
+            )
+
+
+if __name__ == "__main__":
+    main()
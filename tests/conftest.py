@@ -0,0 +1,145 @@
+"""
+pytest 공통 설정
+
+저장소 디렉터리가 곧 app 패키지입니다 (실행: app의 상위 디렉터리에서 python -m app....).
+app.ai.data, app.ai.chatbot 등의 __init__은 import 시점에 Mongo/Pinecone/OpenAI에 연결하므로,
+테스트에서는 __init__을 실행하지 않는 패키지로 등록해 두고 필요한 하위 모듈만 불러옵니다.
+
+외부 서비스에 연결하는 모듈(mongodb_client, vector_uploader)은 load_service_module 픽스처로
+가짜 Mongo/Pinecone 클라이언트를 끼운 채 새로 불러옵니다.
+"""
+import importlib
+import os
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+APP_ROOT = Path(__file__).resolve().parent.parent
+PACKAGES = ("app", "app.ai", "app.ai.chatbot", "app.ai.data", "app.ai.functions", "app.ai.rag")
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+
+def _register_package(name: str) -> None:
+    if name in sys.modules:
+        return
+    path = APP_ROOT.joinpath(*name.split(".")[1:])
+    package = types.ModuleType(name)
+    package.__path__ = [str(path)]
+    package.__file__ = str(path / "__init__.py")
+    sys.modules[name] = package
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, package)
+
+
+for _name in PACKAGES:
+    _register_package(_name)
+
+
+class FakeEncoding:
+    """글자 하나를 토큰 하나로 세는 tiktoken 대용 (인코딩 파일을 내려받지 않음)"""
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    import tiktoken
+
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: FakeEncoding())
+    return FakeEncoding
+
+
+def _field(doc, dotted):
+    for part in dotted.split("."):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+class FakeCollection:
+    """insert_chunks_to_mongo / delete_chunks_for_files가 쓰는 만큼만 흉내 낸 Mongo 컬렉션"""
+
+    def __init__(self):
+        self.docs = []
+        self._next_id = 0
+
+    def _match(self, doc, query):
+        for key, cond in (query or {}).items():
+            value = _field(doc, key)
+            if isinstance(cond, dict) and "$in" in cond:
+                if value not in cond["$in"]:
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    def find(self, query=None, projection=None):
+        return [doc for doc in self.docs if self._match(doc, query)]
+
+    def insert_many(self, docs, ordered=True):
+        ids = []
+        for doc in docs:
+            self._next_id += 1
+            doc["_id"] = f"id{self._next_id:04d}"
+            self.docs.append(doc)
+            ids.append(doc["_id"])
+        return types.SimpleNamespace(inserted_ids=ids)
+
+    def delete_many(self, query):
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if not self._match(doc, query)]
+        return types.SimpleNamespace(deleted_count=before - len(self.docs))
+
+
+class FakeMongoClient:
+    """client[db][collection] 접근과 ping만 지원합니다."""
+
+    def __init__(self, *args, **kwargs):
+        self._dbs = {}
+        self.admin = types.SimpleNamespace(command=lambda *a, **k: {"ok": 1})
+
+    def __getitem__(self, name):
+        return self._dbs.setdefault(name, _FakeDatabase())
+
+
+class _FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class _FakePinecone:
+    def __init__(self, **kwargs):
+        pass
+
+    def list_indexes(self):
+        return types.SimpleNamespace(names=lambda: ["halla-academic-index"])
+
+    def Index(self, name):
+        return types.SimpleNamespace(name=name)
+
+
+@pytest.fixture
+def load_service_module(monkeypatch, fake_tiktoken):
+    """가짜 Mongo/Pinecone 클라이언트로 모듈을 새로 불러오는 함수를 돌려줍니다."""
+    import pymongo
+
+    monkeypatch.setenv("MONGODB_URI", "mongodb://localhost/test")
+    monkeypatch.setattr(pymongo, "MongoClient", FakeMongoClient)
+    pinecone = types.ModuleType("pinecone")
+    pinecone.Pinecone = _FakePinecone
+    pinecone.ServerlessSpec = lambda **kwargs: kwargs
+    monkeypatch.setitem(sys.modules, "pinecone", pinecone)
+
+    def load(name):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+        return importlib.import_module(name)
+
+    return load
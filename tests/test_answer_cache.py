@@ -0,0 +1,78 @@
+import asyncio
+import types
+
+import pytest
+
+from app.ai.chatbot.answer_cache import AnswerCache
+
+
+def rag(chunk_ids=("c1", "c2"), content_hash="h1", is_regulation=True, text="제20조(졸업) ..."):
+    return types.SimpleNamespace(
+        chunk_ids=list(chunk_ids),
+        content_hash=content_hash,
+        is_regulation=is_regulation,
+        merged_documents_text=text,
+    )
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(enabled=True, maxsize=16, ttl=60, semantic_threshold=0)
+
+
+def test_key_ignores_spacing_and_chunk_order(cache):
+    key = cache.key_for("졸업 학점이 몇 학점이야?", "KOR", rag(("c1", "c2")))
+
+    assert cache.key_for("  졸업 학점이   몇 학점이야? ", "KOR", rag(("c2", "c1"))) == key
+    assert cache.key_for("졸업 학점이 몇 학점이야?", "ENG", rag()) != key
+    assert cache.key_for("졸업 학점이 몇 학점이야?", "KOR", rag(("c1", "c3"))) != key
+    assert cache.key_for("졸업 학점이 몇 학점이야?", "KOR", rag(content_hash="h2")) != key
+
+
+def test_exact_hit_after_put(cache):
+    run(cache.aput("졸업 학점?", "KOR", rag(), "130학점입니다.", {"answer_source": "llm"}))
+
+    cached, hit = run(cache.aget("졸업  학점?", "KOR", rag()))
+
+    assert hit == "exact"
+    assert cached.text == "130학점입니다."
+    assert cached.metadata == {"answer_source": "llm"}
+
+
+def test_reingested_content_invalidates_answer(cache):
+    run(cache.aput("졸업 학점?", "KOR", rag(content_hash="h1"), "130학점입니다.", {}))
+
+    assert run(cache.aget("졸업 학점?", "KOR", rag(content_hash="h2"))) == (None, None)
+    assert run(cache.aget("졸업 학점?", "ENG", rag(content_hash="h1"))) == (None, None)
+
+
+def test_disabled_cache_stores_nothing():
+    cache = AnswerCache(enabled=False, semantic_threshold=0)
+    run(cache.aput("졸업 학점?", "KOR", rag(), "130학점입니다.", {}))
+
+    assert run(cache.aget("졸업 학점?", "KOR", rag())) == (None, None)
+
+
+def test_eligible_only_for_regulation_answers_without_tool_results():
+    assert AnswerCache.eligible(rag())
+    assert not AnswerCache.eligible(None)
+    assert not AnswerCache.eligible(rag(is_regulation=False))
+    assert not AnswerCache.eligible(rag(content_hash=None))
+    assert not AnswerCache.eligible(rag(text=""))
+    assert not AnswerCache.eligible(rag(), [object()])
+
+
+def test_semantic_hit_within_same_chunk_set():
+    vectors = {"졸업 학점?": [1.0, 0.0], "졸업하려면 몇 학점?": [0.99, 0.1], "휴학 기간?": [0.0, 1.0]}
+    cache = AnswerCache(enabled=True, semantic_threshold=0.95, embed_fn=lambda text: vectors[text])
+    run(cache.aput("졸업 학점?", "KOR", rag(), "130학점입니다.", {}))
+
+    cached, hit = run(cache.aget("졸업하려면 몇 학점?", "KOR", rag()))
+
+    assert hit == "semantic" and cached.text == "130학점입니다."
+    assert run(cache.aget("휴학 기간?", "KOR", rag())) == (None, None)
+    assert run(cache.aget("졸업하려면 몇 학점?", "KOR", rag(content_hash="h2"))) == (None, None)
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from app.ai.functions.cafeteria import (
+    MEALS,
+    CafeteriaMenuCache,
+    WeeklyMenu,
+    lxml_html,
+    parse_weekly_menu,
+    parse_weekly_menu_legacy,
+)
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "cafeteria_week.html"
+BACKENDS = ["bs4"] + (["lxml"] if lxml_html is not None else [])
+
+WEEK = WeeklyMenu(week_start=date(2025, 8, 25), week_end=date(2025, 8, 31), menus={})
+LAST_WEEK = WeeklyMenu(week_start=date(2025, 8, 18), week_end=date(2025, 8, 24), menus={})
+
+
+def slow_cache(delay, snapshot=None):
+    cache = CafeteriaMenuCache(wait_timeout=0.05, fetch_timeout=1.0)
+    cache.snapshot = snapshot
+    calls = []
+
+    async def arefresh():
+        calls.append(delay)
+        await asyncio.sleep(delay)
+        cache.snapshot = WEEK
+        return WEEK
+
+    cache.arefresh = arefresh
+    return cache, calls
+
+
+def test_aget_without_snapshot_waits_for_the_fetch():
+    cache, calls = slow_cache(0.2)
+
+    snapshot, state = asyncio.run(cache.aget(date(2025, 8, 27)))
+
+    assert (snapshot, state) == (WEEK, "refreshed")
+    assert calls == [0.2]
+
+
+def test_aget_with_other_week_snapshot_returns_it_after_short_wait():
+    cache, _ = slow_cache(0.2, snapshot=LAST_WEEK)
+
+    async def main():
+        first = await cache.aget(date(2025, 8, 27))
+        await cache._refresh_task  # 갱신은 뒤에서 계속 진행
+        return first
+
+    assert asyncio.run(main()) == (LAST_WEEK, "timeout")
+    assert cache.snapshot is WEEK
+
+
+def test_aget_without_snapshot_gives_up_after_fetch_timeout():
+    cache, _ = slow_cache(5.0)
+    cache.fetch_timeout = 0.1
+
+    snapshot, state = asyncio.run(cache.aget(date(2025, 8, 27)))
+
+    assert (snapshot, state) == (None, "timeout")
+
+
+def _compact(text):
+    # 격자 파서는 <br> 사이에 공백을 넣고 기존 파서는 붙이므로 공백을 무시하고 비교
+    return "".join((text or "").split())
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_fixture_reads_full_week_grid(backend):
+    snapshot = parse_weekly_menu(FIXTURE.read_text(encoding="utf-8"), backend=backend)
+
+    assert (snapshot.week_start, snapshot.week_end) == (date(2025, 8, 25), date(2025, 8, 31))
+    assert len(snapshot.menus) == 7
+    assert all(set(meals) == set(MEALS) for meals in snapshot.menus.values())
+    assert snapshot.lookup(date(2025, 8, 25))["중식"] == "김치찌개 쌀밥 계란말이 콩나물무침"
+    assert snapshot.lookup(date(2025, 8, 29))["석식"] == "운영 없음"
+    # 일요일은 월요일 칸이 아니라 일요일 열을 읽음 (기존 파서는 월요일 메뉴를 돌려줬음)
+    assert snapshot.lookup(date(2025, 8, 31)) == {"조식": "", "중식": "휴무", "석식": ""}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_fixture_matches_legacy_on_weekdays(backend):
+    html = FIXTURE.read_text(encoding="utf-8")
+    grid = parse_weekly_menu(html, backend=backend)
+    legacy = parse_weekly_menu_legacy(html)
+
+    for day in ("2025-08-25", "2025-08-26", "2025-08-27", "2025-08-28", "2025-08-29", "2025-08-30"):
+        assert {m: _compact(v) for m, v in grid.menus[day].items()} == {
+            m: _compact(v) for m, v in legacy.menus[day].items()
+        }
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import time
+
+from app.ai.concurrency import run_blocking
+
+
+def test_run_blocking_returns_result_with_kwargs():
+    def add(a, b=0):
+        return a + b
+
+    assert asyncio.run(run_blocking(add, 1, b=2)) == 3
+
+
+def test_run_blocking_keeps_event_loop_free():
+    def slow():
+        time.sleep(0.2)
+        return threading.current_thread().name
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        names = await asyncio.gather(run_blocking(slow), run_blocking(slow))
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        return names, elapsed, ticks
+
+    names, elapsed, ticks = asyncio.run(main())
+    assert all(name.startswith("blocking-io") for name in names)
+    assert elapsed < 0.35  # 두 호출이 겹쳐서 실행됨
+    assert ticks >= 5  # 기다리는 동안 이벤트 루프가 다른 작업을 처리함
@@ -0,0 +1,73 @@
+import pytest
+
+from app.ai.rag.condenser import CondenseRouter, ExtractiveCondenser, split_units
+
+REGULATION = "\n".join([
+    "제10조(수강신청) 학생은 매 학기 정해진 기간에 수강신청을 하여야 한다.",
+    "1. 수강신청 학점은 학기당 18학점을 넘을 수 없다.",
+    "2. 직전 학기 평점이 4.0 이상이면 21학점까지 신청할 수 있다.",
+    "제20조(졸업) 졸업에 필요한 최저 이수학점은 130학점으로 한다.",
+    "1. 전공 학점은 60학점 이상이어야 한다.",
+    "<별표 1> 등록금 반환 기준",
+    "개강 전 전액 반환",
+])
+
+
+def test_split_units_uses_article_table_and_item_boundaries():
+    lines = REGULATION.splitlines()
+    units = split_units(lines)
+
+    assert [(u.start, u.end) for u in units] == [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 7)]
+    assert units[1].heading == 0  # 번호 항목은 소속 조문 제목 줄을 기억
+    assert units[4].heading == 3
+    assert units[5].heading is None
+
+
+def test_condense_picks_matching_unit_with_its_article_heading():
+    condenser = ExtractiveCondenser(top_k=1, context_lines=0)
+
+    condensed = condenser.condense("전공 학점은 몇 학점이야?", REGULATION)
+
+    assert condensed.startswith("<반영>\n") and condensed.endswith("\n</반영>")
+    assert "전공 학점은 60학점 이상" in condensed
+    assert "제20조(졸업)" in condensed
+    assert "등록금" not in condensed
+
+
+def test_condense_keeps_document_order_and_merges_ranges():
+    condenser = ExtractiveCondenser(top_k=3, context_lines=1)
+
+    condensed = condenser.condense("수강신청 학점 등록금 반환", REGULATION)
+
+    assert condensed.index("제10조") < condensed.index("<별표 1>")
+    assert condensed.count("<반영>") == condensed.count("</반영>")
+
+
+def test_condense_without_overlap_falls_back_to_head():
+    condenser = ExtractiveCondenser(max_chars=12)
+
+    assert condenser.condense("xyz", REGULATION) == f"<반영>\n{REGULATION[:12].strip()}\n</반영>"
+
+
+@pytest.mark.parametrize(
+    "mode, expected",
+    [(None, "llm"), ("llm", "llm"), ("quality", "llm"), ("LOCAL", "local"), ("auto", "auto"), ("bogus", "llm")],
+)
+def test_router_mode(monkeypatch, mode, expected):
+    monkeypatch.delenv("RAG_CONDENSE_MODE", raising=False)
+    assert CondenseRouter(mode).mode == expected
+
+
+def test_router_mode_from_env(monkeypatch):
+    monkeypatch.setenv("RAG_CONDENSE_MODE", "local")
+    assert CondenseRouter().mode == "local"
+
+
+def test_router_choose():
+    short, long = "가" * 10, "가" * 11
+
+    assert CondenseRouter("llm", local_max_chars=10).choose(short) == "llm"
+    assert CondenseRouter("local", local_max_chars=10).choose(long) == "local"
+    auto = CondenseRouter("auto", local_max_chars=10)
+    assert auto.choose(short) == "local"
+    assert auto.choose(long) == "llm"
@@ -0,0 +1,67 @@
+import pytest
+
+from app.ai.chatbot.context_window import MESSAGE_OVERHEAD_TOKENS
+
+
+@pytest.fixture
+def window(fake_tiktoken):
+    from app.ai.chatbot.context_window import ContextWindowManager
+
+    # FakeEncoding: 글자 1개 = 토큰 1개, 메시지마다 MESSAGE_OVERHEAD_TOKENS(4) 추가
+    return ContextWindowManager(max_token_size=100, available_token_rate=1.0)
+
+
+def msg(role, chars):
+    return {"role": role, "content": role[0] * chars}
+
+
+def test_count_adds_message_overhead_and_caches(window):
+    message = msg("user", 10)
+
+    assert window.count_message(message) == 10 + MESSAGE_OVERHEAD_TOKENS
+    assert window.count_message(dict(message)) == 14
+    assert window.stats()["hits"] == 1
+
+
+def test_fit_returns_copy_when_under_budget(window):
+    messages = [msg("system", 10), msg("user", 10)]
+    fitted = window.fit(messages)
+
+    assert fitted == messages and fitted is not messages
+
+
+def test_fit_drops_oldest_turns_and_keeps_pinned_head_and_tail(window):
+    messages = [
+        msg("system", 16),     # 20 토큰, system 프롬프트
+        msg("system", 6),      # 10 토큰, 대화 요약
+        msg("user", 16),       # 20  ┐ 가장 오래된 턴 (assistant까지 함께 제거)
+        msg("assistant", 16),  # 20  ┘
+        msg("user", 16),       # 20
+        msg("assistant", 6),   # 10
+        msg("system", 16),     # 20  ┐ pinned_tail=2: 이번 요청 지침 + 질문
+        msg("user", 6),        # 10  ┘
+    ]
+
+    fitted = window.fit(messages, pinned_tail=2)
+
+    assert fitted == messages[:2] + messages[4:]
+    assert window.count(fitted) == 90
+    assert len(messages) == 8  # 원본은 그대로
+
+
+def test_fit_stops_at_pinned_messages_even_over_budget(window):
+    messages = [msg("system", 60), msg("user", 30), msg("assistant", 30), msg("user", 60)]
+
+    fitted = window.fit(messages, pinned_tail=1)
+
+    assert fitted == [messages[0], messages[3]]
+    assert window.count(fitted) > window.budget
+
+
+def test_trim_edits_context_in_place(window):
+    context = [msg("system", 16)] + [msg(role, 16) for role in ("user", "assistant") * 3]
+
+    removed = window.trim(context)
+
+    assert removed == 2
+    assert [m["role"] for m in context] == ["system", "user", "assistant", "user", "assistant"]
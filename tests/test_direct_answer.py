@@ -0,0 +1,114 @@
+import asyncio
+import types
+
+import pytest
+
+from app.ai.chatbot.direct_answer import CAFETERIA_TOOL, DirectAnswerer, render_menu_answer
+from app.ai.chatbot.metadata import FunctionCallMetadata
+from app.ai.functions.router import ToolRouter
+
+MENU = "\n".join([
+    "한라대 학생식당 식단 (2025-03-04 화)",
+    "[조식] 토스트, 우유",
+    "[중식] 김치찌개, 제육볶음",
+    "[석식]",
+    "추가 사항: 원문: https://www.halla.ac.kr/menu",
+])
+
+ROUTE = {"tier": "rule", "confidence": 0.95, "tools": [CAFETERIA_TOOL], "pure_lookup": True}
+
+
+def menu_result(output=MENU, name=CAFETERIA_TOOL, status="ok"):
+    return FunctionCallMetadata(name=name, arguments={}, output=output, call_id="rule_menu", status=status)
+
+
+@pytest.fixture
+def answerer():
+    return DirectAnswerer(enabled=True, min_confidence=0.9, async_openai_client=None)
+
+
+def test_pick_returns_menu_result(answerer):
+    meta = menu_result()
+
+    assert answerer.pick(ROUTE, [meta], condensed_rag=None) is meta
+    assert answerer.pick({**ROUTE, "tier": "model"}, [meta], condensed_rag="  ") is meta
+
+
+@pytest.mark.parametrize(
+    "route, results, condensed_rag",
+    [
+        ({**ROUTE, "tier": "llm"}, [menu_result()], None),
+        ({**ROUTE, "confidence": 0.6}, [menu_result()], None),
+        ({**ROUTE, "pure_lookup": False}, [menu_result()], None),
+        ({**ROUTE, "tools": [CAFETERIA_TOOL, "search_internet"]}, [menu_result()], None),
+        (ROUTE, [menu_result()], "<반영>규정</반영>"),
+        (ROUTE, [menu_result(), menu_result(name="search_internet")], None),
+        (ROUTE, [menu_result(status="timeout")], None),
+        (ROUTE, [menu_result(output="❌ 식단 정보를 가져오지 못했습니다.")], None),
+        (ROUTE, [], None),
+    ],
+)
+def test_pick_declines(answerer, route, results, condensed_rag):
+    assert answerer.pick(route, results, condensed_rag) is None
+
+
+def route_for(message):
+    router = ToolRouter(analyze_fn=None, tools=[], model_path="", log_path="")
+    return router.rule_route(message).to_dict()
+
+
+@pytest.mark.parametrize("message", ["오늘 학식 뭐야", "내일 점심 메뉴 알려줘"])
+def test_pick_answers_menu_questions_routed_by_rule(answerer, message):
+    assert answerer.pick(route_for(message), [menu_result()], None) is not None
+
+
+@pytest.mark.parametrize("message", ["학생식당 운영시간 알려줘", "학식 가격 얼마야?", "조식 몇 시부터야?"])
+def test_pick_leaves_non_menu_cafeteria_questions_to_llm(answerer, message):
+    route = route_for(message)
+
+    assert route["tools"] == [CAFETERIA_TOOL]
+    assert answerer.pick(route, [menu_result()], None) is None
+    # 분류기가 높은 확신도로 판정해도 메뉴를 묻지 않으면 빠른 경로를 쓰지 않음
+    assert answerer.pick({**route, "tier": "model", "confidence": 0.99}, [menu_result()], None) is None
+
+
+def test_pick_disabled():
+    answerer = DirectAnswerer(enabled=False, min_confidence=0.9, async_openai_client=None)
+
+    assert answerer.pick(ROUTE, [menu_result()], None) is None
+
+
+def test_render_menu_answer():
+    rendered = render_menu_answer(MENU)
+
+    assert rendered.splitlines() == [
+        "🍽️ 한라대 학생식당 식단 (2025-03-04 화)",
+        "",
+        "- **조식**: 토스트, 우유",
+        "- **중식**: 김치찌개, 제육볶음",
+        "- **석식**: 정보 없음",
+        "",
+        "원문: https://www.halla.ac.kr/menu",
+    ]
+    assert render_menu_answer("식단 정보 없음") == "식단 정보 없음"
+
+
+def test_answer_translates_once_per_language():
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return types.SimpleNamespace(output_text="Halla cafeteria menu")
+
+    client = types.SimpleNamespace(responses=types.SimpleNamespace(create=create))
+    answerer = DirectAnswerer(enabled=True, async_openai_client=client, model_name="test-model")
+
+    async def main():
+        return [await answerer.answer(MENU, lang) for lang in ("KOR", "ENG", "ENG")]
+
+    korean, first, second = asyncio.run(main())
+
+    assert korean == (render_menu_answer(MENU), "skip")
+    assert first == ("Halla cafeteria menu", "miss")
+    assert second == ("Halla cafeteria menu", "hit")
+    assert len(calls) == 1
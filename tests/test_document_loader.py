@@ -0,0 +1,113 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.ai.data import document_loader
+from app.ai.data.document_loader import changed_files, removed_files
+
+
+def touch(path: Path, text: str, mtime: float = 1_700_000_000) -> Path:
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_changed_files_skips_files_with_same_signature(tmp_path):
+    same = touch(tmp_path / "학칙.pdf", "제1조(목적) 본문")
+    edited = touch(tmp_path / "장학.hwp", "제1조(목적) 장학")
+    new = touch(tmp_path / "신설.PDF", "제1조(목적) 신설")
+    touch(tmp_path / "메모.txt", "지원하지 않는 확장자")
+    manifest = {
+        "학칙.pdf": {"mtime": same.stat().st_mtime, "size": same.stat().st_size},
+        "장학.hwp": {"mtime": edited.stat().st_mtime - 10, "size": edited.stat().st_size},
+    }
+
+    todo, unchanged = changed_files(tmp_path, manifest)
+
+    assert sorted(todo) == sorted([edited, new])
+    assert unchanged == [same]
+    assert sorted(changed_files(tmp_path, manifest, force=True)[0]) == sorted([same, edited, new])
+
+
+def test_removed_files_lists_manifest_entries_missing_on_disk(tmp_path):
+    touch(tmp_path / "학칙.pdf", "본문")
+
+    assert removed_files(tmp_path, {"학칙.pdf": {}, "폐지.pdf": {}, "옛규정.hwp": {}}) == ["옛규정.hwp", "폐지.pdf"]
+
+
+@pytest.fixture
+def collection(load_service_module, monkeypatch):
+    mongo = load_service_module("app.ai.data.mongodb_client")
+
+    def parse_file(path, verbose=False):
+        return Path(path).name, document_loader.chunk_document(Path(path).read_text(encoding="utf-8"), Path(path).name)
+
+    monkeypatch.setattr(document_loader, "parse_file", parse_file)
+    return mongo.client[mongo.DB_NAME][mongo.COLLECTION_NAME]
+
+
+def sources(collection):
+    return sorted({doc["metadata"]["source_file"] for doc in collection.docs})
+
+
+def test_ingest_skips_unchanged_and_purges_emptied_or_removed_files(tmp_path, collection):
+    docs, manifest_path = tmp_path / "pdfs", tmp_path / "manifest.json"
+    docs.mkdir()
+    touch(docs / "학칙.pdf", "제1조(목적) 학칙의 목적")
+    touch(docs / "장학.pdf", "제1조(목적) 장학의 목적")
+    touch(docs / "폐지.pdf", "제1조(목적) 폐지될 규정")
+
+    first = document_loader.ingest_documents(docs, workers=1, manifest_path=manifest_path)
+    assert first["files"] == 3 and sources(collection) == ["장학.pdf", "폐지.pdf", "학칙.pdf"]
+
+    touch(docs / "장학.pdf", "조문 없는 안내문", mtime=1_700_000_100)
+    (docs / "폐지.pdf").unlink()
+    second = document_loader.ingest_documents(docs, workers=1, manifest_path=manifest_path)
+
+    assert second == {"files": 1, "chunks": 0, "skipped": 1, "failed": 0, "removed": 1}
+    assert sources(collection) == ["학칙.pdf"]
+    assert sorted(document_loader.load_manifest(manifest_path)) == ["장학.pdf", "학칙.pdf"]
+
+
+ARTICLES = "\n".join([
+    "제1조(목적) 이 규정은 등록금 반환 기준을 정한다.",
+    "제2조(반환) 반환 금액은 <별표 1>과 같다.",
+    "제3조(예외) 휴학생의 반환 금액도 <별표 1>에 따르며 세부 서식은 <별표2>와 같다.",
+])
+APPENDIX = "\n".join([
+    "<별표 1> 등록금 반환 기준",
+    "개강 전 전액 반환",
+    "<별표 2> 반환 신청서 서식",
+    "<별표 3> 폐지된 서식",
+])
+
+
+def parents(star_chunks):
+    return {c["metadata"]["table_id"]: c["metadata"]["parent_law_article"] for c in star_chunks}
+
+
+def test_extract_star_tables_links_last_referencing_article():
+    reference_index = {}
+    law_blocks = document_loader.extract_chunks_finditer(ARTICLES, "반환.pdf", reference_index=reference_index)
+
+    star_chunks = document_loader.extract_star_tables(APPENDIX, "반환.pdf", law_blocks, reference_index=reference_index)
+
+    assert reference_index == {"<별표 1>": ["제2조", "제3조"], "<별표2>": ["제3조"]}
+    # 본문 표기 그대로 찾으므로 '<별표2>'는 별표 제목 '<별표 2>'와 연결되지 않음 (기존 find 방식과 같음)
+    assert parents(star_chunks) == {"별표1": "제3조", "별표2": "unspecified", "별표3": "unspecified"}
+    assert star_chunks[0]["text"] == "<별표 1> 등록금 반환 기준\n개강 전 전액 반환"
+    assert {c["metadata"]["category"] for c in star_chunks} == {"appendix_tables"}
+
+
+def test_extract_star_tables_without_reference_index_matches_indexed_result():
+    law_blocks = document_loader.extract_chunks_finditer(ARTICLES, "반환.pdf")
+    other_file = document_loader.extract_chunks_finditer("제9조(기타) <별표 3>을 따른다.", "다른규정.pdf")
+
+    without_index = document_loader.extract_star_tables(APPENDIX, "반환.pdf", law_blocks + other_file)
+    reference_index = {}
+    document_loader.extract_chunks_finditer(ARTICLES, "반환.pdf", reference_index=reference_index)
+    with_index = document_loader.extract_star_tables(APPENDIX, "반환.pdf", law_blocks, reference_index=reference_index)
+
+    assert without_index == with_index
+    assert parents(without_index)["별표3"] == "unspecified"  # 다른 파일의 조문은 연결하지 않음
@@ -0,0 +1,59 @@
+import pytest
+
+from app.ai.data.embedding_cache import EmbeddingCache
+
+
+class FakeEmbed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return [0.5, float(len(self.calls))]
+
+
+def test_memory_hit_skips_embed_fn():
+    embed = FakeEmbed()
+    cache = EmbeddingCache(embed, model_name="text-embedding-3-small")
+
+    first = cache("휴학 신청 기간")
+    second = cache("  휴학 신청   기간 ")
+
+    assert first == second == [0.5, 1.0]
+    assert embed.calls == ["휴학 신청 기간"]
+    assert cache.stats() == {"memory_hits": 1, "disk_hits": 0, "misses": 1, "memory_size": 1}
+
+
+def test_sqlite_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(FakeEmbed(), model_name="text-embedding-3-small", disk_path=path)("휴학 신청 기간")
+    embed = FakeEmbed()
+    restarted = EmbeddingCache(embed, model_name="text-embedding-3-small", disk_path=path)
+
+    assert restarted("휴학 신청 기간") == [0.5, 1.0]
+    assert restarted("휴학 신청 기간") == [0.5, 1.0]
+    assert embed.calls == []
+    assert (restarted.disk_hits, restarted.memory_hits, restarted.misses) == (1, 1, 0)
+
+
+def test_model_name_is_part_of_the_key(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    small = EmbeddingCache(FakeEmbed(), model_name="text-embedding-3-small", disk_path=path)
+    embed = FakeEmbed()
+    large = EmbeddingCache(embed, model_name="text-embedding-3-large", disk_path=path)
+
+    small("휴학 신청 기간")
+    large("휴학 신청 기간")
+
+    assert small.key_for("휴학 신청 기간") != large.key_for("휴학 신청 기간")
+    assert embed.calls == ["휴학 신청 기간"]
+    assert large.stats()["misses"] == 1
+
+
+def test_vectors_are_stored_as_float32():
+    cache = EmbeddingCache(lambda text: [0.1, 0.2], model_name="m")
+
+    vec = cache.get_vector("질문")
+
+    assert vec.typecode == "f"
+    assert cache("질문") == pytest.approx([0.1, 0.2])
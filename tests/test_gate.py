@@ -0,0 +1,201 @@
+import asyncio
+import importlib
+import json
+import sys
+import types
+
+import pytest
+
+from app.ai.rag import gate
+from app.ai.rag.gate import GateDecision, RegulationGate, rule_decide
+
+
+class FakeResponses:
+    def __init__(self, is_regulation=True, error=None):
+        self.is_regulation = is_regulation
+        self.error = error
+        self.calls = []
+
+    def create(self, **request):
+        self.calls.append(request["input"][-1]["content"])
+        if self.error is not None:
+            raise self.error
+        payload = {"is_regulation": self.is_regulation, "reason": "llm 판정"}
+        return types.SimpleNamespace(output_text=json.dumps(payload))
+
+
+class FakeAsyncResponses(FakeResponses):
+    async def create(self, **request):
+        return FakeResponses.create(self, **request)
+
+
+def make_gate(responses=None, **kwargs):
+    responses = responses or FakeResponses()
+    kwargs.setdefault("semantic_threshold", None)
+    return RegulationGate(
+        openai_client=types.SimpleNamespace(responses=responses),
+        async_openai_client=types.SimpleNamespace(responses=FakeAsyncResponses()),
+        model_name="test-model",
+        **kwargs,
+    ), responses
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("제12조 내용 알려줘", True),
+        ("제 3 조의2는?", True),
+        ("3-2-29 조항 알려줘", True),
+        ("별표 1 내용", True),
+        ("<별표2> 보여줘", True),
+        ("학칙 개정 내용", True),
+        ("시행세칙 어디서 봐?", True),
+        ("내규 찾아줘", True),
+        ("휴학 신청은 학사 일정 언제야?", True),
+        ("오늘 학식 뭐야?", False),
+        ("내일 석식 메뉴", False),
+        ("제주 날씨 어때?", False),
+        ("전화번호 010-1234-5678 누구야?", None),
+        ("휴학 신청 어떻게 해?", None),
+    ],
+)
+def test_rule_decide(question, expected):
+    decision = rule_decide(question)
+
+    if expected is None:
+        assert decision is None
+    else:
+        assert (decision.is_regulation, decision.tier) == (expected, "rule")
+
+
+def test_regulation_keyword_wins_over_non_regulation_keyword():
+    assert rule_decide("학식 장학생 할인 규정").is_regulation is True
+
+
+def test_rule_decision_skips_llm():
+    reg_gate, responses = make_gate()
+
+    assert reg_gate.decide("제12조 내용").tier == "rule"
+    assert responses.calls == []
+
+
+def test_only_llm_decisions_are_cached():
+    reg_gate, responses = make_gate()
+
+    first = reg_gate.decide("휴학 신청 어떻게 해?")
+    second = reg_gate.decide("  휴학 신청   어떻게 해?")
+
+    assert (first.tier, second.tier) == ("llm", "cache")
+    assert second.is_regulation is True
+    assert len(responses.calls) == 1
+
+
+def test_fallback_decisions_are_not_cached():
+    reg_gate, responses = make_gate(FakeResponses(error=RuntimeError("timeout")))
+
+    first = reg_gate.decide("휴학 신청 어떻게 해?")
+    second = reg_gate.decide("휴학 신청 어떻게 해?")
+
+    assert (first.tier, second.tier) == ("fallback", "fallback")
+    assert first.is_regulation is False
+    assert len(responses.calls) == 2
+
+
+def test_adecide_caches_llm_decision():
+    reg_gate, _ = make_gate()
+    async_responses = reg_gate._async_client.responses
+
+    async def main():
+        return [await reg_gate.adecide("휴학 신청 어떻게 해?") for _ in range(2)]
+
+    assert [d.tier for d in asyncio.run(main())] == ["llm", "cache"]
+    assert len(async_responses.calls) == 1
+
+
+def fake_embed(calls):
+    vectors = {"휴학 신청 어떻게 해?": [1.0, 0.0], "휴학 신청 방법 알려줘": [0.99, 0.1], "기숙사 빨래방 위치": [0.0, 1.0]}
+
+    def embed(text):
+        calls.append(text)
+        return vectors[text]
+
+    return embed
+
+
+def test_semantic_tier_is_off_without_threshold():
+    calls = []
+    reg_gate, responses = make_gate(embed_fn=fake_embed(calls))
+
+    reg_gate.decide("휴학 신청 어떻게 해?")
+    decision = reg_gate.decide("휴학 신청 방법 알려줘")
+
+    assert decision.tier == "llm"
+    assert calls == []
+    assert len(responses.calls) == 2
+
+
+def test_semantic_tier_reuses_similar_llm_decision():
+    calls = []
+    reg_gate, responses = make_gate(semantic_threshold=0.9, embed_fn=fake_embed(calls))
+
+    reg_gate.decide("휴학 신청 어떻게 해?")
+    similar = reg_gate.decide("휴학 신청 방법 알려줘")
+    other = reg_gate.decide("기숙사 빨래방 위치")
+
+    assert (similar.tier, other.tier) == ("semantic", "llm")
+    assert responses.calls == ["휴학 신청 어떻게 해?", "기숙사 빨래방 위치"]
+    # 유사 판정은 완전 일치 캐시에도 저장되어 다음에는 임베딩 없이 응답
+    assert reg_gate.decide("휴학 신청 방법 알려줘").tier == "cache"
+    assert calls.count("휴학 신청 방법 알려줘") == 1
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("0", None), ("0.92", 0.92)])
+def test_semantic_threshold_env(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("GATE_SEMANTIC_THRESHOLD", raising=False)
+    else:
+        monkeypatch.setenv("GATE_SEMANTIC_THRESHOLD", value)
+    # 다시 불러온 모듈이 다른 테스트에 남지 않도록 패키지 속성도 되돌림
+    monkeypatch.setattr(sys.modules["app.ai.rag"], "gate", gate)
+    monkeypatch.delitem(sys.modules, "app.ai.rag.gate")
+
+    reloaded = importlib.import_module("app.ai.rag.gate")
+
+    assert reloaded.GATE_SEMANTIC_THRESHOLD == expected
+
+
+class FixedGate:
+    def __init__(self, decision):
+        self.decision = decision
+
+    def decide(self, question):
+        return self.decision
+
+    async def adecide(self, question):
+        return self.decision
+
+
+@pytest.fixture
+def service_module(monkeypatch):
+    # app.ai.data의 __init__은 Mongo/Pinecone에 연결하므로 필요한 기본값만 채워 둠
+    data_package = sys.modules["app.ai.data"]
+    monkeypatch.setattr(data_package, "index", None, raising=False)
+    monkeypatch.setattr(data_package, "get_cached_embedding", lambda text: [0.0], raising=False)
+    monkeypatch.setattr(data_package, "collection", None, raising=False)
+    monkeypatch.setattr(data_package, "MONGO_AVAILABLE", False, raising=False)
+    for name in ("app.ai.rag.service", "app.ai.rag.retriever", "app.ai.rag.repository"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    from app.ai.rag import service
+
+    return service
+
+
+@pytest.mark.parametrize("tier", ["rule", "cache", "semantic", "llm", "fallback"])
+def test_rag_result_reports_gate_tier(service_module, tier):
+    rag = service_module.RagService(
+        retriever=object(), repository=object(), context_builder=object(),
+        gate=FixedGate(GateDecision(False, "판정", tier=tier)),
+    )
+
+    assert rag.retrieve_context("질문").gate_tier == tier
+    assert asyncio.run(rag.aretrieve_context("질문")).gate_tier == tier
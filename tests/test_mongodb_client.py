@@ -0,0 +1,60 @@
+import pytest
+
+
+@pytest.fixture
+def mongo(load_service_module):
+    return load_service_module("app.ai.data.mongodb_client")
+
+
+@pytest.fixture
+def collection(mongo):
+    return mongo.client[mongo.DB_NAME][mongo.COLLECTION_NAME]
+
+
+def chunk(law_id, text, source_file="학칙.pdf"):
+    return {"text": text, "metadata": {"law_article_id": law_id, "source_file": source_file}}
+
+
+def test_content_hash_ignores_upload_state(mongo):
+    plain = chunk("제1조", "목적")
+    uploaded = chunk("제1조", "목적")
+    uploaded["metadata"].update(content_hash="old", vector_hash="v", vector_parts=1)
+
+    assert mongo.chunk_content_hash(plain) == mongo.chunk_content_hash(uploaded)
+    assert mongo.chunk_content_hash(chunk("제1조", "바뀐 목적")) != mongo.chunk_content_hash(plain)
+
+
+def test_reingest_keeps_unchanged_chunks(mongo, collection):
+    assert mongo.insert_chunks_to_mongo([chunk("제1조", "목적"), chunk("제2조", "정의"), chunk("제3조", "적용")])
+    ids = {doc["metadata"]["law_article_id"]: doc["_id"] for doc in collection.docs}
+    # vector_uploader가 기록한 업로드 상태
+    for doc in collection.docs:
+        doc["metadata"]["vector_hash"] = "uploaded"
+
+    assert mongo.insert_chunks_to_mongo([chunk("제1조", "목적"), chunk("제2조", "바뀐 정의"), chunk("제4조", "신설")])
+
+    by_law = {doc["metadata"]["law_article_id"]: doc for doc in collection.docs}
+    assert sorted(by_law) == ["제1조", "제2조", "제4조"]
+    assert by_law["제1조"]["_id"] == ids["제1조"]
+    assert by_law["제1조"]["metadata"]["vector_hash"] == "uploaded"
+    assert by_law["제2조"]["_id"] != ids["제2조"]
+    assert by_law["제2조"]["text"] == "바뀐 정의"
+    assert "vector_hash" not in by_law["제4조"]["metadata"]
+
+
+def test_reingest_only_touches_its_own_file(mongo, collection):
+    mongo.insert_chunks_to_mongo([chunk("제1조", "목적", "학칙.pdf"), chunk("제1조", "목적", "장학.pdf")])
+
+    mongo.insert_chunks_to_mongo([chunk("제9조", "부칙", "학칙.pdf")])
+
+    assert sorted((d["metadata"]["source_file"], d["metadata"]["law_article_id"]) for d in collection.docs) == [
+        ("장학.pdf", "제1조"),
+        ("학칙.pdf", "제9조"),
+    ]
+
+
+def test_duplicate_chunks_are_kept_once_each(mongo, collection):
+    mongo.insert_chunks_to_mongo([chunk("제1조", "목적"), chunk("제1조", "목적")])
+    mongo.insert_chunks_to_mongo([chunk("제1조", "목적"), chunk("제1조", "목적")])
+
+    assert len(collection.docs) == 2
@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+from bson import ObjectId
+
+IDS = [str(ObjectId()) for _ in range(4)]
+
+
+@pytest.fixture
+def repository_module(monkeypatch):
+    # app.ai.data의 __init__은 Mongo/Pinecone에 연결하므로 기본값 두 개만 채워 둠
+    data_package = sys.modules["app.ai.data"]
+    monkeypatch.setattr(data_package, "collection", None, raising=False)
+    monkeypatch.setattr(data_package, "MONGO_AVAILABLE", True, raising=False)
+    monkeypatch.delitem(sys.modules, "app.ai.rag.repository", raising=False)
+    from app.ai.rag import repository
+
+    return repository
+
+
+class FakeChunks:
+    def __init__(self, ids):
+        self.docs = {ObjectId(i): {"_id": ObjectId(i), "text": f"본문 {i}"} for i in ids}
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        # Mongo는 $in 순서를 지키지 않으므로 뒤집어서 돌려줌
+        return [self.docs[i] for i in reversed(query["_id"]["$in"]) if i in self.docs]
+
+    def find_one(self, query, projection=None):
+        self.queries.append(query)
+        return self.docs.get(query["_id"])
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_fetch_keeps_search_order_dedupes_and_skips_missing(repository_module, bulk):
+    chunks = FakeChunks(IDS[:3])
+    logs = []
+    repo = repository_module.MongoChunkRepository(chunks, mongo_available=True, bulk=bulk, debug_fn=logs.append)
+
+    docs = repo.fetch_chunks([IDS[2], IDS[0], IDS[2], IDS[3], IDS[1]])
+
+    assert [str(d["_id"]) for d in docs] == [IDS[2], IDS[0], IDS[1]]
+    assert len(chunks.queries) == (1 if bulk else 4)
+    assert any("hits=3 misses=1" in line for line in logs)
+    assert not hasattr(repo, "last_stats")
+
+
+def test_bulk_fetch_queries_object_ids(repository_module):
+    chunks = FakeChunks(IDS[:1])
+    repo = repository_module.MongoChunkRepository(chunks, mongo_available=True)
+
+    repo.fetch_chunks([IDS[0], "legacy-id"])
+
+    assert chunks.queries == [{"_id": {"$in": [ObjectId(IDS[0]), "legacy-id"]}}]
+
+
+def test_fetch_returns_nothing_when_mongo_is_unavailable(repository_module):
+    chunks = FakeChunks(IDS)
+    repo = repository_module.MongoChunkRepository(chunks, mongo_available=False)
+
+    assert repo.fetch_chunks(IDS) == []
+    assert repo.fetch_chunks([]) == []
+    assert chunks.queries == []
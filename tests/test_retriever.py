@@ -0,0 +1,56 @@
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture
+def retriever_module(monkeypatch):
+    # app.ai.data의 __init__은 Mongo/Pinecone에 연결하므로 기본값 두 개만 채워 둠
+    data_package = sys.modules["app.ai.data"]
+    monkeypatch.setattr(data_package, "index", None, raising=False)
+    monkeypatch.setattr(data_package, "get_cached_embedding", lambda text: [0.0], raising=False)
+    monkeypatch.delitem(sys.modules, "app.ai.rag.retriever", raising=False)
+    from app.ai.rag import retriever
+
+    return retriever
+
+
+def _match(mongo_id, score):
+    return types.SimpleNamespace(id=f"{mongo_id}:0", score=score, metadata={"mongo_id": mongo_id})
+
+
+class FakeIndex:
+    def __init__(self, matches):
+        self._matches = matches
+        self.namespaces = []
+
+    def query(self, *, namespace, top_k, include_metadata, vector):
+        self.namespaces.append(namespace)
+        return types.SimpleNamespace(matches=self._matches[namespace][:top_k])
+
+
+MATCHES = {
+    "law_articles": [_match("law1", 0.82), _match("law2", 0.35)],
+    "appendix_tables": [_match("table1", 0.91), _match("table2", 0.41)],
+}
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_search_merges_namespaces_by_score_and_drops_low_scores(retriever_module, concurrent):
+    index = FakeIndex(MATCHES)
+    retriever = retriever_module.PineconeRetriever(index, embed_fn=lambda q: [1.0], concurrent=concurrent)
+
+    result = retriever.search("졸업 학점", threshold=0.4)
+
+    assert sorted(index.namespaces) == ["appendix_tables", "law_articles"]
+    assert result.chunk_ids == ["table1", "law1", "table2"]
+    assert [hit.score for hit in result.hits] == [0.91, 0.82, 0.41]
+
+
+def test_search_applies_global_top_k(retriever_module):
+    retriever = retriever_module.PineconeRetriever(
+        FakeIndex(MATCHES), embed_fn=lambda q: [1.0], global_top_k=2
+    )
+
+    assert retriever.search("졸업 학점", threshold=0.0).chunk_ids == ["table1", "law1"]
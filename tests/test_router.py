@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+
+from app.ai.functions.router import (
+    CAFETERIA_TOOL,
+    SEARCH_TOOL,
+    WEAK_RULE_CONFIDENCE,
+    ToolRouter,
+    extract_date,
+    extract_meal,
+    is_menu_lookup,
+)
+
+
+@pytest.fixture
+def router():
+    return ToolRouter(
+        analyze_fn=None,
+        tools=[],
+        mode="tiered",
+        min_confidence=0.75,
+        model_path="",
+        log_path="",
+        regulation_fn=lambda message: "졸업" in message or "장학" in message,
+    )
+
+
+@pytest.mark.parametrize(
+    "message, tools, confidence",
+    [
+        ("오늘 학식 뭐야", [CAFETERIA_TOOL], 0.95),
+        ("점심 뭐 나와?", [CAFETERIA_TOOL], 0.95),
+        ("내일 석식 메뉴 알려줘", [CAFETERIA_TOOL], 0.95),
+        ("수강신청 메뉴 어디야?", [CAFETERIA_TOOL], WEAK_RULE_CONFIDENCE),
+        # 학식 키워드가 있어도 메뉴가 아닌 것을 물으면 확정하지 않음
+        ("학생식당 운영시간 알려줘", [CAFETERIA_TOOL], WEAK_RULE_CONFIDENCE),
+        ("학식 가격 얼마야?", [CAFETERIA_TOOL], WEAK_RULE_CONFIDENCE),
+        ("조식 몇 시부터야?", [CAFETERIA_TOOL], WEAK_RULE_CONFIDENCE),
+        ("장학 공지 알려줘", [SEARCH_TOOL], 0.9),
+        ("비교과 프로그램 모집 알려줘", [SEARCH_TOOL], WEAK_RULE_CONFIDENCE),
+        ("행사 일정 검색해줘", [SEARCH_TOOL], WEAK_RULE_CONFIDENCE),
+        ("오늘 학식 메뉴랑 학사공지 알려줘", [CAFETERIA_TOOL, SEARCH_TOOL], 0.9),
+        ("안녕!", [], 0.95),
+        ("졸업 학점이 몇 학점이야?", [], 0.85),
+        # 규정 질문은 공지를 직접 찾지 않으면 웹 키워드 규칙보다 먼저 판정
+        ("장학금 모집 기준이 뭐야?", [], 0.85),
+        ("졸업 요건 검색해줘", [], 0.85),
+        ("장학공지 알려줘", [SEARCH_TOOL], 0.9),
+    ],
+)
+def test_rule_route_confidence(router, message, tools, confidence):
+    decision = router.rule_route(message)
+
+    assert decision.tier == "rule"
+    assert decision.tool_names == tools
+    assert decision.confidence == confidence
+
+
+def test_rule_route_returns_none_when_unsure(router):
+    assert router.rule_route("기숙사 신청은 언제부터야?") is None
+
+
+def test_weak_rules_stay_below_default_min_confidence(router):
+    assert WEAK_RULE_CONFIDENCE < router.min_confidence
+
+
+def test_rule_route_fills_cafeteria_arguments(router):
+    decision = router.rule_route("내일 석식 메뉴 알려줘")
+    call = decision.calls[0]
+
+    assert call.call_id == f"rule_{CAFETERIA_TOOL}"
+    assert json.loads(call.arguments) == {"date": "내일", "meal": "석식"}
+
+
+@pytest.mark.parametrize(
+    "text, date",
+    [("모레 학식", "모레"), ("2025-03-04 학식", "2025-03-04"), ("3월 4일 학식", "3월 4일"), ("학식", "오늘")],
+)
+def test_extract_date(text, date):
+    assert extract_date(text) == date
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("오늘 학식 뭐야", True),
+        ("3월 4일 식단 알려줘", True),
+        ("점심 메뉴 뭐 나와?", True),
+        ("학식 메뉴 알려줘", True),
+        ("수강신청 메뉴 어디야?", False),
+        ("학식 가격 얼마야?", False),
+        ("오늘 학생식당 몇 시까지 해?", False),
+        ("학생식당 위치 알려줘", False),
+    ],
+)
+def test_is_menu_lookup(message, expected):
+    assert is_menu_lookup(message) is expected
+
+
+def test_extract_meal():
+    assert extract_meal("아침 뭐야") == "조식"
+    assert extract_meal("점심") == "중식"
+    assert extract_meal("학식") is None
+
+
+def test_aroute_falls_back_to_llm_for_weak_rules(router, tmp_path):
+    calls = []
+
+    async def analyze(message, tools):
+        calls.append(message)
+        return []
+
+    router._analyze = analyze
+    router._log_path = str(tmp_path / "router.jsonl")
+
+    strong = asyncio.run(router.aroute("오늘 학식 뭐야"))
+    weak = asyncio.run(router.aroute("학식 가격 얼마야?"))
+
+    assert strong.tier == "rule"
+    assert weak.tier == "llm" and weak.tool_names == []
+    assert calls == ["학식 가격 얼마야?"]
+    logged = [json.loads(line) for line in open(router._log_path, encoding="utf-8")]
+    assert logged == [{"query": "학식 가격 얼마야?", "label": "none"}]
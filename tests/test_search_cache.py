@@ -0,0 +1,145 @@
+import asyncio
+import types
+
+import pytest
+
+from app.ai import cache as cache_module
+from app.ai.functions import analyzer
+from app.ai.functions.search_cache import (
+    CATEGORY_URLS,
+    SEARCH_RESULT_TTLS,
+    WebSearchCache,
+    WebSearchResult,
+    search_category,
+)
+
+NOTICE_URL = "https://www.halla.ac.kr/kr/242/subview.do"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.mark.parametrize(
+    "search_text, category",
+    [
+        (f"site:halla.ac.kr {NOTICE_URL} 수강신청 정정", "학사공지"),
+        ("site:halla.ac.kr https://www.halla.ac.kr/kr/244/subview.do 국가장학금", "장학공지"),
+        ("site:halla.ac.kr https://www.halla.ac.kr/kr/211/subview.do 오늘 학식", "menu"),
+        ("한라대 도서관 열람실 운영 안내", "general"),
+    ],
+)
+def test_search_category_from_url(search_text, category):
+    assert search_category(search_text) == category
+
+
+def test_every_category_url_has_a_ttl():
+    assert set(CATEGORY_URLS.values()) <= set(SEARCH_RESULT_TTLS)
+    assert SEARCH_RESULT_TTLS["학사공지"] < SEARCH_RESULT_TTLS["general"]
+
+
+def test_notice_results_expire_before_static_pages(clock):
+    cache = WebSearchCache(enabled=True)
+    notice = f"site:halla.ac.kr {NOTICE_URL} 수강신청 정정"
+    static = "한라대 도서관 열람실 운영 안내"
+    cache.put_result(notice, WebSearchResult(text="공지 본문"))
+    cache.put_result(static, WebSearchResult(text="안내 본문"))
+
+    clock.now += SEARCH_RESULT_TTLS["학사공지"] + 1
+
+    assert cache.get_result(notice) is None
+    assert cache.get_result(static).text == "안내 본문"
+
+    clock.now += SEARCH_RESULT_TTLS["general"]
+
+    assert cache.get_result(static) is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = WebSearchCache(enabled=False)
+    cache.put_result("검색어", WebSearchResult(text="본문"))
+    cache.put_query(cache.rewrite, "질문", None, "검색어")
+
+    assert cache.get_result("검색어") is None
+    assert cache.get_query(cache.rewrite, "질문", None) is None
+
+
+class FakeResponses:
+    """분류기/재작성/웹검색 요청을 구분해 고정 응답을 돌려주는 AsyncOpenAI 대용"""
+
+    def __init__(self, category):
+        self.category = category
+        self.calls = []
+
+    async def create(self, **request):
+        if "tools" in request:
+            self.calls.append("search")
+            citation = types.SimpleNamespace(type="url_citation", title="학사공지", url=NOTICE_URL)
+            text = types.SimpleNamespace(type="output_text", text="검색 본문", annotations=[citation])
+            message = types.SimpleNamespace(type="message", content=[text])
+            return types.SimpleNamespace(output=[types.SimpleNamespace(type="web_search_call"), message])
+        if request["model"] == "gpt-4o":
+            self.calls.append("rewrite")
+            return types.SimpleNamespace(output_text="한라대 도서관 운영 시간")
+        self.calls.append("classifier")
+        return types.SimpleNamespace(output_text=self.category)
+
+
+@pytest.fixture
+def web_search(monkeypatch):
+    def setup(category):
+        responses = FakeResponses(category)
+        monkeypatch.setattr(analyzer, "async_client", types.SimpleNamespace(responses=responses))
+        monkeypatch.setattr(analyzer, "web_search_cache", WebSearchCache(enabled=True))
+        return responses
+
+    return setup
+
+
+def search(question):
+    return asyncio.run(analyzer.asearch_internet(question))
+
+
+def test_classifier_and_result_tiers_are_cached(web_search):
+    responses = web_search("학사공지")
+
+    first = search("수강신청 정정 기간 알려줘")
+    second = search(" 수강신청  정정 기간 알려줘")
+
+    assert first.cache == {"classifier": "miss", "result": "miss"}
+    assert second.cache == {"classifier": "hit", "result": "hit"}
+    assert responses.calls == ["classifier", "search"]
+    assert "검색 본문" in second.output and NOTICE_URL in second.output
+    # 캐시 상태는 메타데이터로만 전달하고 LLM에 넘기는 결과 문자열에는 넣지 않음
+    assert "hit" not in second.output
+
+
+def test_rewrite_tier_is_cached(web_search):
+    responses = web_search("해당없음")
+
+    first = search("도서관 몇 시까지 해?")
+    second = search("도서관 몇 시까지 해?")
+
+    assert first.cache == {"classifier": "miss", "rewrite": "miss", "result": "miss"}
+    assert second.cache == {"classifier": "hit", "rewrite": "hit", "result": "hit"}
+    assert responses.calls == ["classifier", "rewrite", "search"]
+
+
+def test_menu_query_skips_classifier(web_search):
+    responses = web_search("학사공지")
+
+    result = search("오늘 학식 메뉴 알려줘")
+
+    assert result.cache == {"result": "miss"}
+    assert responses.calls == ["search"]
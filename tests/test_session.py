@@ -0,0 +1,94 @@
+import pytest
+
+from app.ai.chatbot import session as session_module
+from app.ai.chatbot.session import SessionStore
+
+
+def _add_turn(session, question, answer):
+    session.context.append({"role": "user", "content": question})
+    session.context.append({"role": "assistant", "content": answer})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_sessions_keep_separate_context():
+    store = SessionStore("sys")
+    a = store.get_or_create("a")
+    b = store.get_or_create("b")
+    _add_turn(a, "질문", "답변")
+    store.save(a)
+
+    assert store.get_or_create("a").history == a.history
+    assert b.history == []
+    assert b.context[0] == {"role": "system", "content": "sys"}
+
+
+def test_invalid_session_id_gets_new_id():
+    store = SessionStore("sys")
+    assert store.get_or_create(None).session_id
+    assert len(store.get_or_create("x" * 500).session_id) == 32
+
+
+def test_message_cap_drops_oldest_turns():
+    store = SessionStore("sys", max_messages_per_session=4)
+    session = store.get_or_create("s")
+    for i in range(3):
+        _add_turn(session, f"q{i}", f"a{i}")
+    store.save(session)
+
+    assert [m["content"] for m in session.history] == ["q1", "a1", "q2", "a2"]
+
+
+def test_char_cap_keeps_summary_and_starts_with_user():
+    store = SessionStore("sys", max_chars_per_session=20)
+    session = store.get_or_create("s")
+    session.context.append({"role": "system", "content": "요약", "summary_version": 1})
+    _add_turn(session, "q0" * 5, "a0" * 5)
+    _add_turn(session, "q1", "a1")
+    store.save(session)
+
+    assert session.context[1]["content"] == "요약"
+    assert [m["content"] for m in session.history[1:]] == ["q1", "a1"]
+
+
+def test_lru_evicts_least_recently_used_session():
+    store = SessionStore("sys", max_sessions=2)
+    store.get_or_create("a")
+    store.get_or_create("b")
+    store.get_or_create("a")  # a를 최근 사용으로
+    store.get_or_create("c")
+
+    assert len(store) == 2
+    assert set(store._sessions) == {"a", "c"}
+
+
+def test_total_char_cap_evicts_oldest_sessions():
+    store = SessionStore("s", max_total_chars=30)
+    for sid in ("a", "b", "c"):
+        session = store.get_or_create(sid)
+        _add_turn(session, "x" * 5, "y" * 5)
+        store.save(session)
+
+    assert set(store._sessions) == {"b", "c"}
+    assert store.total_chars == 22
+
+
+def test_ttl_expires_idle_sessions(clock):
+    store = SessionStore("sys", ttl_seconds=60)
+    old = store.get_or_create("old")
+    _add_turn(old, "q", "a")
+    store.save(old)
+
+    clock[0] += 30
+    store.get_or_create("fresh")
+    clock[0] += 45
+    restored = store.get_or_create("old")
+
+    assert restored is not old
+    assert restored.history == []
+    assert set(store._sessions) == {"fresh", "old"}
@@ -0,0 +1,481 @@
+import asyncio
+import json
+import sys
+import time
+import types
+
+import pytest
+
+from app.ai.chatbot.metadata import FunctionCallMetadata
+
+
+@pytest.fixture
+def stream_module(monkeypatch, fake_tiktoken):
+    # app.ai.data / app.ai.functions의 __init__은 외부 서비스에 연결하므로 stream이 쓰는 이름만 채워 둠
+    data_package = sys.modules["app.ai.data"]
+    monkeypatch.setattr(data_package, "index", None, raising=False)
+    monkeypatch.setattr(data_package, "get_cached_embedding", lambda text: [0.0], raising=False)
+    monkeypatch.setattr(data_package, "collection", None, raising=False)
+    monkeypatch.setattr(data_package, "MONGO_AVAILABLE", False, raising=False)
+    from app.ai.functions import analyzer
+
+    functions_package = sys.modules["app.ai.functions"]
+    monkeypatch.setattr(functions_package, "FunctionCalling", analyzer.FunctionCalling, raising=False)
+    monkeypatch.setattr(functions_package, "tools", analyzer.tools, raising=False)
+    for name in ("app.ai.chatbot.stream", "app.ai.rag.service", "app.ai.rag.retriever", "app.ai.rag.repository"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    from app.ai.chatbot import stream
+
+    return stream
+
+
+@pytest.fixture
+def bot(stream_module, monkeypatch):
+    monkeypatch.setenv("CHAT_SUMMARY", "0")
+    monkeypatch.setenv("RAG_DEBUG", "0")
+    return stream_module.ChatbotStream("test-model", system_role="시스템", instruction="지침")
+
+
+class FakeTools:
+    """이름별 지연 시간(초)만큼 기다렸다가 결과를 돌려주는 FunctionCalling 대용"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.running = 0
+        self.max_running = 0
+        self.cancelled = []
+
+    async def aexecute(self, name, **arguments):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays[name])
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        finally:
+            self.running -= 1
+        return types.SimpleNamespace(output=f"{name} 결과", cache=None)
+
+
+def calls(*names):
+    return [FunctionCallMetadata(name=name, arguments={}, output="", call_id=f"call_{name}") for name in names]
+
+
+def run_tools(bot, delays, names, *, deadline=5.0, concurrency=4, timeouts=None):
+    bot.func_calling = FakeTools(delays)
+    bot.tools_deadline = deadline
+    bot.tools_max_concurrency = concurrency
+    bot.tool_timeouts = timeouts or {}
+    bot.tool_default_timeout = 5.0
+    results = calls(*names)
+    events = []
+    start = time.perf_counter()
+    asyncio.run(bot._execute_tools(results, on_event=events.append))
+    return results, events, time.perf_counter() - start
+
+
+def test_slow_tool_hits_its_own_timeout_and_fast_result_is_kept(bot):
+    results, _, elapsed = run_tools(bot, {"fast": 0.01, "slow": 10}, ["fast", "slow"], timeouts={"slow": 0.1})
+
+    fast, slow = results
+    assert (fast.status, fast.output) == ("ok", "fast 결과")
+    assert slow.status == "timeout" and "0.1초" in slow.output
+    assert bot.func_calling.cancelled == ["slow"]
+    assert elapsed < 1.0
+
+
+def test_deadline_cancels_hanging_tool_and_returns_in_time(bot):
+    results, _, elapsed = run_tools(bot, {"fast": 0.01, "slow": 10}, ["fast", "slow"], deadline=0.2)
+
+    fast, slow = results
+    assert (fast.status, fast.output) == ("ok", "fast 결과")
+    assert slow.status == "timeout" and "마감 시간(0.2초)" in slow.output
+    assert slow.elapsed == pytest.approx(0.2, abs=0.15)
+    assert bot.func_calling.cancelled == ["slow"]
+    assert elapsed < 1.0
+
+
+def test_semaphore_limits_concurrent_tools(bot):
+    results, _, _ = run_tools(bot, {"a": 0.05, "b": 0.05, "c": 0.05}, ["a", "b", "c"], concurrency=2)
+
+    assert bot.func_calling.max_running == 2
+    assert [m.status for m in results] == ["ok", "ok", "ok"]
+
+
+def event_log(events):
+    return [(event["type"], event["name"]) for event in events]
+
+
+def assert_paired(events):
+    open_calls = set()
+    for event in events:
+        if event["type"] == "tool_started":
+            assert event["call_id"] not in open_calls
+            open_calls.add(event["call_id"])
+        else:
+            open_calls.remove(event["call_id"])  # 시작하지 않은 함수의 종료 이벤트면 KeyError
+    assert not open_calls
+
+
+def test_every_started_tool_finishes_once(bot):
+    _, events, _ = run_tools(
+        bot, {"fast": 0.01, "slow": 10, "hung": 10}, ["fast", "slow", "hung"], deadline=0.2, timeouts={"slow": 0.05}
+    )
+
+    assert_paired(events)
+    assert event_log(events) == [
+        ("tool_started", "fast"), ("tool_started", "slow"), ("tool_started", "hung"),
+        ("tool_finished", "fast"), ("tool_finished", "slow"), ("tool_finished", "hung"),
+    ]
+    finished = {event["name"]: event for event in events if event["type"] == "tool_finished"}
+    assert {name: event["status"] for name, event in finished.items()} == {"fast": "ok", "slow": "timeout", "hung": "timeout"}
+
+
+def test_tool_waiting_for_semaphore_at_deadline_sends_no_events(bot):
+    results, events, _ = run_tools(bot, {"hung": 10, "queued": 0.01}, ["hung", "queued"], deadline=0.1, concurrency=1)
+
+    assert_paired(events)
+    assert event_log(events) == [("tool_started", "hung"), ("tool_finished", "hung")]
+    # 시작하지 못한 함수도 결과에는 timeout으로 남음
+    assert [m.status for m in results] == ["timeout", "timeout"]
+
+
+def test_run_branch_records_status_and_falls_back_to_default(bot):
+    async def value():
+        return "결과"
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def fail():
+        raise RuntimeError("branch failed")
+
+    async def main():
+        timings = {}
+        results = [
+            await bot._run_branch("ok", value(), timeout=1, timings=timings, default=None),
+            await bot._run_branch("slow", hang(), timeout=0.05, timings=timings, default="기본값"),
+            await bot._run_branch("broken", fail(), timeout=1, timings=timings, default=[]),
+        ]
+        return results, timings
+
+    results, timings = asyncio.run(main())
+
+    assert results == ["결과", "기본값", []]
+    assert {name: t["status"] for name, t in timings.items()} == {"ok": "ok", "slow": "timeout", "broken": "error"}
+    assert timings["slow"]["elapsed"] < 1
+
+
+def rag_result():
+    return types.SimpleNamespace(
+        merged_documents_text="제1조(목적) 본문", is_regulation=True, gate_reason="rule", gate_tier="rule",
+        context_source="mongo", hits=[1], document_count=1, preview_count=0, chunk_ids=["c1"],
+        source_documents=[], content_hash=None,
+    )
+
+
+def tool_result():
+    meta = calls("get_halla_cafeteria_menu")[0]
+    meta.output = "오늘 중식: 김치찌개"
+    return meta
+
+
+class FanoutHarness:
+    """stream_chat의 두 갈래와 최종 LLM 스트림을 바꿔 끼우고 호출 기록을 남김"""
+
+    def __init__(self, bot, rag, tools):
+        self.final_contexts = []
+        self.cancelled = []
+
+        async def prepare_rag_context(message, language="KOR", timings=None, emit=None):
+            return await self._guard("rag", rag(emit))
+
+        async def analyze_and_execute_functions(message, context=None, route_info=None, on_event=None):
+            return await self._guard("tools", tools(on_event))
+
+        async def stream_openai_response(context):
+            self.final_contexts.append(context)
+            yield {"type": "delta", "content": "답변"}
+            yield {"type": "completed", "text": "답변"}
+
+        bot._prepare_rag_context = prepare_rag_context
+        bot._analyze_and_execute_functions = analyze_and_execute_functions
+        bot._stream_openai_response = stream_openai_response
+
+    async def _guard(self, name, coro):
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+
+
+async def collect(generator):
+    return [json.loads(line) async for line in generator]
+
+
+def metadata_of(events):
+    return next(event["data"] for event in events if event["type"] == "metadata")
+
+
+async def hang(*_):
+    await asyncio.sleep(10)
+
+
+def test_fanout_uses_tools_result_when_rag_branch_times_out(bot):
+    async def tools(on_event):
+        return [tool_result()]
+
+    harness = FanoutHarness(bot, hang, tools)
+    bot.rag_branch_timeout = 0.1
+    start = time.perf_counter()
+
+    events = asyncio.run(collect(bot.stream_chat("오늘 학식 뭐야?")))
+
+    assert time.perf_counter() - start < 2
+    metadata = metadata_of(events)
+    assert metadata["timings"]["rag"]["status"] == "timeout"
+    assert metadata["timings"]["tools"]["status"] == "ok"
+    assert [f["name"] for f in metadata["functions"]] == ["get_halla_cafeteria_menu"]
+    assert metadata["rag"] is None
+    assert "김치찌개" in json.dumps(harness.final_contexts[0], ensure_ascii=False)
+    assert harness.cancelled == ["rag"]
+    assert events[-1] == {"type": "done"}
+
+
+def test_fanout_uses_rag_result_when_tools_branch_fails(bot):
+    async def rag(emit):
+        return rag_result(), "요약된 제1조", None
+
+    async def tools(on_event):
+        raise RuntimeError("analyzer down")
+
+    harness = FanoutHarness(bot, rag, tools)
+
+    events = asyncio.run(collect(bot.stream_chat("제1조 목적이 뭐야?")))
+
+    metadata = metadata_of(events)
+    assert metadata["timings"]["rag"]["status"] == "ok"
+    assert metadata["timings"]["tools"]["status"] == "error"
+    assert metadata["functions"] == []
+    assert metadata["rag"]["condensed_context"] == "요약된 제1조"
+    assert "요약된 제1조" in json.dumps(harness.final_contexts[0], ensure_ascii=False)
+
+
+def test_client_disconnect_cancels_running_branches(bot):
+    async def rag(emit):
+        emit("gate", "started")
+        await asyncio.sleep(10)
+
+    harness = FanoutHarness(bot, rag, hang)
+    bot.progressive = True
+
+    async def main():
+        generator = bot.stream_chat("제1조 목적이 뭐야?")
+        first = json.loads(await generator.__anext__())
+        await generator.aclose()
+        for _ in range(3):
+            await asyncio.sleep(0)  # 취소가 갈래 코루틴까지 전달될 때까지 양보
+        # asyncio.run이 끝나며 남은 태스크를 취소하기 전에 확인
+        return first, sorted(harness.cancelled)
+
+    first, cancelled = asyncio.run(main())
+
+    assert first == {"type": "status", "stage": "gate", "state": "started"}
+    assert cancelled == ["rag", "tools"]
+    assert harness.final_contexts == []
+
+
+LONG_CONDENSED = "<반영>\n" + "\n".join(f"제{i}조 관련 원문 줄 " + "가" * 60 for i in range(20)) + "\n</반영>"
+
+
+class FakeCondenseClient:
+    """1차 요약은 스트리밍 델타로, 2차(넓은 맥락) 요약은 한 번에 돌려주는 AsyncOpenAI 대용"""
+
+    def __init__(self, deltas, broader=LONG_CONDENSED, broader_delay=0.0):
+        self.deltas = deltas
+        self.broader = broader
+        self.broader_delay = broader_delay
+        self.log = []
+        self.responses = self
+
+    async def create(self, **request):
+        if request.get("stream"):
+            return self._stream()
+        self.log.append("broader")
+        try:
+            await asyncio.sleep(self.broader_delay)
+        except asyncio.CancelledError:
+            self.log.append("broader cancelled")
+            raise
+        return types.SimpleNamespace(output_text=self.broader)
+
+    async def _stream(self):
+        for delta in self.deltas:
+            await asyncio.sleep(0.01)  # 다른 태스크(미리 시작한 2차 요청)가 돌 틈
+            self.log.append(delta if len(delta) < 20 else "긴 델타")
+            yield types.SimpleNamespace(type="response.output_text.delta", delta=delta)
+
+
+def condense(bot, stream_module, monkeypatch, fake_client):
+    monkeypatch.setattr(stream_module, "async_client", fake_client)
+    bot.progressive = True
+    statuses = []
+
+    def emit(stage, state, **info):
+        statuses.append((stage, state, info))
+
+    async def main():
+        condensed = await bot._condense_rag_context("제1조 목적?", "원문", emit=emit)
+        await asyncio.sleep(0)  # 취소 요청이 전달될 틈
+        # asyncio.run이 남은 태스크를 정리하기 전의 호출 기록
+        return condensed, list(fake_client.log)
+
+    condensed, log = asyncio.run(main())
+    return condensed, log, statuses
+
+
+def test_short_partial_starts_broader_request_before_first_pass_ends(bot, stream_module, monkeypatch):
+    fake = FakeCondenseClient(["<반영>제1조", " 짧은 근거</반영>", "\n끝"])
+
+    condensed, log, statuses = condense(bot, stream_module, monkeypatch, fake)
+
+    # </반영>이 닫힌 직후 2차 요청이 시작되고, 1차의 마지막 델타는 그 뒤에 도착
+    assert log == ["<반영>제1조", " 짧은 근거</반영>", "broader", "\n끝"]
+    assert [(stage, state) for stage, state, _ in statuses] == [("condense", "retry")]
+    assert "스트리밍 중 조기 판단" in statuses[0][2]["reason"]
+    assert condensed == LONG_CONDENSED
+
+
+def test_speculative_broader_request_is_cancelled_when_first_pass_is_long(bot, stream_module, monkeypatch):
+    fake = FakeCondenseClient(["<반영>짧음</반영>", LONG_CONDENSED], broader_delay=10)
+
+    condensed, log, _ = condense(bot, stream_module, monkeypatch, fake)
+
+    assert condensed == ("<반영>짧음</반영>" + LONG_CONDENSED).strip()
+    assert log == ["<반영>짧음</반영>", "broader", "긴 델타", "broader cancelled"]
+
+
+def test_drain_status_yields_events_in_order_until_task_ends(bot):
+    async def main():
+        queue = asyncio.Queue()
+
+        async def work():
+            for i in range(3):
+                queue.put_nowait({"type": "status", "n": i})
+                await asyncio.sleep(0.01)
+            queue.put_nowait({"type": "status", "n": 3})  # 끝나기 직전 이벤트도 빠짐없이 전송
+            return "done"
+
+        task = asyncio.ensure_future(work())
+        events = [event["n"] async for event in bot._drain_status(queue, task)]
+        return events, task.result()
+
+    assert asyncio.run(main()) == ([0, 1, 2, 3], "done")
+
+
+def test_status_events_stream_before_first_token(bot):
+    async def rag(emit):
+        emit("gate", "started")
+        await asyncio.sleep(0.01)
+        emit("gate", "done", is_regulation=True, tier="rule")
+        emit("retrieval", "started")
+        await asyncio.sleep(0.01)
+        emit("retrieval", "done", hits=1)
+        return rag_result(), "요약된 제1조", None
+
+    async def tools(on_event):
+        meta = tool_result()
+        on_event(meta.to_event("tool_started"))
+        await asyncio.sleep(0.005)
+        on_event(meta.to_event("tool_finished"))
+        return [meta]
+
+    FanoutHarness(bot, rag, tools)
+    bot.progressive = bot.tool_events = True
+
+    events = asyncio.run(collect(bot.stream_chat("제1조 목적이 뭐야?")))
+
+    types_in_order = [event["type"] for event in events]
+    first_token = types_in_order.index("delta")
+    assert types_in_order[:first_token].count("status") == 4
+    assert types_in_order[:first_token].count("tool_started") == 1
+    assert types_in_order[:first_token].count("tool_finished") == 1
+    assert types_in_order[first_token:] == ["delta", "metadata", "done"]
+
+
+def retrieved(chunk_ids=("c1", "c2"), content_hash="hash-1"):
+    return types.SimpleNamespace(**dict(vars(rag_result()), chunk_ids=list(chunk_ids), content_hash=content_hash))
+
+
+@pytest.fixture
+def condense_requests(bot):
+    requests = []
+
+    async def request_condense_stream(prompt, on_progress=None):
+        requests.append(prompt)
+        return LONG_CONDENSED
+
+    bot._request_condense_stream = request_condense_stream
+    bot.progressive = True
+    bot.condense_router.mode = "llm"
+    return requests
+
+
+def condense_retrieved(bot, message, result):
+    timings = {}
+    condensed = asyncio.run(bot._condense_retrieved(message, result, timings=timings))
+    return condensed, timings["condense"]["cache"]
+
+
+def test_condense_cache_hits_for_same_question_chunks_and_content(bot, condense_requests):
+    first = condense_retrieved(bot, "제1조 목적이 뭐야?", retrieved(["c1", "c2"]))
+    second = condense_retrieved(bot, " 제1조  목적이 뭐야? ", retrieved(["c2", "c1"]))
+
+    assert first == (LONG_CONDENSED, "miss")
+    assert second == (LONG_CONDENSED, "hit")
+    assert len(condense_requests) == 1
+
+
+@pytest.mark.parametrize(
+    "message, result",
+    [
+        ("제1조 목적이 뭐야?", retrieved(content_hash="hash-2")),  # 규정 재적재로 본문이 바뀜
+        ("제1조 목적이 뭐야?", retrieved(["c1", "c3"])),
+        ("제2조 정의가 뭐야?", retrieved()),
+    ],
+)
+def test_condense_cache_misses_when_any_key_part_changes(bot, condense_requests, message, result):
+    condense_retrieved(bot, "제1조 목적이 뭐야?", retrieved())
+
+    assert condense_retrieved(bot, message, result)[1] == "miss"
+    assert len(condense_requests) == 2
+
+
+def test_condense_cache_key_covers_question_chunks_and_hash(bot):
+    key = bot._condense_cache_key("제1조 목적이 뭐야?", retrieved(["c2", "c1"]))
+
+    assert key == bot._condense_cache_key("제1조   목적이 뭐야?", retrieved(["c1", "c2"]))
+    assert key != bot._condense_cache_key("제1조 목적이 뭐야?", retrieved(content_hash="hash-2"))
+    assert bot._condense_cache_key("제1조 목적이 뭐야?", retrieved(content_hash=None)) is None
+
+
+def test_condense_without_content_hash_is_not_cached(bot, condense_requests):
+    for _ in range(2):
+        assert condense_retrieved(bot, "제1조 목적이 뭐야?", retrieved(content_hash=None))[1] == "miss"
+
+    assert len(condense_requests) == 2
+
+
+def test_failed_condense_fallback_is_not_cached(bot, condense_requests):
+    async def broken(prompt, on_progress=None):
+        condense_requests.append(prompt)
+        raise RuntimeError("condense down")
+
+    bot._request_condense_stream = broken
+
+    fallback, _ = condense_retrieved(bot, "제1조 목적이 뭐야?", retrieved())
+
+    assert fallback == "제1조(목적) 본문"
+    assert len(bot.condense_cache) == 0
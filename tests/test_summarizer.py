@@ -0,0 +1,113 @@
+import asyncio
+import types
+
+import pytest
+
+
+class FakeResponses:
+    def __init__(self, text="- 요약"):
+        self.text = text
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        return types.SimpleNamespace(output_text=self.text)
+
+
+@pytest.fixture
+def summarizer_module(fake_tiktoken):
+    from app.ai.chatbot import summarizer
+
+    return summarizer
+
+
+def make_summarizer(module, responses):
+    from app.ai.chatbot.context_window import ContextWindowManager
+
+    window = ContextWindowManager(max_token_size=100_000)
+    return module.ConversationSummarizer(
+        context_window=window,
+        watermark_tokens=10,
+        fold_turns=2,
+        keep_turns=2,
+        async_openai_client=types.SimpleNamespace(responses=responses),
+    )
+
+
+def conversation(turns):
+    context = [{"role": "system", "content": "sys"}]
+    for i in range(turns):
+        context += [{"role": "user", "content": f"질문{i}"}, {"role": "assistant", "content": f"답변{i}"}]
+    return context
+
+
+def test_fold_replaces_oldest_turns_with_summary(summarizer_module):
+    responses = FakeResponses()
+    summarizer = make_summarizer(summarizer_module, responses)
+    context = conversation(5)
+
+    assert asyncio.run(summarizer.fold(context)) is True
+
+    assert summarizer_module.is_summary_message(context[1])
+    assert context[1]["summary_version"] == 1
+    assert context[1]["summary_turns"] == 2
+    assert [m["content"] for m in context[2:]] == ["질문2", "답변2", "질문3", "답변3", "질문4", "답변4"]
+    assert "질문0" in responses.calls[0]["input"][1]["content"]
+
+
+def test_second_fold_merges_previous_summary(summarizer_module):
+    responses = FakeResponses()
+    summarizer = make_summarizer(summarizer_module, responses)
+    context = conversation(5)
+    asyncio.run(summarizer.fold(context))
+    context += [{"role": "user", "content": "질문5"}, {"role": "assistant", "content": "답변5"}]
+
+    assert asyncio.run(summarizer.fold(context)) is True
+
+    assert context[1]["summary_version"] == 2
+    assert context[1]["summary_turns"] == 4
+    assert sum(summarizer_module.is_summary_message(m) for m in context) == 1
+    assert "- 요약" in responses.calls[1]["input"][1]["content"]
+
+
+def test_fold_is_discarded_when_context_changes_meanwhile(summarizer_module):
+    summarizer = make_summarizer(summarizer_module, FakeResponses())
+    context = conversation(5)
+
+    async def main():
+        task = asyncio.create_task(summarizer.fold(context))
+        await asyncio.sleep(0)
+        del context[1:3]  # 요약하는 동안 세션 상한으로 오래된 턴이 잘림
+        return await task
+
+    assert asyncio.run(main()) is False
+    assert not summarizer_module.is_summary_message(context[1])
+
+
+def test_schedule_skips_running_key_and_notifies_after_fold(summarizer_module):
+    summarizer = make_summarizer(summarizer_module, FakeResponses())
+    context = conversation(5)
+    saved = []
+
+    async def main():
+        async def on_folded():
+            saved.append(context[1]["summary_version"])
+
+        task = summarizer.schedule(context, key="session-1", on_folded=on_folded)
+        duplicate = summarizer.schedule(list(context), key="session-1")
+        await task
+        return duplicate
+
+    assert asyncio.run(main()) is None
+    assert saved == [1]
+    assert summarizer._running == {}
+
+
+def test_schedule_ignores_short_conversation(summarizer_module):
+    summarizer = make_summarizer(summarizer_module, FakeResponses())
+
+    async def main():
+        return summarizer.schedule(conversation(2), key="session-1")
+
+    assert asyncio.run(main()) is None
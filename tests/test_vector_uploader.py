@@ -0,0 +1,604 @@
+import copy
+import threading
+
+import httpx
+import pytest
+from bson import ObjectId
+from openai import APIConnectionError, RateLimitError
+from pymongo.errors import AutoReconnect
+
+
+@pytest.fixture
+def uploader(load_service_module):
+    return load_service_module("app.ai.data.vector_uploader")
+
+
+def test_vector_id_round_trip(uploader):
+    vec_id = uploader.vector_id("65f0c3a1b2", 3)
+
+    assert vec_id == "65f0c3a1b2:3"
+    assert uploader.parse_vector_id(vec_id) == ("65f0c3a1b2", 3)
+
+
+@pytest.mark.parametrize("vec_id", ["0f8fad5b-d9cb-469f-a165-70867728950e", "abc:", "abc:x1"])
+def test_parse_vector_id_rejects_legacy_ids(uploader, vec_id):
+    assert uploader.parse_vector_id(vec_id) == (None, None)
+
+
+def test_vector_for_uses_deterministic_id_and_drops_upload_state(uploader):
+    metadata = {"mongo_id": "m1", "law_article_id": "제20조", "vector_hash": "h", "vector_parts": 2}
+
+    vector = uploader._vector_for("본문", metadata, 1, [0.5])
+
+    assert vector["id"] == "m1:1"
+    assert vector["metadata"]["sub_index"] == 1
+    assert "vector_hash" not in vector["metadata"] and "vector_parts" not in vector["metadata"]
+
+
+def test_vector_source_hash_ignores_upload_state(uploader):
+    base = {"mongo_id": "m1", "law_article_id": "제20조"}
+
+    same = uploader.vector_source_hash("본문", {**base, "vector_hash": "old", "vector_parts": 3})
+
+    assert uploader.vector_source_hash("본문", base) == same
+    assert uploader.vector_source_hash("바뀐 본문", base) != same
+
+
+def test_checkpoint_round_trip(uploader, tmp_path):
+    path = uploader.checkpoint_path_for(str(tmp_path), "law_articles")
+    data = {
+        "version": uploader.CHECKPOINT_VERSION,
+        "job": {"category": "law_articles", "incremental": True, "dry_run": False},
+        "last_id": "65f0c3a1b2",
+        "pending_ids": ["65f0c3a1b3"],
+        "counters": {"documents_done": 12, "embed_tokens": 3400},
+    }
+
+    uploader.save_checkpoint(path, data)
+
+    assert path == str(tmp_path / "upload_checkpoint_law_articles.json")
+    assert uploader.load_checkpoint(path) == data
+    assert [p.name for p in tmp_path.iterdir()] == ["upload_checkpoint_law_articles.json"]
+
+
+def test_load_checkpoint_ignores_missing_corrupt_and_old_versions(uploader, tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+
+    assert uploader.load_checkpoint(None) is None
+    assert uploader.load_checkpoint(path) is None
+    (tmp_path / "checkpoint.json").write_text("{not json", encoding="utf-8")
+    assert uploader.load_checkpoint(path) is None
+    uploader.save_checkpoint(path, {"version": uploader.CHECKPOINT_VERSION + 1, "last_id": "x"})
+    assert uploader.load_checkpoint(path) is None
+
+
+class FakeIndex:
+    """list/upsert/delete만 흉내 낸 Pinecone 인덱스 (fail_ids에 든 벡터는 upsert 실패)"""
+
+    def __init__(self, ids=(), fail_ids=(), page_size=3):
+        self.ids = set(ids)
+        self.fail_ids = set(fail_ids)
+        self.page_size = page_size
+        self.upserted = []
+        self.deleted = []
+
+    def list(self, namespace):
+        ids = sorted(self.ids)
+        for i in range(0, len(ids), self.page_size):
+            yield ids[i:i + self.page_size]
+
+    def upsert(self, vectors, namespace):
+        ids = [v["id"] for v in vectors]
+        if self.fail_ids & set(ids):
+            raise RuntimeError("upsert rejected")
+        self.upserted.extend(ids)
+        self.ids.update(ids)
+
+    def delete(self, ids, namespace):
+        self.deleted.append(list(ids))
+        self.ids.difference_update(ids)
+
+
+def _field_value(doc, dotted):
+    for part in dotted.split("."):
+        doc = (doc or {}).get(part)
+    return doc
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        value = _field_value(doc, key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        if "$in" in cond and value not in cond["$in"]:
+            return False
+        if "$gt" in cond and not value > cond["$gt"]:
+            return False
+        if "$lte" in cond and not value <= cond["$lte"]:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs, fail_at=None):
+        self.docs = docs
+        self.fail_at = fail_at
+
+    def sort(self, keys):
+        return self  # 컬렉션이 이미 _id 순서로 돌려줌
+
+    def __iter__(self):
+        for i, doc in enumerate(self.docs):
+            if i == self.fail_at:
+                raise AutoReconnect("connection reset")
+            yield doc
+
+
+class FakeChunkCollection:
+    """upload_chunks_to_pinecone이 쓰는 find(...).sort / bulk_write만 흉내 낸 컬렉션
+
+    fail_after: 본문을 읽는 커서마다 차례로 적용할 "몇 개 읽은 뒤 연결이 끊기는지" 목록
+    """
+
+    def __init__(self, docs, fail_after=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.fail_after = list(fail_after)
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        docs = [copy.deepcopy(doc) for _, doc in sorted(self.docs.items()) if _matches(doc, query)]
+        fail_at = self.fail_after.pop(0) if projection is None and self.fail_after else None
+        return FakeCursor(docs, fail_at)
+
+    def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            metadata = self.docs[op._filter["_id"]]["metadata"]
+            for key, value in op._doc["$set"].items():
+                metadata[key.split(".", 1)[1]] = value
+
+    def metadata(self, mongo_id):
+        return self.docs[ObjectId(mongo_id)]["metadata"]
+
+
+def make_doc(oid, text, **metadata):
+    return {"_id": oid, "text": text, "metadata": {"category": "law_articles", **metadata}}
+
+
+@pytest.fixture
+def embed_calls(uploader, monkeypatch):
+    calls = []
+
+    def get_embeddings(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    monkeypatch.setattr(uploader, "get_embeddings", get_embeddings)
+    return calls
+
+
+def install(uploader, monkeypatch, docs, index, fail_after=()):
+    collection = FakeChunkCollection(docs, fail_after)
+    monkeypatch.setattr(uploader, "collection", collection)
+    monkeypatch.setattr(uploader, "index", index)
+    return collection
+
+
+LEGACY_ID = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+
+def test_prune_stale_vectors_deletes_shrunk_removed_and_legacy_vectors(uploader, monkeypatch):
+    index = FakeIndex(["a:0", "a:1", "a:2", "b:0", "kept:0", "kept:5", "gone:0", LEGACY_ID])
+    monkeypatch.setattr(uploader, "index", index)
+    monkeypatch.setattr(uploader, "PINECONE_DELETE_BATCH", 2)
+
+    deleted = uploader.prune_stale_vectors("law_articles", {"a": 1, "b": 1}, keep={"kept"})
+
+    assert deleted == 4
+    assert index.deleted == [[LEGACY_ID, "a:1"], ["a:2", "gone:0"]]
+    assert index.ids == {"a:0", "b:0", "kept:0", "kept:5"}
+
+
+def test_prune_stale_vectors_dry_run_only_counts(uploader, monkeypatch):
+    index = FakeIndex(["a:0", "a:1", LEGACY_ID])
+    monkeypatch.setattr(uploader, "index", index)
+
+    assert uploader.prune_stale_vectors("law_articles", {"a": 1}, keep=set(), dry_run=True) == 2
+    assert index.deleted == []
+
+
+def test_prune_stale_vectors_skips_when_listing_fails(uploader, monkeypatch):
+    class BrokenIndex(FakeIndex):
+        def list(self, namespace):
+            raise RuntimeError("list not supported")
+
+    index = BrokenIndex(["a:5"])
+    monkeypatch.setattr(uploader, "index", index)
+
+    assert uploader.prune_stale_vectors("law_articles", {"a": 1}, keep=set()) == 0
+    assert index.deleted == []
+
+
+def incremental_docs(uploader):
+    same, shrunk, failing, gone = sorted(ObjectId() for _ in range(4))
+    unchanged = make_doc(same, "변경 없음", law_article_id="제1조", vector_parts=1)
+    unchanged["metadata"]["vector_hash"] = uploader.vector_source_hash(
+        unchanged["text"], {**unchanged["metadata"], "mongo_id": str(same)}
+    )
+    docs = [
+        unchanged,
+        make_doc(shrunk, "줄어든 본문", law_article_id="제2조", vector_hash="old", vector_parts=3),
+        make_doc(failing, "실패할 본문", law_article_id="제3조", vector_hash="old", vector_parts=2),
+    ]
+    ids = [str(oid) for oid in (same, shrunk, failing, gone)]
+    vectors = [f"{ids[0]}:0", f"{ids[1]}:0", f"{ids[1]}:1", f"{ids[1]}:2", f"{ids[2]}:0", f"{ids[2]}:1", f"{ids[3]}:0", LEGACY_ID]
+    return docs, ids, vectors
+
+
+def test_incremental_upload_skips_unchanged_and_prunes_stale_vectors(uploader, monkeypatch, embed_calls):
+    docs, (same, shrunk, failing, gone), vectors = incremental_docs(uploader)
+    index = FakeIndex(vectors, fail_ids={f"{failing}:0"})
+    collection = install(uploader, monkeypatch, docs, index)
+
+    stats = uploader.upload_chunks_to_pinecone("law_articles", batch_size=1, incremental=True)
+
+    assert stats.skipped == 1
+    assert embed_calls == [["줄어든 본문", "실패할 본문"]]
+    assert index.upserted == [f"{shrunk}:0"]
+    # 조각 수가 줄어든 문서의 남은 조각, Mongo에서 사라진 문서, uuid id만 삭제 (실패한 문서는 기존 벡터 유지)
+    assert stats.vectors_deleted == 4
+    assert index.ids == {f"{same}:0", f"{shrunk}:0", f"{failing}:0", f"{failing}:1"}
+    assert collection.metadata(shrunk)["vector_parts"] == 1
+    assert collection.metadata(shrunk)["vector_hash"] != "old"
+    assert collection.metadata(failing)["vector_hash"] == "old"
+
+
+def test_incremental_dry_run_only_counts(uploader, monkeypatch, embed_calls):
+    docs, ids, vectors = incremental_docs(uploader)
+    index = FakeIndex(vectors)
+    collection = install(uploader, monkeypatch, docs, index)
+
+    stats = uploader.upload_chunks_to_pinecone("law_articles", incremental=True, dry_run=True)
+
+    assert (stats.skipped, stats.documents, stats.parts) == (1, 2, 2)
+    assert stats.tokens == len("줄어든 본문") + len("실패할 본문")
+    # dry_run에서는 모두 성공한 것으로 보므로 두 문서 모두 1조각 기준으로 셈
+    assert stats.vectors_deleted == 5
+    assert embed_calls == [] and index.upserted == [] and index.deleted == []
+    assert collection.metadata(ids[1])["vector_hash"] == "old"
+
+
+@pytest.fixture
+def mongo_outage(uploader, monkeypatch):
+    """재접속 대기 시간을 기록하고 (실제로 자지 않음) 재접속하면 같은 가짜 컬렉션을 돌려줌"""
+    sleeps = []
+    monkeypatch.setattr(uploader.time, "sleep", sleeps.append)
+    monkeypatch.setattr(uploader.random, "random", lambda: 0.0)
+    monkeypatch.setattr(
+        uploader, "create_mongo_client",
+        lambda: {"halla_academic_db": {"regulation_chunks": uploader.collection}},
+    )
+    return sleeps
+
+
+@pytest.fixture
+def saved_checkpoints(uploader, monkeypatch):
+    saved = []
+    save = uploader.save_checkpoint
+
+    def record(path, data):
+        saved.append(copy.deepcopy(data))
+        save(path, data)
+
+    monkeypatch.setattr(uploader, "save_checkpoint", record)
+    return saved
+
+
+def numbered_docs(count=4):
+    oids = sorted(ObjectId() for _ in range(count))
+    return [make_doc(oid, f"본문{i}", law_article_id=f"제{i}조") for i, oid in enumerate(oids)], [str(o) for o in oids]
+
+
+def test_mongo_error_writes_checkpoint_and_resumes_after_last_id(uploader, monkeypatch, tmp_path, mongo_outage, saved_checkpoints):
+    docs, ids = numbered_docs()
+    collection = install(uploader, monkeypatch, docs, FakeIndex(), fail_after=[2])
+    path = str(tmp_path / "checkpoint.json")
+
+    stats = uploader.upload_chunks_to_pinecone("law_articles", dry_run=True, checkpoint_path=path)
+
+    assert stats.documents == 4
+    assert mongo_outage == [1.0]
+    assert collection.queries[-1] == {"metadata.category": "law_articles", "_id": {"$gt": ObjectId(ids[1])}}
+    assert [(c["last_id"], c["pending_ids"]) for c in saved_checkpoints] == [(ids[1], [])]
+    assert not (tmp_path / "checkpoint.json").exists()  # 정상 종료하면 삭제
+
+
+def test_mongo_error_gives_up_after_max_retries_then_next_run_resumes(uploader, monkeypatch, tmp_path, mongo_outage):
+    docs, ids = numbered_docs()
+    collection = install(uploader, monkeypatch, docs, FakeIndex(), fail_after=[2, 0, 0])
+    path = str(tmp_path / "checkpoint.json")
+
+    with pytest.raises(AutoReconnect):
+        uploader.upload_chunks_to_pinecone("law_articles", dry_run=True, checkpoint_path=path, max_retries=2)
+
+    assert mongo_outage == [1.0, 2.0]
+    checkpoint = uploader.load_checkpoint(path)
+    assert checkpoint["last_id"] == ids[1]
+    assert checkpoint["counters"]["documents_done"] == 2
+
+    collection.queries.clear()
+    stats = uploader.upload_chunks_to_pinecone("law_articles", dry_run=True, checkpoint_path=path)
+
+    assert stats.documents == 4  # 체크포인트의 2개 + 이어서 처리한 2개
+    assert collection.queries[-1]["_id"] == {"$gt": ObjectId(ids[1])}
+    assert uploader.load_checkpoint(path) is None
+
+
+def test_checkpoint_for_another_job_is_ignored(uploader, monkeypatch, tmp_path):
+    docs, ids = numbered_docs()
+    collection = install(uploader, monkeypatch, docs, FakeIndex())
+    path = str(tmp_path / "checkpoint.json")
+    uploader.save_checkpoint(path, {
+        "version": uploader.CHECKPOINT_VERSION,
+        "job": {"category": "law_articles", "incremental": True, "dry_run": True},
+        "last_id": ids[2],
+        "counters": {"documents_done": 3},
+    })
+
+    stats = uploader.upload_chunks_to_pinecone("law_articles", dry_run=True, checkpoint_path=path)
+
+    assert stats.documents == 4
+    assert collection.queries == [{"metadata.category": "law_articles"}]
+
+
+def test_resume_preloads_done_docs_for_pruning(uploader, monkeypatch, tmp_path, embed_calls):
+    docs, ids = numbered_docs()
+    docs[0]["metadata"]["vector_parts"] = 1  # 체크포인트 이전에 올라간 문서
+    index = FakeIndex([f"{ids[0]}:0", f"{ids[0]}:1", f"{ids[1]}:0", f"{ids[1]}:3"])
+    collection = install(uploader, monkeypatch, docs, index)
+    path = str(tmp_path / "checkpoint.json")
+    uploader.save_checkpoint(path, {
+        "version": uploader.CHECKPOINT_VERSION,
+        "job": {"category": "law_articles", "incremental": False, "dry_run": False},
+        "last_id": ids[1],
+        "counters": {"documents_done": 2},
+    })
+
+    stats = uploader.upload_chunks_to_pinecone("law_articles", checkpoint_path=path)
+
+    assert collection.queries[0] == {"metadata.category": "law_articles", "_id": {"$lte": ObjectId(ids[1])}}
+    assert embed_calls == [["본문2", "본문3"]]
+    # vector_parts가 기록된 문서는 그 조각 수 기준으로 정리하고, 기록이 없는 문서(ids[1])는 그대로 둠
+    assert index.deleted == [[f"{ids[0]}:1"]]
+    assert stats.vectors_deleted == 1
+    assert index.ids == {f"{ids[0]}:0", f"{ids[1]}:0", f"{ids[1]}:3", f"{ids[2]}:0", f"{ids[3]}:0"}
+
+
+def test_failed_doc_before_watermark_is_retried_on_resume(uploader, monkeypatch, tmp_path, embed_calls, mongo_outage, saved_checkpoints):
+    docs, ids = numbered_docs()
+    index = FakeIndex(fail_ids={f"{ids[1]}:0"})
+    collection = install(uploader, monkeypatch, docs, index, fail_after=[3])
+    path = str(tmp_path / "checkpoint.json")
+
+    with pytest.raises(AutoReconnect):
+        uploader.upload_chunks_to_pinecone("law_articles", batch_size=1, checkpoint_path=path, max_retries=0)
+
+    # 연결이 끊긴 시점에는 아무 문서도 upsert되지 않았으므로 watermark가 움직이지 않음
+    assert (saved_checkpoints[0]["last_id"], saved_checkpoints[0]["pending_ids"]) == (None, ids[:3])
+    # 중단 처리에서 남은 배치를 마친 뒤: 실패한 ids[1]도 watermark를 지나가지만 failed_ids에 남음
+    final = saved_checkpoints[-1]
+    assert (final["last_id"], final["pending_ids"], final["failed_ids"]) == (ids[2], [], [ids[1]])
+    assert "vector_hash" not in collection.metadata(ids[1])
+
+    index.fail_ids.clear()
+    embed_calls.clear()
+    uploader.upload_chunks_to_pinecone("law_articles", batch_size=1, checkpoint_path=path)
+
+    assert embed_calls == [["본문1", "본문3"]]
+    assert sorted(index.ids) == [f"{oid}:0" for oid in ids]
+    assert collection.metadata(ids[1])["vector_parts"] == 1
+    assert uploader.load_checkpoint(path) is None
+
+
+def make_upserter(uploader, monkeypatch, index=None, **kwargs):
+    monkeypatch.setattr(uploader, "index", index or FakeIndex())
+    kwargs.setdefault("concurrency", 1)
+    return uploader.BatchEmbedUpserter("law_articles", **kwargs)
+
+
+def test_batches_are_packed_by_token_and_input_budget(uploader, monkeypatch, embed_calls):
+    upserter = make_upserter(uploader, monkeypatch, max_batch_tokens=10, max_batch_inputs=3)
+
+    with upserter:
+        for i, text in enumerate(["aaaa", "bbbb", "cc", "d", "e", "f", "g", "hhhhhhhhhh"]):
+            upserter.add(text, {"mongo_id": f"m{i}"})
+
+    assert embed_calls == [["aaaa", "bbbb", "cc"], ["d", "e", "f"], ["g"], ["hhhhhhhhhh"]]
+    assert (upserter.stats.embed_requests, upserter.stats.parts, upserter.stats.tokens) == (4, 8, 24)
+    assert upserter.stats.vectors_upserted == 8
+
+
+def test_in_flight_embedding_batches_are_bounded(uploader, monkeypatch):
+    release, started = threading.Event(), threading.Event()
+    calls = []
+
+    def get_embeddings(texts):
+        calls.append(texts)
+        started.set()
+        release.wait(5)
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(uploader, "get_embeddings", get_embeddings)
+    upserter = make_upserter(uploader, monkeypatch, max_batch_inputs=1)
+    adder = threading.Thread(target=lambda: [upserter.add(f"본문{i}", {"mongo_id": f"m{i}"}) for i in range(6)])
+
+    adder.start()
+    assert started.wait(5)
+    adder.join(0.2)
+
+    # concurrency=1이면 처리 중인 배치는 2개까지: 세 번째 배치를 넣으려던 add가 가장 오래된 배치를 기다림
+    assert adder.is_alive()
+    assert len(upserter._embedding) <= 2 and len(calls) == 1
+    release.set()
+    adder.join(5)
+    upserter.close()
+    assert upserter.stats.vectors_upserted == 6
+
+
+def test_document_done_only_after_every_part_is_upserted(uploader, monkeypatch, embed_calls):
+    index = FakeIndex()
+    done = []
+    upserter = make_upserter(
+        uploader, monkeypatch, index, upsert_batch_size=1, max_batch_tokens=uploader.MAX_TOKENS_PER_CHUNK,
+        on_document_done=lambda mongo_id, parts: done.append((mongo_id, parts, sorted(index.upserted))),
+    )
+
+    with upserter:
+        parts = upserter.add("가" * 4000, {"mongo_id": "long"})
+        upserter.add("짧은 본문", {"mongo_id": "short"})
+        upserter.add("", {"mongo_id": "empty"})
+
+    assert parts == 3 and len(embed_calls) == 3  # 마지막 조각과 짧은 문서는 한 배치
+    by_id = {mongo_id: (parts, upserted) for mongo_id, parts, upserted in done}
+    assert by_id["long"][0] == 3
+    assert {"long:0", "long:1", "long:2"} <= set(by_id["long"][1])
+    assert by_id["short"][0] == 1 and "short:0" in by_id["short"][1]
+    assert by_id["empty"][0] == 0  # 조각이 없는 문서는 add에서 바로 완료
+    assert upserter.failed == set()
+
+
+def test_embedding_failure_marks_whole_batch_failed(uploader, monkeypatch):
+    def get_embeddings(texts):
+        if "실패" in texts:
+            raise ValueError("bad input")
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(uploader, "get_embeddings", get_embeddings)
+    done = []
+    upserter = make_upserter(uploader, monkeypatch, max_batch_inputs=2, on_document_done=lambda m, p: done.append(m))
+
+    with upserter:
+        for mongo_id, text in [("a", "성공"), ("b", "실패"), ("c", "성공")]:
+            upserter.add(text, {"mongo_id": mongo_id})
+
+    # a와 b가 한 배치라 함께 실패
+    assert upserter.failed == {"a", "b"}
+    assert done == ["c"]
+    assert upserter.stats.errors == 1
+
+
+def test_upsert_failure_marks_documents_failed(uploader, monkeypatch, embed_calls):
+    done = []
+    upserter = make_upserter(
+        uploader, monkeypatch, FakeIndex(fail_ids={"b:0"}), upsert_batch_size=1,
+        on_document_done=lambda m, p: done.append(m),
+    )
+
+    with upserter:
+        for mongo_id in "abc":
+            upserter.add(f"본문 {mongo_id}", {"mongo_id": mongo_id})
+
+    assert upserter.failed == {"b"}
+    assert sorted(done) == ["a", "c"]
+    assert (upserter.stats.errors, upserter.stats.vectors_upserted) == (1, 2)
+
+
+def test_document_fails_when_one_of_its_batches_fails_partway(uploader, monkeypatch):
+    calls = []
+
+    def get_embeddings(texts):
+        calls.append(len(texts))
+        if len(calls) == 2:
+            raise ValueError("second batch rejected")
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(uploader, "get_embeddings", get_embeddings)
+    index, done = FakeIndex(), []
+    upserter = make_upserter(
+        uploader, monkeypatch, index, upsert_batch_size=1, max_batch_tokens=uploader.MAX_TOKENS_PER_CHUNK,
+        on_document_done=lambda m, p: done.append(m),
+    )
+
+    with upserter:
+        upserter.add("가" * 4000, {"mongo_id": "long"})
+
+    # 첫/마지막 조각은 올라갔지만 가운데 조각이 실패했으므로 문서는 실패로 남고 완료 통지는 없음
+    assert calls == [1, 1, 1]
+    assert upserter.failed == {"long"}
+    assert done == []
+    assert sorted(index.upserted) == ["long:0", "long:2"]
+
+
+def _openai_error(kind, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    if kind is RateLimitError:
+        return RateLimitError("rate limited", response=httpx.Response(429, headers=headers or {}, request=request), body=None)
+    return kind(request=request)
+
+
+@pytest.fixture
+def retry_clock(uploader, monkeypatch):
+    """새 공유 대기 시각을 쓰고, 실제로 자지 않고 대기 시간만 기록"""
+    sleeps = []
+    monkeypatch.setattr(uploader, "_rate_limit_gate", uploader._RateLimitGate())
+    monkeypatch.setattr(uploader.time, "sleep", sleeps.append)
+    monkeypatch.setattr(uploader.random, "random", lambda: 0.0)
+    return sleeps
+
+
+def failing_then_ok(uploader, monkeypatch, errors):
+    errors = list(errors)
+    calls = []
+
+    def get_embeddings(texts):
+        calls.append(texts)
+        if errors:
+            raise errors.pop(0)
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(uploader, "get_embeddings", get_embeddings)
+    return calls
+
+
+def test_rate_limit_holds_every_embedding_thread_until_retry_after(uploader, monkeypatch, retry_clock):
+    calls = failing_then_ok(uploader, monkeypatch, [_openai_error(RateLimitError, {"retry-after": "3"})])
+
+    assert uploader.embed_batch_with_retry(["본문"]) == [[1.0]]
+
+    assert len(calls) == 2
+    assert retry_clock == [pytest.approx(3.0, abs=0.1)]
+    # 같은 대기 시각을 공유하므로 다른 스레드의 다음 요청도 기다림
+    other = threading.Thread(target=uploader._rate_limit_gate.wait)
+    other.start()
+    other.join()
+    assert retry_clock[1] == pytest.approx(3.0, abs=0.1)
+
+
+def test_connection_errors_back_off_without_shared_hold(uploader, monkeypatch, retry_clock):
+    failing_then_ok(uploader, monkeypatch, [_openai_error(APIConnectionError)] * 2)
+
+    assert uploader.embed_batch_with_retry(["본문"]) == [[1.0]]
+
+    assert retry_clock == [1.0, 2.0]
+    uploader._rate_limit_gate.wait()
+    assert retry_clock == [1.0, 2.0]
+
+
+def test_retries_give_up_after_max_retries(uploader, monkeypatch, retry_clock):
+    calls = failing_then_ok(uploader, monkeypatch, [_openai_error(APIConnectionError)] * 3)
+
+    with pytest.raises(APIConnectionError):
+        uploader.embed_batch_with_retry(["본문"], max_retries=2)
+
+    assert len(calls) == 3
+
+
+def test_non_retryable_errors_are_not_retried(uploader, monkeypatch, retry_clock):
+    calls = failing_then_ok(uploader, monkeypatch, [ValueError("bad input")])
+
+    with pytest.raises(ValueError):
+        uploader.embed_batch_with_retry(["본문"])
+
+    assert len(calls) == 1 and retry_clock == []